@@ -1,7 +1,14 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import bisect
+import collections.abc
+import contextlib
+import math
+import json
+import tracemalloc
+import types
 import numpy as np
-import pandas as pd
+import sys
 import time
 
 class Elevator():
@@ -17,17 +24,32 @@ class Elevator():
     ----------
     current_floor : int
         The current floor of the elevator object.
-    sec_per_floor : int
+    sec_per_floor : int or float
         The speed of the elevator in number of seconds to move one floor.        
     min_building_floor: int
         The lowest floor of the building.
     max_building_floor: int
         The highest floor of the building.
+    playback_stats : dict or None
+        The statistics of the last live simulation (see play_live_sim), or
+        None if no live simulation has been run.
+    profiler : StageProfiler or None
+        When set, the time spent in each stage of go_to_floor is recorded
+        by the profiler. The default is None (no profiling).
+    cache : TripCache or None
+        When set, go_to_floor returns the read-only simulation data of 
+        repeated trips from the cache. The default is None (no caching).
+    order_stats : dict or None
+        The time saved by reordering the floors in the last go_to_floor
+        call ("time_saved" and "mean_arrival_time_saved", see TripPlan), 
+        whatever its output format, or None if the floors were not 
+        reordered.
     ...
     
     Assumptions
     -----------
-    - the speed of the elevator (seconds per floor). Must be an integer.
+    - the speed of the elevator (seconds per floor). Must be a number 
+        greater than 0.
     
     ...
         
@@ -43,11 +65,40 @@ class Elevator():
     def __init__(self, current_floor = 1, sec_per_floor = 10, min_building_floor = 1,
                  max_building_floor = 20):
         
+        self.config = ElevatorConfig(sec_per_floor, min_building_floor, max_building_floor)
         self.current_floor = self.__validate_current_floor(current_floor, min_building_floor,
                                                            max_building_floor)
-        self.sec_per_floor = self.__validate_elevator_speed(sec_per_floor)
-        self.min_building_floor = self.__validate_building_floors(min_building_floor)
-        self.max_building_floor = self.__validate_building_floors(max_building_floor)
+        self.playback_stats = None
+        self.order_stats = None
+        self.profiler = None
+        self.cache = None
+    
+    
+    # the speed and building floors are kept in the immutable config. Setting
+    # them replaces the config with a new validated one
+    @property
+    def sec_per_floor(self):
+        return self.config.sec_per_floor
+    
+    @sec_per_floor.setter
+    def sec_per_floor(self, sec_per_floor):
+        self.config = self.config.replace(sec_per_floor = sec_per_floor)
+        
+    @property
+    def min_building_floor(self):
+        return self.config.min_building_floor
+    
+    @min_building_floor.setter
+    def min_building_floor(self, min_building_floor):
+        self.config = self.config.replace(min_building_floor = min_building_floor)
+        
+    @property
+    def max_building_floor(self):
+        return self.config.max_building_floor
+    
+    @max_building_floor.setter
+    def max_building_floor(self, max_building_floor):
+        self.config = self.config.replace(max_building_floor = max_building_floor)
     
 
     def __validate_current_floor(self, current_floor, min_building_floor, max_building_floor):
@@ -62,56 +113,9 @@ class Elevator():
         return current_floor
     
     
-    def __validate_elevator_speed(self, sec_per_floor):
-        # the purpose of this function is to verify that the elevator speed 
-        # is an integer greater than 0.
-        if (sec_per_floor <= 0 or type(sec_per_floor) is not int):
-            raise Exception("sec_per_floor must be an integer greater than 0")
-            
-        return sec_per_floor
-   
-    
-    def __validate_building_floors(self, floor_limit):
-        # the purpose of this method is to verify that the building floor limits
-        # are integers
-        if (type(floor_limit) is not int):
-            raise Exception("building floors must be an integer")
-        
-        return floor_limit
-            
-    
-    def __create_route(self, floor_checkpoints):
-        # The purpose of this method is to create a list of every floor along 
-        # the route from current floor to the last desired floor
-        
-        # initial the floor route with the current floor
-        route = [self.current_floor]
-        
-        # for each desired floor
-        for i, floor in enumerate(floor_checkpoints):
-            # the index is incremented below, so skip the last one to avoid 
-            # out of bounds
-            if (i < len(floor_checkpoints) - 1):                
-                # find the direction (up/down) to travel between desired floors
-                direction = int((floor_checkpoints[i + 1] - floor) / abs(floor_checkpoints[i + 1] - floor))
-                # get all the floors between the two desired floors    
-                route += list(range(floor_checkpoints[i] + direction, floor_checkpoints[i + 1] + direction, direction))
-        
-        return route
-
-
-    def __validate_sim_inputs(self, desired_floors, live_sim, sim_speed):
-        # The purpose of this method is to check that all inputs are valid
-        
-        # if the desired floor is an int, make it a list
-        if (type(desired_floors) is int):
-            desired_floors = [desired_floors]
-        # if a single int is not passed in, the desired floors must be in a list
-        elif type(desired_floors) is not list:
-            raise Exception("desired_floors must be a single floor number (int) or list of floor numbers")
-        # the floors in the list must be ints
-        elif not all(isinstance(n, int) for n in desired_floors):
-            raise Exception("all floors in list must be an integer")
+    def __validate_sim_inputs(self, live_sim, sim_speed):
+        # The purpose of this method is to check that the live simulation
+        # inputs are valid. The desired floors are checked by plan_trip
             
         # live_sim must be a boolean
         if type(live_sim) is not bool:
@@ -120,148 +124,184 @@ class Elevator():
         # sim_speed must be an integer greater than 0
         if ((type(sim_speed) is not  int and type(sim_speed) is not float) or sim_speed <= 0):
             raise Exception("sim_speed must be an int greater than 0")
-        
-        # add current floor to the desired floor list to see start -> finish
-        desired_floors.insert(0, self.current_floor)    
-        # at least one floor in the list must be different than the current floor
-        if (len(set(desired_floors)) == 1):
-            raise Exception("must enter at least one floor that is not the current floor: {}". \
-                            format(self.current_floor))
-        
-
-        # desired floors must be at or below the highest building floor
-        if (any(x > self.max_building_floor for x in desired_floors)):
-            raise Exception("at least one desired floor is higher than the highest building floor.")
-        
-
-        # desired floors at or above the lowest building floor
-        if (any(x < self.min_building_floor for x in desired_floors)):
-            raise Exception("at least one desired floor is lower than the lowest building floor.")
-        
-        return desired_floors
-   
     
-    def __clean_sim_inputs(self, floor_checkpoints):  
-        # The purpose of this method is to remove any consecutive duplicate
-        # floors from the desired floors list. This includes the current floor
+    
+    def __profile(self, stage_name):
+        # The purpose of this method is to time a stage of go_to_floor with
+        # the profiler, or do nothing when profiling is disabled
         
-        # remove any consecutively duplicated floors from the list             
-        clean_path = [floor_checkpoints[i] for i in range(len(floor_checkpoints)) if (i==0) or floor_checkpoints[i] != floor_checkpoints[i-1]]
-        return clean_path
+        if (self.profiler is None):
+            return _NO_PROFILE
+        return self.profiler.stage(stage_name)
     
     
-    def __get_sim_elapsed_time(self, route):
-        # The purpose of this method is to get the elapsed time for each time
-        # increment of the simulation
+    def __run_live_sim(self, sim_data, sim_speed):
+        # The purpose of this method to to run a live simulation by
+        # printing the data to the console as the elevator moves between floors
+        # and keep the playback statistics
+        
+        self.playback_stats = play_live_sim(sim_data, sim_speed)
         
-        # expand the list of floors in route to line up with the times it takes
-        # to transition to each floor. This should be equal length to the 
-        # time_elapsed list
-        # get the list of time for each floor given the speed of the elevator
-        times = list(range(0, len(route) * self.sec_per_floor))
-        # remove times that occur after the final floor is reached
-        time_elapsed = times[:-self.sec_per_floor + 1]
         
-        return time_elapsed
+    def plan_trip(self, desired_floors, order = None):
+        '''
+        Description
+        -----------
+        plan_trip validates and cleans the desired floors the same way as
+        go_to_floor and returns a TripPlan holding only the legs of the trip.
+        No per-second data is created and the current floor of the elevator
+        is not changed.
+
+        Parameters
+        ----------
+        desired_floors : int or sequence (list, range, NumPy array) of ints
+            The floor(s) for the elevator to travel to.
+        order : str or None, optional
+            Reorders the desired floors before planning the trip, see
+            go_to_floor. The default is None.
+
+        Returns
+        -------
+        trip_plan : TripPlan
+            The planned trip starting at the current floor of the elevator.
+        '''
+        
+        return plan_trip(self.current_floor, desired_floors, self.config, order)
     
     
-    def __get_sim_current_floor(self, route):
-        # The purpose of this method is to get the current floor for each time
-        # increment of the simulation
+    def start_trip(self, desired_floors, order = None):
+        '''
+        Description
+        -----------
+        start_trip plans a trip the same way as plan_trip and returns an
+        ActiveTrip, whose stops can be changed while the elevator is moving.
+
+        Parameters
+        ----------
+        desired_floors : int or sequence (list, range, NumPy array) of ints
+            The floor(s) for the elevator to travel to.
+        order : str or None, optional
+            Reorders the desired floors before planning the trip, see
+            go_to_floor. The default is None.
+
+        Returns
+        -------
+        trip : ActiveTrip
+            The trip starting at the current floor of the elevator.
+        '''
         
-        return np.repeat(route, self.sec_per_floor)[:-self.sec_per_floor + 1]
+        return ActiveTrip(self, self.plan_trip(desired_floors, order))
     
     
-    def __get_sim_next_dest(self, floor_checkpoints):
-        # The purpose of this method is to get the next destination for each
-        # time increment of the simulation
+    def trip_summary(self, desired_floors):
+        '''
+        Description
+        -----------
+        trip_summary computes the totals of a trip directly from the desired
+        floors and sec_per_floor, without planning the legs or creating the
+        per-second data, so the time taken only grows with the number of 
+        stops. The desired floors are validated the same way as go_to_floor
+        and the current floor of the elevator is not changed.
+
+        Parameters
+        ----------
+        desired_floors : int or sequence (list, range, NumPy array) of ints
+            The floor(s) for the elevator to travel to.
+
+        Returns
+        -------
+        summary : dict
+            Dictionary with the totals of the trip:
+                - total_time: the time in seconds of the trip.
+                - floors_traveled: the number of floors traveled.
+                - arrival_times: ndarray with the time each desired floor is
+                    reached, in the order of the desired floors.
+                - final_floor: the floor the elevator is on at the end.
+        '''
         
-        # get the distance (in # of floors) between each floor in the list of 
-        # desired floors
-        distances = abs(np.array(np.diff(floor_checkpoints), dtype=int))
-        # repeat each desired floor based on the distance between the destinations to 
-        # align with the time elapsed
-        destinations = np.repeat(np.repeat(floor_checkpoints[1:], distances), self.sec_per_floor)
-        # append a nan to end to indicate that there are not more destinations
-        next_destination = np.append(destinations, np.nan)  
+        # confirm that the desired floors are valid. Consecutive duplicate
+        # floors do not need to be removed since they add no travel
+        floor_checkpoints = _validate_trip_floors(self.current_floor, desired_floors, self.config)
+        floors_moved = np.cumsum(np.abs(np.diff(floor_checkpoints)))
         
-        return next_destination
+        return {
+            "total_time":int(floors_moved[-1]) * self.sec_per_floor,
+            "floors_traveled":int(floors_moved[-1]),
+            "arrival_times":floors_moved * self.sec_per_floor,
+            "final_floor":int(floor_checkpoints[-1])
+            }
     
     
-    def __get_sim_floors_to_next_dest(self, next_destination, current_floor):
-        # The purpose of this method is to get the number of floors to the next
-        # destination for each time increment of the simulation
+    def __stream_trip(self, trip_plan, chunk_size):
+        # The purpose of this method is to generate the simulation data of
+        # the trip one chunk of rows at a time
         
-        # subtract the next destination floor from the current cloor to find
-        # the number of floors until next destination
-        return abs(next_destination - current_floor)
-    
-    def __get_sim_time_to_next_dest(self, route, floors_to_next_dest):
-        # The purpose of this method is to get the time to the next destination
-        # for each time increment of the simulation
-        
-        # get a floor transition countdown list in seconds 
-        floor_transition_countdown = np.array(range(self.sec_per_floor, 0, -1), dtype=int)
-        # duplicate the floor transition countdown list for each floor in route and remove
-        # the excess times that occur after the reaching the final floor
-        time_to_next_floor  = np.tile(floor_transition_countdown, len(route))[:-self.sec_per_floor + 1]
-        # remove the time for the final floor and replace with Nan since there 
-        # are no more floors in the route
-        time_to_next_floor = np.append(time_to_next_floor[:-1], np.nan)
-        # get the time to the next destination
-        time_to_next_dest = ((floors_to_next_dest - 1) * self.sec_per_floor) + time_to_next_floor
+        # rows are computed in fixed size chunks so memory use does not
+        # depend on the length of the trip
+        step = chunk_size if chunk_size is not None else 1024
+        for start in range(0, len(trip_plan), step):
+            # the last row is at the end of the trip, which may not be a
+            # whole second
+            times = np.minimum(np.arange(start, min(start + step, len(trip_plan))), trip_plan.total_time)
+            columns = trip_plan.get_columns(times, exact = True)
+            
+            if (chunk_size is not None):
+                yield columns
+                continue
+            
+            # yield one record per row, with no next destination values once
+            # the final floor is reached
+            arrived = columns.pop("arrived")
+            names = list(columns)
+            for i, values in enumerate(zip(*(columns[name].tolist() for name in names))):
+                record = dict(zip(names, values))
+                if arrived[i]:
+                    for name in ["floors_to_next_dest", "time_to_next_dest", "next_destination"]:
+                        record[name] = None
+                yield record
         
-        return time_to_next_dest
+        # retain the final elevator position once the stream is exhausted
+        self.current_floor = trip_plan.final_floor
     
     
-    def __create_dataframe(self, time_elapsed, current_floor, floors_to_next_dest,
-                           time_to_next_dest, next_destination):
-        # The purpose of this method is to create the dataframe containing 
-        # the simulation data
-    
-        sim_data = pd.DataFrame({
-            "time_elapsed":time_elapsed,
-            "current_floor":current_floor,
-            "floors_to_next_dest":floors_to_next_dest,
-            "time_to_next_dest":time_to_next_dest,
-            "next_destination":next_destination
-            }, dtype=int)
+    def iter_go_to_floor(self, desired_floors, chunk_size = None):
+        '''
+        Description
+        -----------
+        iter_go_to_floor runs the same simulation as go_to_floor but yields
+        the simulation data lazily instead of building a DataFrame, so memory
+        use is constant no matter how long the trip is. The current floor of
+        the elevator is updated when the stream is exhausted.
+
+        Parameters
+        ----------
+        desired_floors : int or sequence (list, range, NumPy array) of ints
+            The floor(s) for the elevator to travel to.
+        chunk_size : int > 0 or None, optional
+            If None, one dict is yielded per time increment of the simulation.
+            Otherwise dicts of NumPy arrays holding up to chunk_size time
+            increments are yielded. The default is None.
+
+        Returns
+        -------
+        sim_stream : generator
+            Generator of the simulation data. Each record (or chunk) has the
+            same keys as the go_to_floor columns. In records, the next
+            destination values are None once the final floor is reached. 
+            Chunks include an additional "arrived" boolean array which is 
+            True where the next destination values have no meaning.
+        '''
         
-        # convert next destination and floors to next destination to ints which 
-        # were converted to floats during np.append()
-        sim_data["next_destination"] = sim_data["next_destination"].convert_dtypes(int)
-        sim_data["floors_to_next_dest"] = sim_data["floors_to_next_dest"].convert_dtypes(int)  
-        sim_data["time_to_next_dest"] = sim_data["time_to_next_dest"].convert_dtypes(int)  
+        # validate the inputs now rather than when the stream is first read
+        if (chunk_size is not None and (type(chunk_size) is not int or chunk_size <= 0)):
+            raise Exception("chunk_size must be None or an integer greater than 0")
+        trip_plan = self.plan_trip(desired_floors)
         
-        return sim_data
+        return self.__stream_trip(trip_plan, chunk_size)
     
     
-    def __run_live_sim(self, sim_data, sim_speed):
-        # The purpose of this method to to run a live simulation by
-        # printing the data to the console as the elevator moves between floors
-        
-        # for each row in the sim dataframe
-        for index, row in sim_data.iterrows():
-            
-            # if the final floor has not yet been reached
-            if (index != sim_data.shape[0] - 1):
-                # print the elevator sim data
-                print("elapsed time: {}sec | current floor: {} | next destination: {}". \
-                      format(row["time_elapsed"], row["current_floor"], row["next_destination"]))
-                print("floors to next destination: {} | time to next destination: {}sec\n". \
-                      format(row["floors_to_next_dest"], row["time_to_next_dest"]))   
-                    
-                # pause the sim based on desired sim speed
-                time.sleep(1/sim_speed)
-                
-            # when the final floor is reached    
-            else:
-                print("elapsed time: {}sec | current floor: {}". \
-                      format(row["time_elapsed"], row["current_floor"]))
-                print("Final destination reached.")
-        
-        
-    def go_to_floor(self, desired_floors, live_sim = True, sim_speed = 1):
+    def go_to_floor(self, desired_floors, live_sim = True, sim_speed = 1, order = None,
+                    output = "pandas", compact = False, time_step = 1):
         '''
         Description
         -----------
@@ -284,7 +324,7 @@ class Elevator():
         
         Parameters
         ----------
-        desired_floors : int or list containing ints
+        desired_floors : int or sequence (list, range, NumPy array) of ints
             The floor(s) for the elevator to travel to.
         live_sim : boolean, optional
             Determines whether a "live" simulation is run where the 
@@ -298,10 +338,35 @@ class Elevator():
             the time increment being use. 
             If live_sim is false, sim_speed is ignored.
             The default is 1.
+        order : str or None, optional
+            Reorders the desired floors to reduce the travel time before the
+            simulation is run (see order_stops). One of "look", "scan" or
+            "optimal". If None, the floors are visited in the given order.
+            The default is None.
+        output : str, optional
+            The format of the simulation data. "pandas" returns a DataFrame,
+            "numpy" returns a NumPy structured array and "dict" returns a 
+            dictionary of NumPy arrays. The NumPy formats do not need pandas
+            and are faster to build. They have an additional "arrived" 
+            column which is True in the final row, where the next 
+            destination columns have no value.
+            The default is "pandas".
+        compact : boolean, optional
+            If True, the columns use the smallest integer dtypes (int16 or
+            int32) that fit the building floors and trip duration instead of
+            int64, which uses several times less memory per row. The final
+            row is still marked by the mask of the nullable columns (or the
+            "arrived" column). The default is False.
+        time_step : int, float > 0 or "floors", optional
+            The time in seconds between two rows of the simulation data. 
+            Fractional time steps give fractional time columns. With 
+            "floors", there is only one row each time the elevator reaches
+            a floor, so the number of rows does not grow with sec_per_floor.
+            The last row is always the end of the trip. The default is 1.
 
         Returns
         -------
-        sim_data : DataFrame
+        sim_data : DataFrame, structured ndarray or dict
             DataFrame containing all the elevator simulation data. 
             The columns of the DataFrame are as follows:  
                 - time_elapsed: total time elapsed for each time increment of simulation.
@@ -312,52 +377,1988 @@ class Elevator():
                     each time incremement of simulation.
                 - next_destination: next floor destination for each time increment
                     of the simulation.
+            If the floors are reordered, the total trip time saved 
+            compared with the given order ("time_saved") and the saving in
+            the mean time to reach each desired floor 
+            ("mean_arrival_time_saved") are kept in order_stats for every
+            output format, and also in sim_data.attrs if the output is
+            "pandas".
+            When the cache of the elevator is set, the simulation data is
+            read-only and shared with other calls for the same trip.
         '''
         
         ###############################
-        ## Validate and clean inputs ##
+        ## Validate inputs           ##
         ###############################
-        # confirm that all inputs are valid
-        floor_checkpoints = self.__validate_sim_inputs(desired_floors, live_sim, sim_speed)
-        # clean inputs to remove any sequentially duplicated floors
-        floor_checkpoints = self.__clean_sim_inputs(floor_checkpoints)      
+        with self.__profile("validate"):
+            # confirm that the simulation and output inputs are valid
+            self.__validate_sim_inputs(live_sim, sim_speed)
+            if (output not in OUTPUTS):
+                raise Exception("output must be one of {}".format(OUTPUTS))
+            if (time_step != "floors" and (type(time_step) not in (int, float) or time_step <= 0)):
+                raise Exception("time_step must be a number greater than 0 or \"floors\"")
 
         ###############################
         ## Calculate simulation data ##
         ###############################
-        # create the full elevator route to reach each desired floor
-        route = self.__create_route(floor_checkpoints)                
-        # get the total elapsed time for each time increment of the simulation
-        time_elapsed = self.__get_sim_elapsed_time(route)
-        # get the current floor for each time increment of the simulation
-        current_floor = self.__get_sim_current_floor(route)
-        # get the next destination for each time increment of the simulation
-        next_destination = self.__get_sim_next_dest(floor_checkpoints) 
-        # get the floors to the next destination for each time increment 
-        # of the simulation
-        floors_to_next_dest = self.__get_sim_floors_to_next_dest(next_destination, current_floor)
-        # get the time to the next destination for each time increment of
-        # the simulation
-        time_to_next_dest = self.__get_sim_time_to_next_dest(route, floors_to_next_dest)
-        
-        ###########################
-        ## Construct a DataFrame ##
-        ###########################
-        # Construct a dataframe for the entire simulation
-        sim_data = self.__create_dataframe(time_elapsed, current_floor, 
-                                          floors_to_next_dest, time_to_next_dest,
-                                          next_destination)           
+        with self.__profile("plan") as stage:
+            # validate, clean and reorder the desired floors and plan the
+            # trip as a list of legs between them
+            trip_plan = self.plan_trip(desired_floors, order)
+            stage.size = trip_plan.leg_duration.size
+        if (self.cache is not None):
+            with self.__profile("cache") as stage:
+                # get the read-only simulation data of a repeated trip
+                sim_data = self.cache.get(trip_plan, output, compact, time_step)
+                n_rows = stage.size = len(sim_data["time_elapsed"])
+        else:
+            with self.__profile("columns") as stage:
+                # compute the simulation columns for every time step of the trip
+                columns = trip_plan.get_columns(trip_plan.sample_times(time_step), compact, True)
+                n_rows = stage.size = len(columns["time_elapsed"])
+        
+        ##########################
+        ## Construct the output ##
+        ##########################
+        with self.__profile("frame") as stage:
+            # construct the output for the entire simulation
+            if (self.cache is None):
+                sim_data = _build_output(columns, output)
+            self.order_stats = None if order is None else \
+                {"time_saved":trip_plan.time_saved,
+                 "mean_arrival_time_saved":trip_plan.mean_arrival_time_saved}
+            if (order is not None and output == "pandas"):
+                # the attrs of a cached dataframe are shared, so they are
+                # set on a copy sharing the same data
+                if (self.cache is not None):
+                    sim_data = sim_data.copy(deep = False)
+                sim_data.attrs.update(self.order_stats)
+            stage.size = n_rows
+            
         #########################
         ## Run live simulation ##
         #########################
         # if a live simulation is requested
         if live_sim:
-            self.__run_live_sim(sim_data, sim_speed)
+            with self.__profile("live_sim") as stage:
+                self.__run_live_sim(sim_data, sim_speed)
+                stage.size = n_rows
 
         ################################
         ## Save state and output data ##
         ################################
         # Retain the final elevator position and output the sim data
-        self.current_floor = sim_data.current_floor.values[-1]
+        self.current_floor = trip_plan.final_floor
+        
+        return sim_data
+    
+    
+    async def go_to_floor_async(self, desired_floors, live_sim = True, sim_speed = 1,
+                                output = "pandas"):
+        '''
+        Description
+        -----------
+        go_to_floor_async is the asyncio version of go_to_floor. The live
+        simulation pauses with asyncio.sleep instead of blocking the thread,
+        so one event loop can run many elevators side by side, each at its own
+        sim_speed. If the task is cancelled during the live simulation, the
+        current floor of the elevator is set to the floor reached at the time
+        of cancellation before the cancellation is propagated.
+
+        Parameters
+        ----------
+        desired_floors : int or sequence (list, range, NumPy array) of ints
+            The floor(s) for the elevator to travel to.
+        live_sim : boolean, optional
+            Determines whether a "live" simulation is run. The default is True.
+        sim_speed : int or float > 0, optional
+            Determines the speed of the simulation relative to a 1 second time
+            increment. The default is 1.
+        output : str, optional
+            The format of the simulation data, see go_to_floor. 
+            The default is "pandas".
+
+        Returns
+        -------
+        sim_data : DataFrame, structured ndarray or dict
+            The elevator simulation data, see go_to_floor.
+        '''
+        
+        import asyncio
+        
+        # confirm that all inputs are valid and plan the trip
+        self.__validate_sim_inputs(live_sim, sim_speed)
+        if (output not in OUTPUTS):
+            raise Exception("output must be one of {}".format(OUTPUTS))
+        trip_plan = self.plan_trip(desired_floors)
+        sim_data = _build_output(trip_plan.get_columns(trip_plan.sample_times(), exact = True), output)
+        
+        if live_sim:
+            start_time = time.monotonic()
+            try:
+                self.playback_stats = await play_live_sim_async(sim_data, sim_speed)
+            except asyncio.CancelledError:
+                # keep the floor reached when the trip was aborted
+                elapsed = min((time.monotonic() - start_time) * sim_speed, trip_plan.total_time)
+                self.current_floor = trip_plan.state_at(elapsed)["current_floor"]
+                raise
+        
+        self.current_floor = trip_plan.final_floor
         
         return sim_data
+
+
+class ElevatorConfig():
+    '''
+    Description
+    -----------
+    Class to hold the immutable settings of an elevator: its speed and the
+    floors of the building. The settings are validated once when the config
+    is created and cannot be changed afterwards, so one config can be shared
+    by any number of threads planning trips with the plan_trip function
+    without locking.
+
+    ...
+
+    Attributes
+    ----------
+    sec_per_floor : int or float
+        The speed of the elevator in number of seconds to move one floor.
+    min_building_floor: int
+        The lowest floor of the building.
+    max_building_floor: int
+        The highest floor of the building.
+    ...
+    
+    Example
+    -------
+    import elevator
+    from concurrent.futures import ThreadPoolExecutor
+    config = elevator.ElevatorConfig(sec_per_floor = 10, min_building_floor = 1,
+                                     max_building_floor = 20)
+    with ThreadPoolExecutor() as executor:
+        trip_plans = list(executor.map(lambda x: elevator.plan_trip(1, x, config),
+                                       [[3, 5], [20], [2, 1]]))
+    
+    
+    '''
+    __slots__ = ("sec_per_floor", "min_building_floor", "max_building_floor")
+    
+    def __init__(self, sec_per_floor = 10, min_building_floor = 1, max_building_floor = 20):
+        
+        # the attributes are set once through object.__setattr__ since 
+        # setting them is otherwise not allowed
+        object.__setattr__(self, "sec_per_floor", self.__validate_elevator_speed(sec_per_floor))
+        object.__setattr__(self, "min_building_floor",
+                           self.__validate_building_floors(min_building_floor))
+        object.__setattr__(self, "max_building_floor",
+                           self.__validate_building_floors(max_building_floor))
+        if (max_building_floor < min_building_floor):
+            raise Exception("the highest building floor must not be lower than the lowest")
+        
+        
+    def __validate_elevator_speed(self, sec_per_floor):
+        # the purpose of this function is to verify that the elevator speed 
+        # is a number greater than 0. Fractional speeds model fast cars
+        if (type(sec_per_floor) not in (int, float) or sec_per_floor <= 0):
+            raise Exception("sec_per_floor must be a number greater than 0")
+            
+        return sec_per_floor
+   
+    
+    def __validate_building_floors(self, floor_limit):
+        # the purpose of this method is to verify that the building floor limits
+        # are integers
+        if (type(floor_limit) is not int):
+            raise Exception("building floors must be an integer")
+        
+        return floor_limit
+    
+    
+    def __setattr__(self, name, value):
+        raise Exception("ElevatorConfig is immutable, use replace to change it")
+        
+        
+    def __delattr__(self, name):
+        raise Exception("ElevatorConfig is immutable")
+        
+        
+    def __eq__(self, other):
+        if (type(other) is not ElevatorConfig):
+            return NotImplemented
+        return self.__astuple() == other.__astuple()
+    
+    
+    def __hash__(self):
+        return hash(self.__astuple())
+    
+    
+    def __repr__(self):
+        return "ElevatorConfig(sec_per_floor={}, min_building_floor={}, max_building_floor={})". \
+            format(*self.__astuple())
+            
+            
+    def __reduce__(self):
+        # the config is pickled and copied through the constructor, since
+        # its attributes cannot be set after it is created
+        return (ElevatorConfig, self.__astuple())
+    
+    
+    def __astuple(self):
+        # the settings in the order of the constructor arguments
+        return (self.sec_per_floor, self.min_building_floor, self.max_building_floor)
+    
+    
+    def replace(self, **changes):
+        # The purpose of this method is to create a new config with some of
+        # the settings changed
+        settings = dict(zip(self.__slots__, self.__astuple()))
+        settings.update(changes)
+        return ElevatorConfig(**settings)
+
+
+def _floors_to_array(desired_floors):
+    # The purpose of this function is to convert the desired floors into a
+    # NumPy integer array without copying integer arrays
+
+    # if the desired floor is an int, make it an array
+    if (isinstance(desired_floors, (int, np.integer)) and not isinstance(desired_floors, bool)):
+        return np.array([desired_floors], dtype=np.int64)
+    # ranges are expanded directly into an array
+    if isinstance(desired_floors, range):
+        return np.arange(desired_floors.start, desired_floors.stop, desired_floors.step,
+                         dtype=np.int64)
+    # otherwise the desired floors must be an array, list or other sequence
+    if (isinstance(desired_floors, (str, bytes)) or 
+        not isinstance(desired_floors, (np.ndarray, collections.abc.Sequence))):
+        raise Exception("desired_floors must be a single floor number (int) or list of floor numbers")
+    
+    floors = np.asarray(desired_floors)
+    if (floors.size == 0):
+        return floors.astype(np.int64)
+    # the floors in the list must be ints
+    if (floors.ndim != 1 or floors.dtype.kind not in "iu"):
+        raise Exception("all floors in list must be an integer")
+    
+    return floors
+
+
+def _validate_trip_floors(start_floor, desired_floors, config):
+    # The purpose of this function is to check that the desired floors are
+    # valid for a trip from the start floor and return the floor checkpoints
+    # of the trip. The caller's floors are not modified
+    
+    desired_floors = _floors_to_array(desired_floors)
+    
+    # at least one floor in the list must be different than the current floor
+    if (np.all(desired_floors == start_floor)):
+        raise Exception("must enter at least one floor that is not the current floor: {}". \
+                        format(start_floor))
+    
+    # desired floors must be at or below the highest building floor
+    if (desired_floors.max() > config.max_building_floor):
+        raise Exception("at least one desired floor is higher than the highest building floor.")
+    
+    # desired floors at or above the lowest building floor
+    if (desired_floors.min() < config.min_building_floor):
+        raise Exception("at least one desired floor is lower than the lowest building floor.")
+    
+    # add the start floor in front of the desired floors to see start -> finish
+    return np.concatenate(([start_floor], desired_floors)).astype(np.int64, copy=False)
+
+
+def _clean_checkpoints(floor_checkpoints):  
+    # The purpose of this function is to remove any consecutive duplicate
+    # floors from the floor checkpoints. This includes the start floor
+    
+    # keep the first floor and every floor that differs from the one before
+    keep = np.empty(floor_checkpoints.size, dtype=bool)
+    keep[0] = True
+    np.not_equal(floor_checkpoints[1:], floor_checkpoints[:-1], out=keep[1:])
+    return floor_checkpoints[keep]
+
+
+def _order_checkpoints(floor_checkpoints, order, config):
+    # The purpose of this function is to reorder the cleaned floor 
+    # checkpoints after the start floor to reduce the travel time
+    
+    ordered_floors = order_stops(floor_checkpoints[0], floor_checkpoints[1:], order,
+                                 config.min_building_floor, config.max_building_floor)
+    return np.concatenate(([floor_checkpoints[0]], ordered_floors)).astype(np.int64)
+
+
+def plan_trip(start_floor, desired_floors, config, order = None):
+    '''
+    Description
+    -----------
+    plan_trip plans a trip from a start floor with the same validation and
+    cleaning rules as Elevator.go_to_floor and returns its TripPlan. It has
+    no side effects and only reads the immutable config, so it can be called
+    from many threads at once with a shared config. Elevator.plan_trip is a
+    wrapper around it using the current floor of the elevator.
+
+    Parameters
+    ----------
+    start_floor : int
+        The floor the trip starts on.
+    desired_floors : int or sequence (list, range, NumPy array) of ints
+        The floor(s) for the elevator to travel to.
+    config : ElevatorConfig
+        The speed and building floors of the elevator.
+    order : str or None, optional
+        Reorders the desired floors before planning the trip, see
+        Elevator.go_to_floor. The default is None.
+
+    Returns
+    -------
+    trip_plan : TripPlan
+        The planned trip. If the floors are reordered, its time_saved and
+        mean_arrival_time_saved hold the saving over the given order.
+    '''
+    
+    if (type(start_floor) is not int or start_floor < config.min_building_floor or
+        start_floor > config.max_building_floor):
+        raise Exception("start floor must be an integer on or within the min/max floors of the building")
+    
+    # confirm that the desired floors are valid
+    floor_checkpoints = _validate_trip_floors(start_floor, desired_floors, config)
+    # clean inputs to remove any sequentially duplicated floors
+    floor_checkpoints = _clean_checkpoints(floor_checkpoints)
+    if (order is None):
+        return TripPlan(floor_checkpoints, config.sec_per_floor)
+    
+    # reorder the stops, keeping the given order to report the time saved
+    given_plan = TripPlan(floor_checkpoints, config.sec_per_floor)
+    trip_plan = TripPlan(_order_checkpoints(floor_checkpoints, order, config), config.sec_per_floor)
+    _set_time_saved(trip_plan, given_plan)
+    
+    return trip_plan
+
+
+def _set_time_saved(trip_plan, given_plan):
+    # The purpose of this function is to keep on a reordered trip plan the
+    # time saved compared with the trip in the given order
+    trip_plan.time_saved = given_plan.total_time - trip_plan.total_time
+    trip_plan.mean_arrival_time_saved = given_plan.mean_arrival_time() - trip_plan.mean_arrival_time()
+
+
+# the stage used by Elevator when profiling is disabled. Stage sizes written
+# to it are ignored
+_NO_PROFILE = contextlib.nullcontext(types.SimpleNamespace(size = None))
+
+
+class TripPlan():
+    '''
+    Description
+    -----------
+    Class to represent a planned elevator trip as a list of legs between
+    floor checkpoints. Only the legs are stored, so the memory and time needed
+    to build a TripPlan grow with the number of stops rather than with the
+    number of simulated seconds. The per-second simulation columns are
+    computed on demand.
+
+    ...
+
+    Attributes
+    ----------
+    sec_per_floor : int or float
+        The speed of the elevator in number of seconds to move one floor.
+    leg_start_floor : ndarray
+        The floor each leg of the trip starts on.
+    leg_end_floor : ndarray
+        The floor each leg of the trip ends on (the destination of the leg).
+    leg_start_time : ndarray
+        The elapsed time in seconds at which each leg starts.
+    leg_duration : ndarray
+        The time in seconds each leg takes.
+    leg_phase : ndarray or None
+        The time in seconds the elevator had already been moving from the
+        start floor of each leg when the leg starts. It is only set by
+        from_legs for trips changed while the elevator was between two
+        floors, and is None otherwise.
+    time_saved : int, float or None
+        The total trip time saved by reordering the desired floors compared
+        with the given order (see plan_trip), or None if they were not 
+        reordered.
+    mean_arrival_time_saved : float or None
+        The saving in the mean time to reach each desired floor from 
+        reordering them, or None if they were not reordered.
+    total_time : int or float
+        The total time in seconds of the trip. It is a float when 
+        sec_per_floor is a float.
+    final_floor : int
+        The floor the elevator is on at the end of the trip.
+    ...
+    
+    Example
+    -------
+    import elevator
+    trip_plan = elevator.TripPlan([1, 3, 2], sec_per_floor = 10)
+    trip_plan.total_time
+    sim_data = trip_plan.to_frame()
+    
+    
+    '''
+    def __init__(self, floor_checkpoints, sec_per_floor):
+        
+        # the checkpoints must already be cleaned so no leg has zero length
+        floor_checkpoints = np.asarray(floor_checkpoints, dtype=np.int64)
+        if (floor_checkpoints.size < 2 or np.any(np.diff(floor_checkpoints) == 0)):
+            raise Exception("floor checkpoints must contain at least two floors and no "
+                            "consecutive duplicate floors")
+        
+        self.sec_per_floor = sec_per_floor
+        self.leg_start_floor = floor_checkpoints[:-1]
+        self.leg_end_floor = floor_checkpoints[1:]
+        self.leg_duration = np.abs(np.diff(floor_checkpoints)) * sec_per_floor
+        self.leg_start_time = np.concatenate(([0], np.cumsum(self.leg_duration)[:-1]))
+        self.total_time = self.leg_start_time[-1] + self.leg_duration[-1]
+        # fractional times are rounded so sampled times fall exactly on the
+        # start of the legs
+        if (self.leg_start_time.dtype.kind == "f"):
+            self.leg_start_time = np.round(self.leg_start_time, 9)
+            self.total_time = float(np.round(self.total_time, 9))
+        else:
+            self.total_time = int(self.total_time)
+        self.final_floor = int(floor_checkpoints[-1])
+        # every leg starts on a floor
+        self.leg_phase = None
+        # set by plan_trip when the floors are reordered
+        self.time_saved = None
+        self.mean_arrival_time_saved = None
+        
+    
+    @classmethod
+    def from_legs(cls, leg_start_floor, leg_end_floor, leg_start_time, sec_per_floor, total_time,
+                  final_floor, leg_phase = None):
+        '''
+        Description
+        -----------
+        from_legs creates a TripPlan from legs that were re-planned while the
+        elevator was moving (see ActiveTrip). A leg may be cut short by the
+        start of the next leg, or by the end of the trip, before reaching
+        its destination. The rows of a cut leg still show the destination
+        of the leg as it was planned. A leg may also start while the
+        elevator is between two floors, in which case its rows show the
+        start floor until the next floor is reached.
+
+        Parameters
+        ----------
+        leg_start_floor, leg_end_floor, leg_start_time : array-like of ints
+            The start floor, destination and start time of each leg. A leg
+            with the same start floor and destination is a wait on that floor.
+        sec_per_floor : int
+            The speed of the elevator in number of seconds to move one floor.
+        total_time : int
+            The time the trip ends.
+        final_floor : int
+            The floor the elevator is on at the end of the trip.
+        leg_phase : array-like of ints or floats, or None, optional
+            The time the elevator had already been moving from the start
+            floor of each leg when it starts, which is less than 
+            sec_per_floor. None if every leg starts on a floor. The default
+            is None.
+
+        Returns
+        -------
+        trip_plan : TripPlan
+            The planned trip.
+        '''
+        
+        trip_plan = cls.__new__(cls)
+        trip_plan.sec_per_floor = sec_per_floor
+        trip_plan.leg_start_floor = np.asarray(leg_start_floor, dtype=np.int64)
+        trip_plan.leg_end_floor = np.asarray(leg_end_floor, dtype=np.int64)
+        trip_plan.leg_start_time = np.asarray(leg_start_time)
+        if (trip_plan.leg_start_time.dtype.kind != "f"):
+            trip_plan.leg_start_time = trip_plan.leg_start_time.astype(np.int64)
+        trip_plan.leg_duration = np.abs(trip_plan.leg_end_floor - trip_plan.leg_start_floor) * sec_per_floor
+        trip_plan.leg_phase = None
+        if (leg_phase is not None and np.any(np.asarray(leg_phase) != 0)):
+            trip_plan.leg_phase = np.asarray(leg_phase)
+            # the part of the first floor already travelled is not left
+            trip_plan.leg_duration = trip_plan.leg_duration - trip_plan.leg_phase
+        # a wait lasts until the next leg starts or the trip ends
+        is_wait = trip_plan.leg_duration == 0
+        trip_plan.leg_duration[is_wait] = (np.append(trip_plan.leg_start_time[1:], total_time) -
+                                           trip_plan.leg_start_time)[is_wait]
+        trip_plan.total_time = total_time
+        trip_plan.final_floor = int(final_floor)
+        trip_plan.time_saved = None
+        trip_plan.mean_arrival_time_saved = None
+        
+        return trip_plan
+    
+    
+    def __len__(self):
+        # the number of rows in the per-second simulation data, including
+        # the final row where the last destination has been reached
+        return math.ceil(self.total_time) + 1
+    
+    
+    def sample_times(self, time_step = 1):
+        '''
+        Description
+        -----------
+        sample_times creates the elapsed times of the rows of the simulation
+        data for a time step. The last time is always the end of the trip.
+
+        Parameters
+        ----------
+        time_step : int, float > 0 or "floors", optional
+            The time in seconds between two rows. With "floors", there is one
+            row each time the elevator reaches a floor instead, so the 
+            number of rows does not depend on sec_per_floor. The default is 1.
+
+        Returns
+        -------
+        times : ndarray
+            The elapsed time of each row.
+        '''
+        
+        if (time_step == "floors"):
+            # the time each leg lasts, which is shorter than its duration if
+            # the leg was cut short (see from_legs)
+            leg_time = np.append(self.leg_start_time[1:], self.total_time) - self.leg_start_time
+            leg_origin = self.leg_start_time
+            if (self.leg_phase is not None):
+                # a leg starting between two floors has a row at its start,
+                # then one row each time it reaches a floor
+                leg_origin = self.leg_start_time - self.leg_phase
+                leg_time = leg_time + self.leg_phase
+            n_rows = np.ceil(leg_time / self.sec_per_floor - 1e-9).astype(np.int64)
+            # a wait on a floor has a single row
+            n_rows[self.leg_start_floor == self.leg_end_floor] = 1
+            floor_in_leg = np.arange(n_rows.sum()) - np.repeat(np.cumsum(n_rows) - n_rows, n_rows)
+            times = np.repeat(leg_origin, n_rows) + floor_in_leg * self.sec_per_floor
+            if (self.leg_phase is not None):
+                times = np.maximum(times, np.repeat(self.leg_start_time, n_rows))
+        elif (type(time_step) in (int, float) and time_step > 0):
+            times = np.arange(math.ceil(self.total_time / time_step)) * time_step
+        else:
+            raise Exception("time_step must be a number greater than 0 or \"floors\"")
+        
+        times = np.append(times, self.total_time)
+        if (times.dtype.kind == "f"):
+            times = np.round(times, 9)
+        
+        return times
+    
+    
+    def get_dtypes(self):
+        '''
+        Description
+        -----------
+        get_dtypes finds the smallest integer dtypes that can hold the floor
+        columns (current_floor, floors_to_next_dest and next_destination) 
+        and the time columns (time_elapsed and time_to_next_dest) of the trip.
+
+        Returns
+        -------
+        floor_dtype : numpy dtype
+            int16, int32 or int64 depending on the floors of the trip.
+        time_dtype : numpy dtype
+            int16, int32 or int64 depending on the total time of the trip,
+            or float64 when sec_per_floor is a float.
+        '''
+        
+        floors = np.concatenate((self.leg_start_floor[:1], self.leg_end_floor))
+        low, high = int(floors.min()), int(floors.max())
+        
+        if (self.leg_start_time.dtype.kind == "f"):
+            return _smallest_int_dtype(min(low, 0), max(high, high - low)), np.dtype(np.float64)
+        return (_smallest_int_dtype(min(low, 0), max(high, high - low)),
+                _smallest_int_dtype(0, self.total_time))
+    
+    
+    def get_columns(self, times, compact = False, exact = False):
+        '''
+        Description
+        -----------
+        get_columns computes the simulation columns for an array of elapsed
+        times. Each value matches the value go_to_floor places in the row
+        for that elapsed time.
+
+        Parameters
+        ----------
+        times : ndarray of ints or floats
+            Elapsed times in seconds within [0, total_time]. Fractional
+            times are rounded down to the whole second unless exact is True.
+        compact : boolean, optional
+            If True, the columns are computed with the smallest integer 
+            dtypes that fit the trip (see get_dtypes) instead of int64.
+            The default is False.
+        exact : boolean, optional
+            If True, fractional times are kept as they are, and the time
+            columns are floats (see sample_times). The default is False.
+
+        Returns
+        -------
+        columns : dict
+            Dictionary of ndarrays keyed by column name (time_elapsed,
+            current_floor, floors_to_next_dest, time_to_next_dest and
+            next_destination), plus an "arrived" boolean mask which is True
+            where the final destination has been reached and the next
+            destination columns have no value.
+        '''
+        
+        # the simulation has one row per second, so fractional times fall in
+        # the row of the whole second before them
+        times = np.asarray(times)
+        if (times.dtype.kind == "f" and not exact):
+            times = np.floor(times).astype(np.int64)
+        if (np.any(times < 0) or np.any(times > self.total_time)):
+            raise Exception("times must be within 0 and the total trip time: {}". \
+                            format(self.total_time))
+        
+        floor_dtype, time_dtype = self.get_dtypes() if compact else (np.int64, np.int64)
+        if (times.dtype.kind == "f" or self.leg_start_time.dtype.kind == "f"):
+            time_dtype = np.float64
+        times = times.astype(time_dtype, copy=False)
+        
+        # find the leg each time falls in. The final time is past the last leg
+        arrived = times == self.total_time
+        leg = np.minimum(np.searchsorted(self.leg_start_time, times, side="right") - 1,
+                         self.leg_start_time.size - 1)
+        # only the legs of the times are gathered and converted to the output
+        # dtypes, so the cost does not grow with the number of legs
+        leg_start_floor = self.leg_start_floor[leg].astype(floor_dtype, copy=False)
+        leg_end_floor = self.leg_end_floor[leg].astype(floor_dtype, copy=False)
+        leg_start_time = self.leg_start_time[leg]
+        leg_end_time = (leg_start_time + self.leg_duration[leg]).astype(time_dtype, copy=False)
+        # a leg starting between two floors is timed from when the elevator
+        # left its start floor
+        if (self.leg_phase is not None):
+            leg_start_time = leg_start_time - self.leg_phase[leg]
+        leg_start_time = leg_start_time.astype(time_dtype, copy=False)
+        
+        # the number of whole floors travelled since the start of the leg.
+        # Fractional times allow for rounding errors on the floor boundaries
+        if (times.dtype.kind == "f"):
+            floors_moved = np.floor((times - leg_start_time) / self.sec_per_floor + 1e-9)
+        else:
+            floors_moved = (times - leg_start_time) // self.sec_per_floor
+        floors_moved = floors_moved.astype(floor_dtype, copy=False)
+        direction = np.sign(leg_end_floor - leg_start_floor)
+        current_floor = np.where(arrived, self.final_floor, leg_start_floor + direction * floors_moved)
+        
+        # the next destination is the end of the leg. The time to reach it is
+        # the time left in the leg
+        next_destination = leg_end_floor
+        floors_to_next_dest = np.abs(next_destination - current_floor)
+        time_to_next_dest = leg_end_time - times
+        if (times.dtype.kind == "f"):
+            time_to_next_dest = np.round(time_to_next_dest, 9)
+        
+        return {
+            "time_elapsed":times,
+            "current_floor":current_floor,
+            "floors_to_next_dest":floors_to_next_dest,
+            "time_to_next_dest":time_to_next_dest,
+            "next_destination":next_destination,
+            "arrived":arrived
+            }
+    
+    
+    def mean_arrival_time(self):
+        '''
+        Description
+        -----------
+        mean_arrival_time computes the mean time to reach each distinct 
+        destination floor of the trip, using the first time the elevator 
+        stops on that floor.
+
+        Returns
+        -------
+        mean_arrival_time : float
+            The mean arrival time in seconds.
+        '''
+        
+        # the index of the first leg ending on each distinct floor
+        floors, first_leg = np.unique(self.leg_end_floor, return_index=True)
+        # the start floor is not a destination unless it was never left
+        first_leg = first_leg[floors != self.leg_start_floor[0]]
+        arrival_time = self.leg_start_time[first_leg] + self.leg_duration[first_leg]
+        
+        return float(arrival_time.mean())
+    
+    
+    def state_at(self, t):
+        '''
+        Description
+        -----------
+        state_at finds the state of the elevator at a single elapsed time
+        without creating the per-second simulation data. The leg containing
+        the time is found with a binary search over the leg start times.
+
+        Parameters
+        ----------
+        t : int or float
+            Elapsed time in seconds within [0, total_time].
+
+        Returns
+        -------
+        state : dict
+            Dictionary with the same keys as the columns of go_to_floor. Once
+            the final floor is reached, floors_to_next_dest, time_to_next_dest
+            and next_destination are None.
+        '''
+        
+        columns = self.state_at_many(np.array([t]))
+        arrived = columns.pop("arrived")[0]
+        
+        state = {name:values[0].item() for name, values in columns.items()}
+        # there is no next destination after the final floor is reached
+        if arrived:
+            for name in ["floors_to_next_dest", "time_to_next_dest", "next_destination"]:
+                state[name] = None
+                
+        return state
+    
+    
+    def state_at_many(self, times):
+        '''
+        Description
+        -----------
+        state_at_many finds the state of the elevator for an array of elapsed
+        times in bulk using a binary search over the leg start times.
+
+        Parameters
+        ----------
+        times : array-like of ints or floats
+            Elapsed times in seconds within [0, total_time]. Fractional
+            times are rounded down to the whole second unless sec_per_floor
+            is a float.
+
+        Returns
+        -------
+        columns : dict
+            Dictionary of ndarrays, see get_columns.
+        '''
+        
+        # the times of trips with fractional speeds are not rounded down to
+        # the whole second
+        return self.get_columns(times, exact = self.leg_start_time.dtype.kind == "f")
+    
+    
+    def to_frame(self, compact = False, time_step = 1):
+        '''
+        Description
+        -----------
+        to_frame expands the trip legs into the per-second simulation
+        DataFrame returned by Elevator.go_to_floor.
+
+        Parameters
+        ----------
+        compact : boolean, optional
+            If True, the columns use the smallest integer dtypes that fit the
+            trip, see get_columns. The default is False.
+        time_step : int, float > 0 or "floors", optional
+            The time between two rows, see sample_times. The default is 1.
+
+        Returns
+        -------
+        sim_data : DataFrame
+            DataFrame containing all the elevator simulation data, with one
+            row per second of the trip. See Elevator.go_to_floor for the
+            description of the columns.
+        '''
+        
+        return _frame_from_columns(self.get_columns(self.sample_times(time_step), compact, True))
+
+
+class ActiveTrip():
+    '''
+    Description
+    -----------
+    Class to represent a trip that is changed while the elevator is moving.
+    Stops can be added or cancelled at any time of the trip with add_stop
+    and cancel_stop. Only the legs after the change are re-planned: the legs
+    travelled before it are kept as they are, so the time taken by a change
+    depends on the number of stops still to be visited and not on the
+    length of the trip so far.
+    
+    The elevator cannot turn around between floors, so a change made
+    while it is between two floors re-plans the trip from the next floor
+    it reaches, but the rows from the time of the change already show the
+    new next destination. A leg that is cut short by a change keeps the
+    destination it was planned with in the rows before the change. If a
+    change is made after the trip ended, the elevator waits on its final
+    floor until the time of the change.
+
+    ...
+
+    Attributes
+    ----------
+    elevator : Elevator
+        The elevator making the trip. Its current_floor is updated to the
+        floor reached at the time of every change, and to the final floor
+        when the trip is finished.
+    now : int or float
+        The time of the last change. Changes cannot be made before it.
+    total_time : int
+        The time the trip ends with the stops planned so far.
+    final_floor : int
+        The floor the trip ends on with the stops planned so far.
+    ...
+    
+    Example
+    -------
+    import elevator
+    elev = elevator.Elevator(1, 10)
+    trip = elev.start_trip([10])
+    trip.add_stop(5, at_time = 25)
+    trip.cancel_stop(10, at_time = 32)
+    sim_data = trip.to_frame()
+    trip.finish()
+    
+    
+    '''
+    def __init__(self, elev, trip_plan):
+        
+        self.elevator = elev
+        self.now = 0
+        self.total_time = trip_plan.total_time
+        self.final_floor = trip_plan.final_floor
+        self.__sec_per_floor = trip_plan.sec_per_floor
+        self.__leg_start_floor = trip_plan.leg_start_floor.tolist()
+        self.__leg_end_floor = trip_plan.leg_end_floor.tolist()
+        self.__leg_start_time = trip_plan.leg_start_time.tolist()
+        self.__leg_phase = [0] * len(self.__leg_start_time) if trip_plan.leg_phase is None \
+            else trip_plan.leg_phase.tolist()
+        self.__plan = trip_plan
+        
+        
+    def __floor_at(self, t):
+        # The purpose of this method is to find the floor shown in the row
+        # of the simulation data at time t
+        
+        if (t >= self.total_time):
+            return self.final_floor
+        leg = bisect.bisect_right(self.__leg_start_time, t) - 1
+        start_floor, end_floor = self.__leg_start_floor[leg], self.__leg_end_floor[leg]
+        direction = (end_floor > start_floor) - (end_floor < start_floor)
+        elapsed = t - self.__leg_start_time[leg] + self.__leg_phase[leg]
+        
+        return start_floor + direction * int(elapsed // self.__sec_per_floor)
+        
+        
+    def __split(self, t):
+        # The purpose of this method is to find where the trip can change
+        # after time t: the number of legs kept, the time and floor the 
+        # elevator is next on a floor, and the stops still to be visited
+        
+        # once the trip has ended, the elevator can leave right away
+        if (t >= self.total_time):
+            return len(self.__leg_start_time), max(math.ceil(t), self.total_time), self.final_floor, []
+        
+        leg = bisect.bisect_right(self.__leg_start_time, t) - 1
+        start_floor, end_floor = self.__leg_start_floor[leg], self.__leg_end_floor[leg]
+        # a leg starting between two floors is timed from when the elevator
+        # left its start floor
+        start_time = self.__leg_start_time[leg] - self.__leg_phase[leg]
+        direction = (end_floor > start_floor) - (end_floor < start_floor)
+        # the next time the moving elevator is on a floor
+        floors_moved = math.ceil((t - start_time) / self.__sec_per_floor) if direction else 0
+        split_time = start_time + floors_moved * self.__sec_per_floor if direction else math.ceil(t)
+        split_floor = start_floor + direction * floors_moved
+        
+        # legs starting at or after the split are re-planned
+        n_kept = bisect.bisect_left(self.__leg_start_time, split_time)
+        pending_stops = self.__leg_end_floor[n_kept:]
+        # the leg the elevator is on when the trip changes is cut short, and 
+        # its destination is still to be visited unless it was already cut
+        if (n_kept > 0):
+            last = n_kept - 1
+            planned_end = self.__leg_start_time[last] - self.__leg_phase[last] + \
+                abs(self.__leg_end_floor[last] - self.__leg_start_floor[last]) * self.__sec_per_floor
+            actual_end = self.__leg_start_time[n_kept] if n_kept < len(self.__leg_start_time) \
+                else self.total_time
+            if (planned_end > split_time and actual_end == planned_end):
+                pending_stops = [self.__leg_end_floor[last]] + pending_stops
+                
+        return n_kept, split_time, split_floor, pending_stops
+    
+    
+    def __add_leg(self, start_floor, end_floor, start_time, phase = 0):
+        # The purpose of this method is to add a leg at the end of the trip
+        self.__leg_start_floor.append(start_floor)
+        self.__leg_end_floor.append(end_floor)
+        self.__leg_start_time.append(start_time)
+        self.__leg_phase.append(phase)
+        
+        
+    def __replan(self, at_time, change_stops, order):
+        # The purpose of this method is to change the stops still to be
+        # visited after at_time and re-plan the legs to them
+        
+        if (type(at_time) not in (int, float) or at_time < self.now):
+            raise Exception("at_time must be a number no earlier than the last change: {}". \
+                            format(self.now))
+        
+        n_kept, split_time, split_floor, pending_stops = self.__split(at_time)
+        pending_stops = change_stops(pending_stops)
+        if (order is not None and pending_stops):
+            pending_stops = order_stops(split_floor, pending_stops, order,
+                                        self.elevator.min_building_floor,
+                                        self.elevator.max_building_floor)
+        # remove consecutive duplicate stops, including the floor the
+        # elevator is on
+        stops = []
+        for floor in pending_stops:
+            if (floor != (stops[-1] if stops else split_floor)):
+                stops.append(floor)
+        
+        ##############################
+        ## Re-plan the legs         ##
+        ##############################
+        # a change made between two floors starts a new leg at the time of
+        # the change, which carries on to the next floor without turning
+        # around. Whole-second speeds keep whole-second leg start times
+        change_time = at_time if type(self.__sec_per_floor) is float else math.ceil(at_time)
+        from_floor = self.__floor_at(change_time)
+        between_floors = change_time < split_time and from_floor != split_floor
+        if between_floors:
+            n_kept = bisect.bisect_left(self.__leg_start_time, change_time)
+        del self.__leg_start_floor[n_kept:]
+        del self.__leg_end_floor[n_kept:]
+        del self.__leg_start_time[n_kept:]
+        del self.__leg_phase[n_kept:]
+        if between_floors:
+            # the elevator goes straight on to the first stop if it is past
+            # the next floor in the same direction
+            direction = split_floor - from_floor
+            end_floor = stops.pop(0) if (stops and (stops[0] - split_floor) * direction > 0) \
+                else split_floor
+            self.__add_leg(from_floor, end_floor, change_time,
+                           change_time - (split_time - self.__sec_per_floor))
+            self.total_time = split_time + abs(end_floor - split_floor) * self.__sec_per_floor
+            self.final_floor = end_floor
+        else:
+            # wait on the final floor when a stop is added after the trip ended
+            if (stops and split_time > self.total_time):
+                self.__add_leg(self.final_floor, self.final_floor, self.total_time)
+            if (stops or split_time < self.total_time):
+                self.total_time, self.final_floor = split_time, split_floor
+        for floor in stops:
+            self.__add_leg(self.final_floor, floor, self.total_time)
+            self.total_time += abs(floor - self.final_floor) * self.__sec_per_floor
+            self.final_floor = floor
+        # a trip whose stops are all cancelled before the elevator leaves is
+        # a single row on the floor it is on
+        if (not self.__leg_start_time):
+            self.__add_leg(self.final_floor, self.final_floor, self.total_time)
+        
+        self.now = at_time
+        self.__plan = None
+        self.elevator.current_floor = self.__floor_at(at_time)
+        
+        
+    def pending_stops(self, at_time):
+        '''
+        Description
+        -----------
+        pending_stops finds the stops the elevator still has to visit after
+        the given time.
+
+        Parameters
+        ----------
+        at_time : int or float
+            Elapsed time in seconds.
+
+        Returns
+        -------
+        pending_stops : list of ints
+            The stops still to be visited, in order.
+        '''
+        
+        return self.__split(at_time)[3]
+    
+    
+    def add_stop(self, floor, at_time, index = None, order = None):
+        '''
+        Description
+        -----------
+        add_stop adds a stop to the trip at the given time and re-plans the
+        rest of the trip.
+
+        Parameters
+        ----------
+        floor : int
+            The floor to stop on.
+        at_time : int or float
+            The elapsed time in seconds the stop is added. It cannot be
+            earlier than the last change.
+        index : int or None, optional
+            Where the stop is inserted in the pending stops (see 
+            pending_stops). If None, it is visited after the pending stops.
+            The default is None.
+        order : str or None, optional
+            Reorders the pending stops after adding the stop, see 
+            order_stops. The default is None.
+        '''
+        
+        if (type(floor) is not int or floor < self.elevator.min_building_floor or
+            floor > self.elevator.max_building_floor):
+            raise Exception("floor must be an integer on or within the min/max floors of the building")
+        
+        def change_stops(pending_stops):
+            pending_stops.insert(len(pending_stops) if index is None else index, floor)
+            return pending_stops
+        
+        self.__replan(at_time, change_stops, order)
+        
+        
+    def cancel_stop(self, floor, at_time, order = None):
+        '''
+        Description
+        -----------
+        cancel_stop removes the next pending visit to a floor at the given
+        time and re-plans the rest of the trip. If no stops are left, the
+        elevator stops on the next floor it reaches.
+
+        Parameters
+        ----------
+        floor : int
+            The floor of the stop to cancel.
+        at_time : int or float
+            The elapsed time in seconds the stop is cancelled. It cannot be
+            earlier than the last change.
+        order : str or None, optional
+            Reorders the pending stops after cancelling the stop, see 
+            order_stops. The default is None.
+        '''
+        
+        def change_stops(pending_stops):
+            if (floor not in pending_stops):
+                raise Exception("floor {} is not a pending stop".format(floor))
+            pending_stops.remove(floor)
+            return pending_stops
+        
+        self.__replan(at_time, change_stops, order)
+        
+        
+    def plan(self):
+        # The purpose of this method is to get the TripPlan of the whole
+        # trip, which is only rebuilt after a change
+        
+        if (self.__plan is None):
+            self.__plan = TripPlan.from_legs(self.__leg_start_floor, self.__leg_end_floor,
+                                             self.__leg_start_time, self.__sec_per_floor,
+                                             self.total_time, self.final_floor, self.__leg_phase)
+        return self.__plan
+    
+    
+    def state_at(self, t):
+        # The purpose of this method is to find the state of the elevator at
+        # time t of the trip, see TripPlan.state_at
+        return self.plan().state_at(t)
+    
+    
+    def to_frame(self, compact = False):
+        # The purpose of this method is to create the per-second simulation
+        # DataFrame of the whole trip, see TripPlan.to_frame
+        return self.plan().to_frame(compact)
+    
+    
+    def finish(self):
+        # The purpose of this method is to move the elevator to the final
+        # floor of the trip once no more changes will be made
+        self.elevator.current_floor = self.final_floor
+        return self.plan()
+
+
+OUTPUTS = ["pandas", "numpy", "dict"]
+
+
+def _smallest_int_dtype(low, high):
+    # The purpose of this function is to find the smallest integer dtype
+    # (int16 or larger) that holds every value from low to high
+    for dtype in (np.int16, np.int32):
+        if (np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max):
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def _frame_from_columns(columns, copy = True):
+    # The purpose of this function is to create the simulation dataframe 
+    # from the columns computed by TripPlan.get_columns. pandas is only
+    # imported here since importing it is slow and many callers never
+    # need a dataframe. With copy=False the dataframe uses the column
+    # arrays as they are, so read-only arrays give a read-only dataframe
+    import pandas as pd
+    
+    columns = dict(columns)
+    arrived = columns.pop("arrived")
+    
+    # the next destination columns have no value once the final floor
+    # is reached, so they use nullable integer arrays
+    for name in ["floors_to_next_dest", "time_to_next_dest", "next_destination"]:
+        array_type = pd.arrays.FloatingArray if columns[name].dtype.kind == "f" else pd.arrays.IntegerArray
+        columns[name] = array_type(columns[name], arrived)
+    
+    return pd.DataFrame(columns, copy = copy)
+
+
+def _build_output(columns, output, copy = True):
+    # The purpose of this function is to create the simulation data in the
+    # requested output format from the computed columns
+    
+    if (output == "dict"):
+        return columns
+    if (output == "numpy"):
+        sim_data = np.empty(columns["arrived"].size,
+                            dtype=[(name, values.dtype) for name, values in columns.items()])
+        for name, values in columns.items():
+            sim_data[name] = values
+        return sim_data
+    
+    return _frame_from_columns(columns, copy)
+
+
+ORDERS = ["look", "scan", "optimal"]
+
+# the largest number of stops the exact "optimal" ordering is computed for
+MAX_OPTIMAL_STOPS = 200
+
+
+def _look_order(start_floor, below, above, direction, turn_floor = None):
+    # The purpose of this function is to sweep through the stops in the
+    # given direction first and then reverse. If turn_floor is given the
+    # elevator travels to it before reversing (SCAN)
+    
+    first, second = (above, below) if direction > 0 else (below, above)
+    if (turn_floor is not None and second and (not first or first[-1] != turn_floor)):
+        first = first + [turn_floor]
+    
+    return first + second
+
+
+def _optimal_order(start_floor, below, above):
+    # The purpose of this function is to find the order of the stops that
+    # minimizes the sum of the arrival times at the stops, breaking ties on
+    # the total travel time. Passing a stop without stopping never helps, so
+    # the visited stops always form an interval around the start floor and
+    # the interval can be solved with dynamic programming in O(n^2)
+    
+    n_below, n_above = len(below), len(above)
+    n_stops = n_below + n_above
+    # cost[(i, j, side)] is the (arrival time sum, travel) in floors after
+    # visiting the i nearest stops below and j nearest stops above, ending
+    # below (side 0) or above (side 1)
+    cost = {(0, 0, 0):(0, 0)}
+    parent = {}
+    for visited in range(n_stops):
+        for i in range(max(0, visited - n_above), min(visited, n_below) + 1):
+            j = visited - i
+            for side in (0, 1):
+                if (i, j, side) not in cost:
+                    continue
+                position = start_floor if visited == 0 else (below[i - 1] if side == 0 else above[j - 1])
+                latency, travel = cost[(i, j, side)]
+                remaining = n_stops - visited
+                # visit the next stop below or above
+                for state, floor in [((i + 1, j, 0), below[i] if i < n_below else None),
+                                     ((i, j + 1, 1), above[j] if j < n_above else None)]:
+                    if floor is None:
+                        continue
+                    distance = abs(floor - position)
+                    candidate = (latency + distance * remaining, travel + distance)
+                    if (state not in cost or candidate < cost[state]):
+                        cost[state] = candidate
+                        parent[state] = (i, j, side)
+    
+    # walk back from the cheaper final state
+    state = min([x for x in [(n_below, n_above, 0), (n_below, n_above, 1)] if x in cost],
+                key = lambda x: cost[x])
+    order = []
+    while state != (0, 0, 0):
+        i, j, side = state
+        order.append(below[i - 1] if side == 0 else above[j - 1])
+        state = parent[state]
+    
+    return order[::-1]
+
+
+def order_stops(start_floor, desired_floors, order, min_building_floor = None,
+                max_building_floor = None):
+    '''
+    Description
+    -----------
+    order_stops reorders the desired floors of a trip to reduce the travel
+    time. Since the floors are reordered, each floor is only visited once and
+    floors equal to the start floor are dropped.
+        - look: travels in the direction of the first desired floor, stopping
+            at every desired floor on the way, then reverses for the rest.
+        - scan: same as look, but travels to the end of the building before
+            reversing.
+        - optimal: minimizes the mean time to reach each desired floor (and 
+            then the total travel time) exactly for up to MAX_OPTIMAL_STOPS 
+            floors. Longer lists fall back to look.
+
+    Parameters
+    ----------
+    start_floor : int
+        The floor the elevator starts on.
+    desired_floors : list or array of ints
+        The floor(s) for the elevator to travel to.
+    order : str
+        One of "look", "scan" or "optimal".
+    min_building_floor : int, optional
+        The lowest floor of the building. Required for "scan".
+    max_building_floor : int, optional
+        The highest floor of the building. Required for "scan".
+
+    Returns
+    -------
+    ordered_floors : list of ints
+        The desired floors in the order they should be visited.
+    '''
+    
+    if (order not in ORDERS):
+        raise Exception("order must be one of {}".format(ORDERS))
+    
+    # the stops below the start floor from nearest to furthest, and above
+    desired_floors = np.asarray(desired_floors, dtype=np.int64)
+    stops = np.unique(desired_floors)
+    below = stops[stops < start_floor][::-1].tolist()
+    above = stops[stops > start_floor].tolist()
+    # the direction of the first desired floor is kept for look and scan
+    moving = np.flatnonzero(desired_floors != start_floor)
+    direction = desired_floors[moving[0]] - start_floor if moving.size else 1
+    
+    if (order == "optimal" and len(below) + len(above) <= MAX_OPTIMAL_STOPS):
+        return _optimal_order(start_floor, below, above)
+    if (order == "scan"):
+        if (min_building_floor is None or max_building_floor is None):
+            raise Exception("the building floors are required for the scan order")
+        turn_floor = max_building_floor if direction > 0 else min_building_floor
+        return _look_order(start_floor, below, above, direction, turn_floor)
+    
+    return _look_order(start_floor, below, above, direction)
+
+
+def _batch_checkpoints(start_floors, itineraries, min_building_floor, max_building_floor):
+    # The purpose of this function is to validate the start floors and 
+    # itineraries of a batch of trips and join them into one flat array of
+    # floor checkpoints, with the start floor of each trip in front of its
+    # desired floors. The trip of each checkpoint and a mask of the start
+    # floors are also returned
+    
+    start_floors = np.asarray(start_floors)
+    # convert a list of itineraries into offsets and a flat floor array
+    if (type(itineraries) is tuple):
+        offsets, floors = (np.asarray(x) for x in itineraries)
+    else:
+        counts = [len(itinerary) for itinerary in itineraries]
+        offsets = np.concatenate(([0], np.cumsum(counts, dtype=np.int64)))
+        floors = np.asarray([floor for itinerary in itineraries for floor in itinerary])
+        
+    n_trips = start_floors.size
+    if (start_floors.ndim != 1 or offsets.shape != (n_trips + 1,)):
+        raise Exception("there must be one itinerary for each start floor")
+    if (floors.size and floors.dtype.kind not in "iu") or \
+        (start_floors.size and start_floors.dtype.kind not in "iu"):
+        raise Exception("all floors must be integers")
+    # empty lists of floors are floats, so the floors are made integers
+    start_floors = start_floors.astype(np.int64, copy=False)
+    floors = floors.astype(np.int64, copy=False)
+    if (floors.size != offsets[-1] or np.any(np.diff(offsets) < 0)):
+        raise Exception("itinerary offsets must be increasing and end at the number of floors")
+    if (np.any(floors > max_building_floor) or np.any(start_floors > max_building_floor)):
+        raise Exception("at least one floor is higher than the highest building floor.")
+    if (np.any(floors < min_building_floor) or np.any(start_floors < min_building_floor)):
+        raise Exception("at least one floor is lower than the lowest building floor.")
+    
+    # add the start floor of each trip in front of its desired floors
+    counts = np.diff(offsets) + 1
+    checkpoint_trip = np.repeat(np.arange(n_trips), counts)
+    checkpoints = np.empty(counts.sum(), dtype=np.int64)
+    is_first = np.zeros(checkpoints.size, dtype=bool)
+    is_first[offsets[:-1] + np.arange(n_trips)] = True
+    checkpoints[is_first] = start_floors
+    checkpoints[~is_first] = floors
+    
+    return checkpoints, checkpoint_trip, is_first
+
+
+def _validate_batch_speed(sec_per_floor):
+    # The purpose of this function is to verify that the speed of a batch
+    # is a number greater than 0, with the same rules as ElevatorConfig
+    if (type(sec_per_floor) not in (int, float) or sec_per_floor <= 0):
+        raise Exception("sec_per_floor must be a number greater than 0")
+
+
+def simulate_batch(start_floors, itineraries, sec_per_floor = 10, min_building_floor = 1,
+                   max_building_floor = 20, output = "pandas", compact = False):
+    '''
+    Description
+    -----------
+    simulate_batch runs the go_to_floor simulation for many independent
+    trips at once using batched NumPy operations instead of one go_to_floor
+    call per trip. The same validation and cleaning rules as go_to_floor
+    are applied to every trip.
+
+    Parameters
+    ----------
+    start_floors : array-like of ints
+        The current floor of the elevator at the start of each trip.
+    itineraries : list of lists of ints or tuple of (offsets, floors)
+        The desired floors of each trip. Either a list containing the list
+        of desired floors for each trip, or a ragged array given as a tuple
+        of offsets and a flat array of floors, where the desired floors of
+        trip i are floors[offsets[i]:offsets[i + 1]].
+    sec_per_floor : int or float > 0, optional
+        The speed of the elevator in number of seconds to move one floor.
+        With a fractional speed, the time columns are floats and the last
+        row of each trip is at its end, as with go_to_floor. The default 
+        is 10.
+    min_building_floor : int, optional
+        The lowest floor of the building. The default is 1.
+    max_building_floor : int, optional
+        The highest floor of the building. The default is 20.
+    output : str, optional
+        The format of the simulation data, see Elevator.go_to_floor.
+        The default is "pandas".
+    compact : boolean, optional
+        If True, the columns use the smallest integer dtypes that fit the
+        building floors and longest trip, see Elevator.go_to_floor. 
+        The default is False.
+
+    Returns
+    -------
+    sim_data : DataFrame, structured ndarray or dict
+        Long format DataFrame containing the simulation data of every trip.
+        The trip_id column holds the position of the trip in start_floors
+        and the remaining columns are the same as the go_to_floor columns.
+        The rows of each trip are the rows go_to_floor would return for it.
+    '''
+    
+    ###############################
+    ## Validate and clean inputs ##
+    ###############################
+    _validate_batch_speed(sec_per_floor)
+    if (output not in OUTPUTS):
+        raise Exception("output must be one of {}".format(OUTPUTS))
+    
+    checkpoints, checkpoint_trip, is_first = \
+        _batch_checkpoints(start_floors, itineraries, min_building_floor, max_building_floor)
+    n_trips = int(is_first.sum())
+    # an empty batch has the usual columns without any rows
+    if (n_trips == 0):
+        columns = {name:np.zeros(0, dtype=np.int64) for name in
+                   ["trip_id", "time_elapsed", "current_floor", "floors_to_next_dest",
+                    "time_to_next_dest", "next_destination"]}
+        if (type(sec_per_floor) is float):
+            for name in ["time_elapsed", "time_to_next_dest"]:
+                columns[name] = np.zeros(0)
+        columns["arrived"] = np.zeros(0, dtype=bool)
+        return _build_output(columns, output)
+    
+    # remove any consecutively duplicated floors within each trip
+    keep = is_first.copy()
+    keep[1:] |= checkpoints[1:] != checkpoints[:-1]
+    checkpoints = checkpoints[keep]
+    checkpoint_trip = checkpoint_trip[keep]
+    
+    # at least one floor of each trip must be different than its start floor
+    is_last = np.ones(checkpoints.size, dtype=bool)
+    is_last[:-1] = checkpoint_trip[1:] != checkpoint_trip[:-1]
+    if (np.any(np.bincount(checkpoint_trip, minlength=n_trips) < 2)):
+        raise Exception("every trip must have at least one floor that is not its start floor")
+    
+    ###############################
+    ## Calculate simulation data ##
+    ###############################
+    # every checkpoint starts a leg to the next checkpoint of the trip, except
+    # the last checkpoint which only has the single row where the trip ends
+    next_checkpoint = np.append(checkpoints[1:], 0)
+    floors_in_leg = np.where(is_last, 0, np.abs(next_checkpoint - checkpoints))
+    leg_duration = floors_in_leg * sec_per_floor
+    direction = np.where(is_last, 0, np.sign(next_checkpoint - checkpoints))
+    
+    # the time each leg starts and ends within its trip
+    elapsed = np.cumsum(leg_duration) - leg_duration
+    trip_start = elapsed[np.flatnonzero(np.append(True, is_last[:-1]))]
+    leg_start_time = elapsed - trip_start[checkpoint_trip]
+    leg_end_time = leg_start_time + leg_duration
+    if (type(sec_per_floor) is float):
+        # with a fractional speed the legs do not start on whole seconds, so
+        # the rows of a leg are the whole seconds within it. The times are
+        # rounded like the times of TripPlan
+        leg_start_time = np.round(leg_start_time, 9)
+        leg_end_time = np.round(leg_end_time, 9)
+        first_row_time = np.ceil(leg_start_time)
+        n_rows = np.where(is_last, 1, np.ceil(leg_end_time) - first_row_time).astype(np.int64)
+    else:
+        first_row_time = leg_start_time
+        n_rows = np.where(is_last, 1, leg_duration)
+    
+    # expand the legs into one row per second
+    leg = np.repeat(np.arange(checkpoints.size), n_rows)
+    row_start = np.cumsum(n_rows) - n_rows
+    time_elapsed = first_row_time[leg] + (np.arange(leg.size) - row_start[leg])
+    arrived = is_last[leg]
+    
+    if (type(sec_per_floor) is float):
+        # the last row of a trip is at its end, which may not be a whole
+        # second. Fractional times allow for rounding errors on the floor
+        # boundaries
+        time_elapsed = np.where(arrived, leg_start_time[leg], time_elapsed)
+        floors_moved = np.floor((time_elapsed - leg_start_time[leg]) / sec_per_floor + 1e-9). \
+            astype(np.int64)
+        time_to_next_dest = np.round(leg_end_time[leg] - time_elapsed, 9)
+    else:
+        floors_moved = (time_elapsed - leg_start_time[leg]) // sec_per_floor
+        time_to_next_dest = leg_end_time[leg] - time_elapsed
+    current_floor = checkpoints[leg] + direction[leg] * floors_moved
+    next_destination = next_checkpoint[leg]
+    floors_to_next_dest = np.abs(next_destination - current_floor)
+    
+    ############################
+    ## Construct the output   ##
+    ############################
+    columns = {
+        "trip_id":checkpoint_trip[leg],
+        "time_elapsed":time_elapsed,
+        "current_floor":current_floor,
+        "floors_to_next_dest":floors_to_next_dest,
+        "time_to_next_dest":time_to_next_dest,
+        "next_destination":next_destination,
+        "arrived":arrived
+        }
+    if compact:
+        floor_dtype = _smallest_int_dtype(min(min_building_floor, 0),
+                                          max(max_building_floor, max_building_floor - min_building_floor))
+        dtypes = {"trip_id":_smallest_int_dtype(0, n_trips)}
+        # fractional time columns stay floats
+        if (type(sec_per_floor) is int):
+            dtypes["time_elapsed"] = dtypes["time_to_next_dest"] = \
+                _smallest_int_dtype(0, int(leg_end_time.max()))
+        for name in ["current_floor", "floors_to_next_dest", "next_destination"]:
+            dtypes[name] = floor_dtype
+        for name, dtype in dtypes.items():
+            columns[name] = columns[name].astype(dtype)
+    
+    return _build_output(columns, output)
+
+
+def summarize_batch(start_floors, itineraries, sec_per_floor = 10, min_building_floor = 1,
+                    max_building_floor = 20):
+    '''
+    Description
+    -----------
+    summarize_batch computes the totals of Elevator.trip_summary for many
+    independent trips at once with batched NumPy operations. The trips are
+    validated the same way as simulate_batch and no per-second data is
+    created.
+
+    Parameters
+    ----------
+    start_floors, itineraries, sec_per_floor, min_building_floor, max_building_floor
+        See simulate_batch.
+
+    Returns
+    -------
+    summaries : dict
+        Dictionary of ndarrays with one value per trip for total_time,
+        floors_traveled and final_floor. arrival_times holds the time each
+        desired floor is reached as a flat array in the order of the floors
+        of the itineraries, and offsets locates the arrival times of each
+        trip: the arrival times of trip i are 
+        arrival_times[offsets[i]:offsets[i + 1]].
+    '''
+    
+    _validate_batch_speed(sec_per_floor)
+    checkpoints, checkpoint_trip, is_first = \
+        _batch_checkpoints(start_floors, itineraries, min_building_floor, max_building_floor)
+    n_trips = int(is_first.sum())
+    
+    # the floors moved to reach each checkpoint from the one before it. The
+    # start floors are reached without moving
+    floors_moved = np.zeros(checkpoints.size, dtype=np.int64)
+    floors_moved[1:] = np.abs(np.diff(checkpoints))
+    floors_moved[is_first] = 0
+    floors_traveled = np.bincount(checkpoint_trip, floors_moved, minlength=n_trips).astype(np.int64)
+    if (np.any(floors_traveled == 0)):
+        raise Exception("every trip must have at least one floor that is not its start floor")
+    
+    # the running total of floors moved within each trip
+    cumulative_floors = np.cumsum(floors_moved)
+    cumulative_floors -= (cumulative_floors - floors_moved)[is_first][checkpoint_trip]
+    # the last checkpoint of each trip. An empty batch has no checkpoints
+    is_last = np.append(is_first[1:], True)[:checkpoints.size]
+    counts = np.bincount(checkpoint_trip, minlength=n_trips) - 1
+    
+    return {
+        "total_time":floors_traveled * sec_per_floor,
+        "floors_traveled":floors_traveled,
+        "final_floor":checkpoints[is_last],
+        "arrival_times":cumulative_floors[~is_first] * sec_per_floor,
+        "offsets":np.concatenate(([0], np.cumsum(counts)))
+        }
+
+
+def _playback_steps(sim_data, sim_speed, stream, clock):
+    # The purpose of this generator is to play the simulation data for
+    # play_live_sim and play_live_sim_async. It yields the number of seconds
+    # to pause before the next row is due so the caller can sleep with either
+    # time.sleep or asyncio.sleep, and returns the playback statistics. Each
+    # row is due at its elapsed time, so any time step can be played
+    
+    stream = sys.stdout if stream is None else stream
+    interval = 1 / sim_speed
+    columns = {name:sim_data[name].tolist() for name in ["time_elapsed", "current_floor",
+                                                         "floors_to_next_dest",
+                                                         "time_to_next_dest",
+                                                         "next_destination"]}
+    n_rows = len(columns["time_elapsed"])
+    # the time each row is due, relative to the start of the playback
+    due_times = [x * interval for x in columns["time_elapsed"]]
+    
+    def render(start, stop):
+        # format the rows of a block into the text printed for each of them
+        return ["elapsed time: {}sec | current floor: {} | next destination: {}\n"
+                "floors to next destination: {} | time to next destination: {}sec\n\n". \
+                format(*values) for values in zip(columns["time_elapsed"][start:stop],
+                                                  columns["current_floor"][start:stop],
+                                                  columns["next_destination"][start:stop],
+                                                  columns["floors_to_next_dest"][start:stop],
+                                                  columns["time_to_next_dest"][start:stop])]
+    
+    frames_shown = 0
+    frames_skipped = 0
+    start_time = clock()
+    
+    # rows are formatted in blocks so the playback starts without formatting
+    # the entire simulation first
+    block_size = 1024
+    for block_start in range(0, n_rows - 1, block_size):
+        block = render(block_start, min(block_start + block_size, n_rows - 1))
+        for i, frame in enumerate(block, block_start):
+            deadline = start_time + due_times[i]
+            # skip the row if the next row is already due
+            if (clock() >= start_time + due_times[i + 1]):
+                frames_skipped += 1
+                continue
+            remaining = deadline - clock()
+            if (remaining > 0):
+                yield remaining
+            stream.write(frame)
+            stream.flush()
+            frames_shown += 1
+    
+    # when the final floor is reached
+    remaining = start_time + due_times[-1] - clock()
+    if (remaining > 0):
+        yield remaining
+    stream.write("elapsed time: {}sec | current floor: {}\nFinal destination reached.\n". \
+                 format(columns["time_elapsed"][-1], columns["current_floor"][-1]))
+    stream.flush()
+    frames_shown += 1
+    
+    wall_time = clock() - start_time
+    return {
+        "requested_speed":sim_speed,
+        "achieved_speed":columns["time_elapsed"][-1] / wall_time if wall_time > 0 else float("inf"),
+        "frames_shown":frames_shown,
+        "frames_skipped":frames_skipped,
+        "wall_time":wall_time
+        }
+
+
+def play_live_sim(sim_data, sim_speed, stream = None, clock = time.monotonic, sleep = time.sleep):
+    '''
+    Description
+    -----------
+    play_live_sim prints the simulation data to the console as the elevator
+    moves between floors, showing one row per time increment at the requested
+    simulation speed. Each row is scheduled against a deadline on a monotonic
+    clock, so the time spent formatting and printing rows does not add up over
+    the playback. Rows are formatted in blocks ahead of time, and when the
+    playback falls behind, rows whose next row is already due are skipped. The
+    final row is always printed.
+
+    Parameters
+    ----------
+    sim_data : DataFrame, structured ndarray or dict
+        The simulation data returned by go_to_floor.
+    sim_speed : int or float > 0
+        The speed of the simulation relative to a 1 second time increment.
+    stream : file-like, optional
+        Where the rows are written. The default is sys.stdout.
+    clock : callable, optional
+        Function returning the current time of a monotonic clock in seconds.
+        The default is time.monotonic.
+    sleep : callable, optional
+        Function pausing for a number of seconds. The default is time.sleep.
+
+    Returns
+    -------
+    playback_stats : dict
+        Dictionary with the statistics of the playback:
+            - requested_speed: the requested simulation speed.
+            - achieved_speed: the simulated seconds played per wall clock second.
+            - frames_shown: the number of rows printed.
+            - frames_skipped: the number of rows skipped to keep up.
+            - wall_time: the wall clock time of the playback in seconds.
+    '''
+    
+    steps = _playback_steps(sim_data, sim_speed, stream, clock)
+    try:
+        while True:
+            sleep(next(steps))
+    except StopIteration as stop:
+        return stop.value
+
+
+async def play_live_sim_async(sim_data, sim_speed, stream = None, clock = time.monotonic):
+    '''
+    Description
+    -----------
+    play_live_sim_async is the asyncio version of play_live_sim. It pauses
+    with asyncio.sleep instead of time.sleep, so many simulations can be
+    played side by side on one event loop.
+
+    Parameters
+    ----------
+    sim_data : DataFrame
+        The simulation data returned by go_to_floor.
+    sim_speed : int or float > 0
+        The speed of the simulation relative to a 1 second time increment.
+    stream : file-like, optional
+        Where the rows are written. The default is sys.stdout.
+    clock : callable, optional
+        Function returning the current time of a monotonic clock in seconds.
+        The default is time.monotonic.
+
+    Returns
+    -------
+    playback_stats : dict
+        Dictionary with the statistics of the playback, see play_live_sim.
+    '''
+    
+    # asyncio is only imported when needed since importing it is slow
+    import asyncio
+    
+    steps = _playback_steps(sim_data, sim_speed, stream, clock)
+    try:
+        while True:
+            await asyncio.sleep(next(steps))
+    except StopIteration as stop:
+        return stop.value
+
+
+class _ProfiledStage():
+    # The purpose of this class is to time one stage of a call for a
+    # StageProfiler. The code in the stage can set size to the number of
+    # elements it produced
+    
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.size = None
+        
+        
+    def __enter__(self):
+        # memory is not measured once the profiler has finished tracing
+        self.traced = self.profiler.trace_allocations and tracemalloc.is_tracing()
+        if self.traced:
+            tracemalloc.reset_peak()
+            self.start_memory = tracemalloc.get_traced_memory()[0]
+        self.start_time = time.perf_counter()
+        return self
+    
+    
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.start_time
+        peak_bytes = None
+        if self.traced:
+            peak_bytes = tracemalloc.get_traced_memory()[1] - self.start_memory
+        self.profiler.record(self.name, seconds, self.size, peak_bytes)
+
+
+class StageProfiler():
+    '''
+    Description
+    -----------
+    Class to record the time spent in each stage of Elevator.go_to_floor
+    (validate, plan, columns or cache, frame and live_sim). Set it as the profiler of
+    an Elevator to enable profiling. Profiling adds no work to go_to_floor
+    while the profiler of the Elevator is None.
+
+    ...
+
+    Attributes
+    ----------
+    trace_allocations : boolean
+        Whether the peak memory allocated in each stage is measured with
+        tracemalloc. Tracing slows down every allocation of the program
+        until finish is called.
+    callback : callable or None
+        Function called as callback(stage, seconds, size, peak_bytes)
+        every time a stage is recorded.
+    stats : dict
+        The cumulative statistics of each stage keyed by stage name: calls,
+        total_time, max_time, total_size and peak_bytes, the largest peak
+        memory in bytes allocated by one call of the stage.
+    ...
+    
+    Example
+    -------
+    import elevator
+    elev = elevator.Elevator()
+    elev.profiler = elevator.StageProfiler()
+    elev.go_to_floor([3, 5], live_sim = False)
+    print(elev.profiler.to_table())
+    elev.profiler.finish()
+    
+    
+    '''
+    def __init__(self, trace_allocations = False, callback = None):
+        
+        self.trace_allocations = trace_allocations
+        self.callback = callback
+        self.stats = {}
+        # tracing is only stopped by finish if it was started here
+        self.__started_tracing = False
+        if (trace_allocations and not tracemalloc.is_tracing()):
+            tracemalloc.start()
+            self.__started_tracing = True
+            
+            
+    def stage(self, name):
+        # The purpose of this method is to create the context manager timing
+        # one stage
+        return _ProfiledStage(self, name)
+    
+    
+    def record(self, name, seconds, size = None, peak_bytes = None):
+        '''
+        Description
+        -----------
+        record adds one run of a stage to the cumulative statistics and calls
+        the callback.
+
+        Parameters
+        ----------
+        name : str
+            The name of the stage.
+        seconds : float
+            The wall time of the stage.
+        size : int or None, optional
+            The number of elements (floors or rows) the stage produced.
+        peak_bytes : int or None, optional
+            The peak memory in bytes allocated by the stage.
+        '''
+        
+        stats = self.stats.setdefault(name, {"calls":0, "total_time":0.0, "max_time":0.0,
+                                             "total_size":0, "peak_bytes":0})
+        stats["calls"] += 1
+        stats["total_time"] += seconds
+        stats["max_time"] = max(stats["max_time"], seconds)
+        stats["total_size"] += size or 0
+        stats["peak_bytes"] = max(stats["peak_bytes"], peak_bytes or 0)
+        
+        if self.callback is not None:
+            self.callback(name, seconds, size, peak_bytes)
+            
+            
+    def reset(self):
+        # The purpose of this method is to clear the cumulative statistics
+        self.stats = {}
+        
+        
+    def finish(self):
+        # The purpose of this method is to stop tracing the memory once the
+        # profiling is done, if the profiler started it. The statistics are
+        # kept, and the memory of later stages is not measured
+        if self.__started_tracing:
+            tracemalloc.stop()
+            self.__started_tracing = False
+        
+        
+    def to_json(self):
+        # The purpose of this method is to dump the cumulative statistics
+        return json.dumps(self.stats, indent = 2)
+    
+    
+    def to_table(self):
+        # The purpose of this method is to format the cumulative statistics
+        # as a text table
+        lines = ["{:<10} {:>8} {:>12} {:>12} {:>12} {:>14}". \
+                 format("stage", "calls", "total (s)", "mean (s)", "total size", "peak (B)")]
+        for name, stats in self.stats.items():
+            lines.append("{:<10} {:>8} {:>12.6f} {:>12.6f} {:>12} {:>14}". \
+                         format(name, stats["calls"], stats["total_time"],
+                                stats["total_time"] / stats["calls"], stats["total_size"],
+                                stats["peak_bytes"]))
+        return "\n".join(lines)
+
+
+class TripCache():
+    '''
+    Description
+    -----------
+    Class to memoize the simulation data of repeated trips. Set it as the
+    cache of one or more Elevators to enable caching in go_to_floor. Results
+    are keyed by the cleaned floor checkpoints (starting with the current
+    floor), sec_per_floor, output format, compact flag and time step, and the least
+    recently used results are evicted once max_size results are held.
+    
+    The shape of a trip only depends on the differences between its floors,
+    so the columns of a trip are also kept as a template starting on floor
+    0. A trip that is a translation of a cached trip (e.g. 1 -> 5 -> 1 and
+    3 -> 7 -> 3) is built by shifting the floors of the template instead of
+    being computed again.
+    
+    The cached results are shared between calls and are read-only: the 
+    arrays cannot be written to and writing to the values of a cached
+    DataFrame raises a ValueError. The dict output is a new dict of the
+    cached read-only arrays on every call.
+
+    ...
+
+    Attributes
+    ----------
+    max_size : int
+        The largest number of results (and templates) held by the cache.
+    hits : int
+        The number of results returned from the cache.
+    misses : int
+        The number of results that had to be built.
+    template_hits : int
+        The number of misses built from a cached template rather than 
+        computed from the trip.
+    ...
+    
+    Example
+    -------
+    import elevator
+    elev = elevator.Elevator()
+    elev.cache = elevator.TripCache(max_size = 256)
+    elev.go_to_floor([10, 1], live_sim = False)
+    elev.go_to_floor([10, 1], live_sim = False)
+    print(elev.cache.hits, elev.cache.misses)
+    
+    
+    '''
+    def __init__(self, max_size = 128):
+        
+        if (type(max_size) is not int or max_size <= 0):
+            raise Exception("max_size must be an integer greater than 0")
+            
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.template_hits = 0
+        self.__results = collections.OrderedDict()
+        self.__templates = collections.OrderedDict()
+        
+        
+    def __len__(self):
+        # the number of cached results
+        return len(self.__results)
+    
+    
+    def __store(self, entries, key, value):
+        # The purpose of this method is to add an entry to an LRU dictionary
+        # and evict the least recently used entry when it is full
+        entries[key] = value
+        if (len(entries) > self.max_size):
+            entries.popitem(last = False)
+            
+            
+    def __get_template(self, floor_checkpoints, sec_per_floor, time_step):
+        # The purpose of this method is to get the columns of the trip
+        # translated to start on floor 0, computing them if no trip with the
+        # same floor differences is cached
+        
+        key = (tuple(np.diff(floor_checkpoints).tolist()), sec_per_floor, type(sec_per_floor),
+               time_step, type(time_step))
+        template = self.__templates.get(key)
+        if (template is not None):
+            self.__templates.move_to_end(key)
+            self.template_hits += 1
+            return template
+        
+        trip_plan = TripPlan(floor_checkpoints - floor_checkpoints[0], sec_per_floor)
+        template = trip_plan.get_columns(trip_plan.sample_times(time_step), exact = True)
+        self.__store(self.__templates, key, template)
+        return template
+        
+        
+    def get(self, trip_plan, output = "pandas", compact = False, time_step = 1):
+        '''
+        Description
+        -----------
+        get returns the simulation data of a planned trip from the cache,
+        building and caching it on a miss.
+
+        Parameters
+        ----------
+        trip_plan : TripPlan
+            The planned trip.
+        output : str, optional
+            The format of the simulation data, see Elevator.go_to_floor.
+            The default is "pandas".
+        compact : boolean, optional
+            Whether the columns use the smallest integer dtypes, see 
+            Elevator.go_to_floor. The default is False.
+        time_step : int, float > 0 or "floors", optional
+            The time between two rows, see Elevator.go_to_floor.
+            The default is 1.
+
+        Returns
+        -------
+        sim_data : DataFrame, structured ndarray or dict
+            The read-only simulation data of the trip.
+        '''
+        
+        floor_checkpoints = np.concatenate((trip_plan.leg_start_floor[:1], trip_plan.leg_end_floor))
+        # the types are part of the key since float speeds and time steps
+        # give float time columns
+        key = (tuple(floor_checkpoints.tolist()), trip_plan.sec_per_floor, type(trip_plan.sec_per_floor),
+               output, compact, time_step, type(time_step))
+        sim_data = self.__results.get(key)
+        if (sim_data is not None):
+            self.__results.move_to_end(key)
+            self.hits += 1
+            return dict(sim_data) if output == "dict" else sim_data
+        
+        self.misses += 1
+        template = self.__get_template(floor_checkpoints, trip_plan.sec_per_floor, time_step)
+        
+        # shift the floors of the template to the start floor of the trip
+        # and convert the columns to the output dtypes
+        floor_dtype, time_dtype = trip_plan.get_dtypes() if compact else (np.int64, np.int64)
+        if (template["time_elapsed"].dtype.kind == "f"):
+            time_dtype = np.float64
+        start_floor = floor_checkpoints[0]
+        columns = {
+            "time_elapsed":template["time_elapsed"].astype(time_dtype),
+            "current_floor":(template["current_floor"] + start_floor).astype(floor_dtype),
+            "floors_to_next_dest":template["floors_to_next_dest"].astype(floor_dtype),
+            "time_to_next_dest":template["time_to_next_dest"].astype(time_dtype),
+            "next_destination":(template["next_destination"] + start_floor).astype(floor_dtype),
+            "arrived":template["arrived"].copy()
+            }
+        for values in columns.values():
+            values.flags.writeable = False
+            
+        sim_data = _build_output(columns, output, copy = False)
+        if (output == "numpy"):
+            sim_data.flags.writeable = False
+        self.__store(self.__results, key, sim_data)
+        
+        return dict(sim_data) if output == "dict" else sim_data
+    
+    
+    def clear(self):
+        # The purpose of this method is to empty the cache and reset the
+        # counters
+        self.__results.clear()
+        self.__templates.clear()
+        self.hits = 0
+        self.misses = 0
+        self.template_hits = 0
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import heapq
+import numpy as np
+import pandas as pd
+import elevator
+
+
+class BankCar():
+    '''
+    Description
+    -----------
+    Class to represent the state of one Elevator while it is driven by an
+    ElevatorBank. The car moves at a constant speed from the floor it last
+    stopped on towards its current target floor, so its position at any time
+    is computed from the departure floor and time instead of being updated
+    every second.
+
+    ...
+
+    Attributes
+    ----------
+    elevator : Elevator
+        The elevator driven by the bank. Its current_floor is updated every
+        time the car stops at a floor.
+    floor : int
+        The floor the car last stopped on.
+    depart_time : float
+        The time the car left (or stopped on) floor.
+    target : int or None
+        The floor the car is travelling to, or None when the car is idle.
+    direction : int
+        1 when the car is travelling up, -1 when travelling down and 0 when
+        the car is idle.
+    stops : set
+        The floors the car still has to stop on.
+    ...
+    '''
+    def __init__(self, elev):
+
+        self.elevator = elev
+        self.floor = elev.current_floor
+        self.depart_time = 0.0
+        self.target = None
+        self.direction = 0
+        self.stops = set()
+        # passengers waiting for this car keyed by their floor and passengers
+        # riding this car keyed by their destination floor
+        self.waiting = {}
+        self.riding = {}
+        # the version is incremented every time the target changes so stale
+        # arrival events can be ignored
+        self.version = 0
+
+
+    def position(self, time):
+        # The purpose of this method is to get the (fractional) floor of the
+        # car at the given time
+
+        if (self.target is None):
+            return self.floor
+
+        floors_moved = (time - self.depart_time) / self.elevator.sec_per_floor
+        return self.floor + self.direction * min(floors_moved, abs(self.target - self.floor))
+
+
+    def eta(self, floor, time):
+        # The purpose of this method is to estimate the time for the car to
+        # reach the floor if it keeps sweeping in its current direction
+        # before turning around (LOOK)
+
+        position = self.position(time)
+        # an idle car or a floor ahead of the car is reached directly
+        if (self.direction == 0 or (floor - position) * self.direction >= 0):
+            floors = abs(floor - position)
+        # otherwise the car first serves its furthest stop ahead
+        else:
+            furthest = max(self.stops | {self.target}, key = lambda x: (x - position) * self.direction)
+            floors = abs(furthest - position) + abs(furthest - floor)
+
+        return floors * self.elevator.sec_per_floor
+
+
+def nearest_car_policy(cars, origin, destination, time):
+    '''
+    Description
+    -----------
+    Dispatch policy assigning a hall call to the car that is currently
+    closest to the floor of the call, regardless of its direction.
+    '''
+
+    return min(range(len(cars)), key = lambda i: abs(cars[i].position(time) - origin))
+
+
+def look_policy(cars, origin, destination, time):
+    '''
+    Description
+    -----------
+    Dispatch policy assigning a hall call to the car that reaches the floor
+    of the call first if every car keeps sweeping in its current direction
+    before turning around (SCAN/LOOK).
+    '''
+
+    return min(range(len(cars)), key = lambda i: cars[i].eta(origin, time))
+
+
+def destination_dispatch_policy(cars, origin, destination, time):
+    '''
+    Description
+    -----------
+    Dispatch policy using the destination of the passenger. The cost of a
+    car is the time for it to reach the floor of the call plus a penalty of
+    two floors of travel for every new stop the passenger adds to the car,
+    so passengers sharing origin and destination floors are grouped into
+    the same car.
+    '''
+
+    def cost(i):
+        new_stops = len({origin, destination} - cars[i].stops)
+        return cars[i].eta(origin, time) + 2 * cars[i].elevator.sec_per_floor * new_stops
+
+    return min(range(len(cars)), key = cost)
+
+
+POLICIES = {
+    "nearest":nearest_car_policy,
+    "look":look_policy,
+    "destination":destination_dispatch_policy
+    }
+
+
+class ElevatorBank():
+    '''
+    Description
+    -----------
+    Class to represent a bank of elevators serving hall calls that arrive
+    over time. The bank is simulated with a discrete-event engine: a heap
+    ordered queue holds the times the cars arrive at their next stop, and
+    the engine jumps from one call or arrival to the next instead of
+    stepping every car once per second.
+
+    ...
+
+    Attributes
+    ----------
+    elevators : list of Elevator
+        The elevators of the bank. All elevators must serve the same
+        building floors.
+    policy : callable
+        The dispatch policy used to assign each hall call to a car. It is
+        called as policy(cars, origin, destination, time) and returns the
+        index of the chosen car.
+    min_building_floor: int
+        The lowest floor of the building.
+    max_building_floor: int
+        The highest floor of the building.
+    ...
+
+    Assumptions
+    -----------
+    - Time for doors opening/closing and for passengers boarding is ignored.
+    - The cars have no capacity limit.
+    - Once a car stops, it keeps travelling in the same direction while it
+        has stops ahead and otherwise turns around (LOOK).
+
+    ...
+
+    Example
+    -------
+    import elevator, elevator_bank
+    elevators = [elevator.Elevator(1, 2, 1, 50) for i in range(8)]
+    bank = elevator_bank.ElevatorBank(elevators, policy = "look")
+    passengers = bank.run(call_times = [0, 5, 12], origin_floors = [1, 1, 30],
+                          destination_floors = [20, 35, 1])
+
+
+    '''
+    def __init__(self, elevators, policy = "look"):
+
+        self.elevators = self.__validate_elevators(elevators)
+        self.policy = self.__validate_policy(policy)
+        self.min_building_floor = self.elevators[0].min_building_floor
+        self.max_building_floor = self.elevators[0].max_building_floor
+
+
+    def __validate_elevators(self, elevators):
+        # The purpose of this method is to verify that the bank has at least
+        # one elevator and that all elevators serve the same floors
+        elevators = list(elevators)
+        if (len(elevators) == 0 or not all(isinstance(x, elevator.Elevator) for x in elevators)):
+            raise Exception("elevators must be a list of at least one Elevator")
+        if (len({(x.min_building_floor, x.max_building_floor) for x in elevators}) != 1):
+            raise Exception("all elevators must have the same min/max building floors")
+
+        return elevators
+
+
+    def __validate_policy(self, policy):
+        # The purpose of this method is to look up the dispatch policy by
+        # name or verify that a custom policy can be called
+        if (isinstance(policy, str) and policy in POLICIES):
+            return POLICIES[policy]
+        if (not callable(policy)):
+            raise Exception("policy must be one of {} or a callable".format(list(POLICIES)))
+
+        return policy
+
+
+    def __validate_calls(self, call_times, origin_floors, destination_floors):
+        # The purpose of this method is to check that all the hall calls are
+        # valid and sort them by time
+        call_times = np.asarray(call_times, dtype=float)
+        origin_floors = np.asarray(origin_floors)
+        destination_floors = np.asarray(destination_floors)
+
+        if (not (call_times.shape == origin_floors.shape == destination_floors.shape)
+            or call_times.ndim != 1):
+            raise Exception("call_times, origin_floors and destination_floors must have the same length")
+        if (origin_floors.size and (origin_floors.dtype.kind not in "iu"
+                                    or destination_floors.dtype.kind not in "iu")):
+            raise Exception("all floors must be integers")
+        if (np.any(call_times < 0)):
+            raise Exception("call times must be 0 or greater")
+        if (np.any(origin_floors == destination_floors)):
+            raise Exception("the destination of every call must differ from its origin")
+        floors = np.concatenate((origin_floors, destination_floors))
+        if (np.any(floors > self.max_building_floor) or np.any(floors < self.min_building_floor)):
+            raise Exception("all floors must be on or within the min/max floors of the building")
+
+        order = np.argsort(call_times, kind="stable")
+        return call_times, origin_floors, destination_floors, order
+
+
+    def __set_target(self, car, car_index, time, events):
+        # The purpose of this method is to send the car to the next stop in
+        # its direction of travel, turning around or going idle when there
+        # are no stops ahead
+
+        if (not car.stops):
+            car.target, car.direction = None, 0
+            return
+
+        ahead = [x for x in car.stops if (x - car.floor) * car.direction > 0]
+        if (not ahead):
+            car.direction = 0
+            ahead = list(car.stops)
+
+        car.target = min(ahead, key = lambda x: abs(x - car.floor))
+        car.direction = int(np.sign(car.target - car.floor))
+        car.depart_time = time
+        car.version += 1
+        heapq.heappush(events, (time + abs(car.target - car.floor) * car.elevator.sec_per_floor,
+                                car_index, car.version))
+
+
+    def __add_stop(self, car, car_index, floor, time, events):
+        # The purpose of this method is to add a stop to the car, making it
+        # the new target when the car is idle or the stop is on the way to
+        # the current target
+
+        car.stops.add(floor)
+        if (car.target is None):
+            self.__set_target(car, car_index, time, events)
+        elif ((floor - car.position(time)) * car.direction >= 0 and
+              (car.target - floor) * car.direction > 0):
+            car.target = floor
+            car.version += 1
+            heapq.heappush(events, (car.depart_time + abs(floor - car.floor) * car.elevator.sec_per_floor,
+                                    car_index, car.version))
+
+
+    def run(self, call_times, origin_floors, destination_floors):
+        '''
+        Description
+        -----------
+        run simulates the bank serving a list of hall calls until every
+        passenger has reached their destination.
+
+        Parameters
+        ----------
+        call_times : array-like of ints or floats
+            The time in seconds each passenger calls an elevator.
+        origin_floors : array-like of ints
+            The floor each passenger calls the elevator from.
+        destination_floors : array-like of ints
+            The floor each passenger travels to.
+
+        Returns
+        -------
+        passengers : DataFrame
+            DataFrame with one row per passenger, in the order of the inputs.
+            The columns of the DataFrame are as follows:
+                - car: index of the elevator that served the passenger.
+                - call_time: time the passenger called the elevator.
+                - origin_floor: floor the passenger called the elevator from.
+                - destination_floor: floor the passenger travelled to.
+                - pickup_time: time the passenger boarded the elevator.
+                - dropoff_time: time the passenger reached their destination.
+                - wait_time: time between the call and boarding.
+                - ride_time: time between boarding and reaching the destination.
+        '''
+
+        call_times, origin_floors, destination_floors, order = \
+            self.__validate_calls(call_times, origin_floors, destination_floors)
+
+        cars = [BankCar(x) for x in self.elevators]
+        n_passengers = call_times.size
+        assigned_car = np.zeros(n_passengers, dtype=np.int64)
+        pickup_time = np.zeros(n_passengers)
+        dropoff_time = np.zeros(n_passengers)
+
+        # heap of (arrival time, car index, car version) events. Hall calls
+        # are already sorted so they are merged in from the sorted order
+        events = []
+        next_call = 0
+        while (next_call < n_passengers or events):
+
+            ########################
+            ## Handle a hall call ##
+            ########################
+            if (next_call < n_passengers and
+                (not events or call_times[order[next_call]] <= events[0][0])):
+                passenger = order[next_call]
+                next_call += 1
+                time = call_times[passenger]
+                origin = int(origin_floors[passenger])
+
+                car_index = self.policy(cars, origin, int(destination_floors[passenger]), time)
+                car = cars[car_index]
+                assigned_car[passenger] = car_index
+                car.waiting.setdefault(origin, []).append(passenger)
+                self.__add_stop(car, car_index, origin, time, events)
+                continue
+
+            ###########################
+            ## Handle a car arriving ##
+            ###########################
+            time, car_index, version = heapq.heappop(events)
+            car = cars[car_index]
+            # skip arrivals that were replaced by a closer stop
+            if (version != car.version):
+                continue
+
+            floor = car.target
+            car.floor = floor
+            car.elevator.current_floor = floor
+            car.stops.discard(floor)
+
+            # passengers riding to this floor get off
+            for passenger in car.riding.pop(floor, []):
+                dropoff_time[passenger] = time
+            # passengers waiting on this floor get on
+            for passenger in car.waiting.pop(floor, []):
+                pickup_time[passenger] = time
+                destination = int(destination_floors[passenger])
+                car.riding.setdefault(destination, []).append(passenger)
+                car.stops.add(destination)
+
+            self.__set_target(car, car_index, time, events)
+
+        return pd.DataFrame({
+            "car":assigned_car,
+            "call_time":call_times,
+            "origin_floor":origin_floors,
+            "destination_floor":destination_floors,
+            "pickup_time":pickup_time,
+            "dropoff_time":dropoff_time,
+            "wait_time":pickup_time - call_times,
+            "ride_time":dropoff_time - pickup_time
+            })
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This script benchmarks the elevator simulation engines and compares the
+# results against a stored baseline. Example:
+#     python elevator_benchmark.py --output bench.json
+#     python elevator_benchmark.py --baseline bench.json --threshold 0.25
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+import elevator
+
+
+ENGINES = ["go_to_floor", "plan_trip", "iter_go_to_floor", "simulate_batch"]
+
+
+def make_cases(quick = False):
+    '''
+    Description
+    -----------
+    make_cases creates the benchmark cases. Each engine is timed while
+    varying the itinerary length, the building height and sec_per_floor one
+    at a time around a default case, giving a scaling curve for each.
+
+    Parameters
+    ----------
+    quick : boolean, optional
+        Use smaller sizes so the benchmark finishes in a few seconds.
+        The default is False.
+
+    Returns
+    -------
+    cases : list of dicts
+        The engine, n_stops, n_floors and sec_per_floor of every case.
+    '''
+
+    if quick:
+        stops, floors, speeds = [10, 100], [20, 100], [1, 10]
+    else:
+        stops, floors, speeds = [10, 100, 1000], [20, 100, 500], [1, 10, 60]
+
+    default = {"n_stops":stops[0], "n_floors":floors[0], "sec_per_floor":speeds[-1]}
+    cases = []
+    for engine in ENGINES:
+        for name, values in [("n_stops", stops), ("n_floors", floors), ("sec_per_floor", speeds)]:
+            for value in values:
+                case = dict(default, engine = engine)
+                case[name] = value
+                if case not in cases:
+                    cases.append(case)
+
+    return cases
+
+
+def case_name(case):
+    # The purpose of this function is to create a readable unique name for
+    # a benchmark case
+    return "{engine}/stops={n_stops}/floors={n_floors}/spf={sec_per_floor}".format(**case)
+
+
+def run_case(case, n_trips = 100):
+    '''
+    Description
+    -----------
+    run_case runs one benchmark case once: n_trips random trips with the
+    given itinerary length through the engine.
+
+    Parameters
+    ----------
+    case : dict
+        The benchmark case, see make_cases.
+    n_trips : int, optional
+        The number of trips run. The default is 100.
+
+    Returns
+    -------
+    n_rows : int
+        The number of per-second rows simulated.
+    '''
+
+    rng = np.random.default_rng(0)
+    itineraries = rng.integers(1, case["n_floors"] + 1, (n_trips, case["n_stops"]))
+    # make sure every trip leaves the start floor
+    itineraries[:, -1] = np.where(itineraries[:, -1] == 1, 2, itineraries[:, -1])
+
+    if (case["engine"] == "simulate_batch"):
+        sim_data = elevator.simulate_batch(np.ones(n_trips, dtype=np.int64),
+                                           [x.tolist() for x in itineraries],
+                                           case["sec_per_floor"], 1, case["n_floors"])
+        return sim_data.shape[0]
+
+    n_rows = 0
+    for itinerary in itineraries:
+        elev = elevator.Elevator(1, case["sec_per_floor"], 1, case["n_floors"])
+        if (case["engine"] == "go_to_floor"):
+            n_rows += elev.go_to_floor(itinerary.tolist(), live_sim = False).shape[0]
+        elif (case["engine"] == "plan_trip"):
+            n_rows += len(elev.plan_trip(itinerary.tolist()))
+        else:
+            for chunk in elev.iter_go_to_floor(itinerary.tolist(), chunk_size = 4096):
+                n_rows += chunk["time_elapsed"].size
+
+    return n_rows
+
+
+def time_case(case, repeats = 5, min_time = 0.2):
+    '''
+    Description
+    -----------
+    time_case times a benchmark case. Each repeat runs the case as many 
+    times as needed to last at least min_time, so short cases are not
+    dominated by timer and scheduling noise, and the wall time is the 
+    median time of one run over the repeats. The peak memory is measured
+    with tracemalloc in a separate run, so tracing does not slow down the
+    timed runs.
+
+    Parameters
+    ----------
+    case : dict
+        The benchmark case, see make_cases.
+    repeats : int, optional
+        The number of timed repeats. The default is 5.
+    min_time : float, optional
+        The minimum time in seconds of each repeat. The default is 0.2.
+
+    Returns
+    -------
+    result : dict
+        Dictionary with the wall_time (seconds per run), peak_memory 
+        (bytes), rows and rows_per_sec of one run of the case, and the
+        number of runs in each repeat (loops).
+    '''
+
+    # the number of runs per repeat is doubled until a repeat lasts long
+    # enough. This also warms up the caches before the timed repeats
+    loops = 1
+    while True:
+        start_time = time.perf_counter()
+        for i in range(loops):
+            n_rows = run_case(case)
+        if (time.perf_counter() - start_time >= min_time):
+            break
+        loops *= 2
+
+    wall_times = []
+    for i in range(repeats):
+        start_time = time.perf_counter()
+        for j in range(loops):
+            run_case(case)
+        wall_times.append((time.perf_counter() - start_time) / loops)
+
+    tracemalloc.start()
+    run_case(case)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    wall_time = float(np.median(wall_times))
+    return {
+        "wall_time":wall_time,
+        "peak_memory":peak_memory,
+        "rows":n_rows,
+        "rows_per_sec":n_rows / wall_time if wall_time > 0 else float("inf"),
+        "loops":loops
+        }
+
+
+def run_benchmarks(quick = False, repeats = 5, stream = None, min_time = 0.2):
+    '''
+    Description
+    -----------
+    run_benchmarks times every benchmark case.
+
+    Parameters
+    ----------
+    quick : boolean, optional
+        Use smaller sizes, see make_cases. The default is False.
+    repeats : int, optional
+        The number of timed repeats of each case. The default is 5.
+    stream : file-like or None, optional
+        Where the progress is written. If None, nothing is written.
+        The default is None.
+    min_time : float, optional
+        The minimum time in seconds of each repeat, see time_case. The
+        default is 0.2.
+
+    Returns
+    -------
+    results : dict
+        Dictionary with the environment ("python", "numpy" and "machine")
+        and the result of each case keyed by case name under "cases".
+    '''
+
+    results = {
+        "python":platform.python_version(),
+        "numpy":np.__version__,
+        "machine":platform.machine(),
+        "cases":{}
+        }
+    for case in make_cases(quick):
+        result = time_case(case, repeats, min_time)
+        results["cases"][case_name(case)] = result
+        if stream is not None:
+            stream.write("{:<60} {:>10.4f}s {:>12.0f} rows/s {:>10.1f} KiB\n". \
+                         format(case_name(case), result["wall_time"], result["rows_per_sec"],
+                                result["peak_memory"] / 1024))
+
+    return results
+
+
+def compare_results(results, baseline, threshold = 0.25, time_noise = 1e-3,
+                    memory_noise = 64 * 1024):
+    '''
+    Description
+    -----------
+    compare_results compares benchmark results against a baseline and finds
+    the cases whose wall time or peak memory grew by more than the threshold.
+    Increases below an absolute noise floor are ignored, since a small case
+    can easily be a few times slower from one run to the next. Cases 
+    missing from either side are ignored.
+
+    Parameters
+    ----------
+    results : dict
+        The new results, see run_benchmarks.
+    baseline : dict
+        The baseline results, see run_benchmarks.
+    threshold : float, optional
+        The allowed relative increase, e.g. 0.25 allows 25% slower cases.
+        The default is 0.25.
+    time_noise : float, optional
+        The wall time increase in seconds that is always allowed. The 
+        default is 1e-3.
+    memory_noise : int, optional
+        The peak memory increase in bytes that is always allowed. The
+        default is 64 KiB.
+
+    Returns
+    -------
+    regressions : list of dicts
+        The case name, metric, baseline value, new value and ratio of every
+        regression.
+    '''
+
+    regressions = []
+    for name, result in results["cases"].items():
+        if name not in baseline["cases"]:
+            continue
+        for metric, noise in [("wall_time", time_noise), ("peak_memory", memory_noise)]:
+            old, new = baseline["cases"][name][metric], result[metric]
+            if (old > 0 and new > old * (1 + threshold) and new - old > noise):
+                regressions.append({"case":name, "metric":metric, "baseline":old,
+                                    "new":new, "ratio":new / old})
+
+    return regressions
+
+
+def main(argv = None):
+    # The purpose of this function is to run the benchmarks from the command
+    # line. It returns 1 when a regression is found and 0 otherwise
+    parser = argparse.ArgumentParser(description = "Benchmark the elevator simulation engines.")
+    parser.add_argument("--output", help = "write the results to this JSON file")
+    parser.add_argument("--baseline", help = "compare the results against this JSON file")
+    parser.add_argument("--threshold", type = float, default = 0.25,
+                        help = "allowed relative increase over the baseline (default 0.25)")
+    parser.add_argument("--repeats", type = int, default = 5,
+                        help = "number of timed repeats of each case (default 5)")
+    parser.add_argument("--min-time", type = float, default = 0.2,
+                        help = "minimum time in seconds of each repeat (default 0.2)")
+    parser.add_argument("--time-noise", type = float, default = 1e-3,
+                        help = "wall time increase in seconds always allowed (default 1e-3)")
+    parser.add_argument("--memory-noise", type = int, default = 64 * 1024,
+                        help = "peak memory increase in bytes always allowed (default 65536)")
+    parser.add_argument("--quick", action = "store_true", help = "use smaller sizes")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.quick, args.repeats, sys.stdout, args.min_time)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent = 2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.threshold, args.time_noise,
+                                      args.memory_noise)
+        for x in regressions:
+            print("REGRESSION {case} {metric}: {baseline:.4g} -> {new:.4g} ({ratio:.2f}x)".format(**x))
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
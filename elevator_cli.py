@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This script runs a batch of elevator trips read from a CSV or JSONL file
+# (or stdin) across a pool of worker processes, and streams the results to
+# an output file in the order of the input. Example:
+#     python elevator_cli.py trips.jsonl --output summaries.jsonl --workers 4
+#     python elevator_cli.py trips.csv --mode rows --output rows.parquet
+#     cat trips.jsonl | python elevator_cli.py - --progress > summaries.jsonl
+#
+# Each trip request has a start_floor, an optional sec_per_floor and a list
+# of floors. JSONL lines look like
+#     {"start_floor": 1, "sec_per_floor": 10, "floors": [3, 1, 2]}
+# and CSV files have a header row with the same column names, with the
+# floors separated by spaces or semicolons, e.g. 1,10,3 1 2
+
+import argparse
+import collections
+import contextlib
+import csv
+import io
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import elevator
+
+
+INPUT_FORMATS = ["csv", "jsonl"]
+MODES = ["summary", "rows"]
+SUMMARY_FORMATS = ["jsonl", "csv"]
+ROW_FORMATS = ["csv", "npy", "parquet", "arrow"]
+SUMMARY_COLUMNS = ["trip_id", "start_floor", "sec_per_floor", "total_time", "floors_traveled",
+                   "final_floor", "arrival_times"]
+ROW_COLUMNS = ["trip_id", "time_elapsed", "current_floor", "floors_to_next_dest",
+               "time_to_next_dest", "next_destination"]
+
+
+def _infer_format(path, formats, default):
+    # The purpose of this function is to find the file format from the
+    # extension of the path, or use the default
+    extension = os.path.splitext(path)[1].lstrip(".").lower()
+    extension = {"ndjson":"jsonl", "json":"jsonl", "feather":"arrow"}.get(extension, extension)
+
+    return extension if extension in formats else default
+
+
+def parse_request(text, input_format, fieldnames = None, sec_per_floor = 10, min_building_floor = 1,
+                  max_building_floor = 20):
+    '''
+    Description
+    -----------
+    parse_request parses one trip request from a line of the input and
+    checks it with the same rules as Elevator.go_to_floor.
+
+    Parameters
+    ----------
+    text : str
+        The line of the input.
+    input_format : str
+        "csv" or "jsonl".
+    fieldnames : list of str or None, optional
+        The column names of a CSV input. The default is None.
+    sec_per_floor : int, optional
+        The speed used when the request has no sec_per_floor.
+        The default is 10.
+    min_building_floor : int, optional
+        The lowest floor of the building. The default is 1.
+    max_building_floor : int, optional
+        The highest floor of the building. The default is 20.
+
+    Returns
+    -------
+    request : tuple
+        The start floor, sec_per_floor and list of desired floors.
+    '''
+
+    try:
+        if (input_format == "jsonl"):
+            record = json.loads(text)
+            if (type(record) is not dict):
+                raise Exception("each line must be a JSON object")
+            start_floor = record["start_floor"]
+            speed = record.get("sec_per_floor", sec_per_floor)
+            floors = record["floors"]
+        else:
+            values = next(csv.reader([text]))
+            if (len(values) != len(fieldnames)):
+                raise Exception("expected {} fields but found {}".format(len(fieldnames), len(values)))
+            record = dict(zip(fieldnames, values))
+            start_floor = int(record["start_floor"])
+            speed = int(record["sec_per_floor"]) if record.get("sec_per_floor") else sec_per_floor
+            floors = [int(x) for x in record["floors"].replace(";", " ").split()]
+    except KeyError as error:
+        raise Exception("missing field {}".format(error))
+    except ValueError as error:
+        raise Exception("invalid value: {}".format(error))
+
+    if (type(speed) is not int or speed <= 0):
+        raise Exception("sec_per_floor must be an integer greater than 0")
+    if (type(floors) is not list or len(floors) == 0):
+        raise Exception("floors must be a non-empty list of floors")
+    if (not all(type(x) is int for x in floors) or type(start_floor) is not int):
+        raise Exception("all floors must be integers")
+    if (min(floors + [start_floor]) < min_building_floor or
+        max(floors + [start_floor]) > max_building_floor):
+        raise Exception("all floors must be on or within the min/max floors of the building")
+    if (all(x == start_floor for x in floors)):
+        raise Exception("must enter at least one floor that is not the start floor: {}". \
+                        format(start_floor))
+
+    return start_floor, speed, floors
+
+
+def _format_summaries(trip_ids, start_floors, speeds, itineraries, settings):
+    # The purpose of this function is to compute the trip summaries of a
+    # chunk and format them as text. The summaries are computed with one
+    # summarize_batch call at 1 second per floor and scaled by the speed of
+    # each trip
+    summaries = elevator.summarize_batch(start_floors, itineraries, 1, settings["min_building_floor"],
+                                         settings["max_building_floor"])
+    offsets = summaries["offsets"]
+    speeds = np.asarray(speeds)
+    arrival_times = summaries["arrival_times"] * np.repeat(speeds, np.diff(offsets))
+
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator = "\n")
+    for i, trip_id in enumerate(trip_ids):
+        record = {
+            "trip_id":trip_id,
+            "start_floor":start_floors[i],
+            "sec_per_floor":int(speeds[i]),
+            "total_time":int(summaries["total_time"][i] * speeds[i]),
+            "floors_traveled":int(summaries["floors_traveled"][i]),
+            "final_floor":int(summaries["final_floor"][i]),
+            "arrival_times":arrival_times[offsets[i]:offsets[i + 1]].tolist()
+            }
+        if (settings["output_format"] == "jsonl"):
+            output.write(json.dumps(record) + "\n")
+        else:
+            record["arrival_times"] = " ".join(str(x) for x in record["arrival_times"])
+            writer.writerow(record.values())
+
+    return output.getvalue()
+
+
+def _simulate_rows(trip_ids, start_floors, speeds, itineraries, settings):
+    # The purpose of this function is to simulate the per-second rows of a
+    # chunk and count them. Consecutive trips with the same speed are 
+    # simulated with one simulate_batch call, so the rows stay in the order
+    # of the input
+    trip_ids = np.asarray(trip_ids)
+    results = []
+    n_rows = 0
+    start = 0
+    for speed, group in itertools.groupby(speeds):
+        stop = start + len(list(group))
+        output = "pandas" if settings["output_format"] == "csv" else "dict"
+        sim_data = elevator.simulate_batch(start_floors[start:stop], itineraries[start:stop], speed,
+                                           settings["min_building_floor"],
+                                           settings["max_building_floor"], output = output)
+        # the trip ids of simulate_batch count from 0 within the group
+        sim_data["trip_id"] = trip_ids[start:stop][np.asarray(sim_data["trip_id"])]
+        n_rows += len(sim_data["trip_id"])
+        if (output == "pandas"):
+            sim_data = sim_data.to_csv(header = False, index = False)
+        results.append(sim_data)
+        start = stop
+
+    return ("".join(results) if settings["output_format"] == "csv" else results), n_rows
+
+
+def run_chunk(first_trip_id, line_numbers, lines, settings):
+    '''
+    Description
+    -----------
+    run_chunk parses, checks and runs a chunk of trip requests. It is run
+    in the worker processes.
+
+    Parameters
+    ----------
+    first_trip_id : int
+        The trip id of the first request. Requests are numbered from 0 in
+        the order of the input.
+    line_numbers : list of ints
+        The line number of each request, used in the error messages.
+    lines : list of str
+        The lines of the requests.
+    settings : dict
+        The input_format, fieldnames, sec_per_floor, min_building_floor,
+        max_building_floor, mode and output_format of the run.
+
+    Returns
+    -------
+    result : dict
+        Dictionary with the formatted text (or the columns for binary row
+        outputs) under "output", the number of trips and rows run, and the
+        errors as a list of (line number, message) tuples.
+    '''
+
+    trip_ids, start_floors, speeds, itineraries, errors = [], [], [], [], []
+    for i, (line_number, text) in enumerate(zip(line_numbers, lines)):
+        try:
+            start_floor, speed, floors = parse_request(
+                text, settings["input_format"], settings["fieldnames"], settings["sec_per_floor"],
+                settings["min_building_floor"], settings["max_building_floor"])
+        except Exception as error:
+            errors.append((line_number, str(error)))
+            continue
+        trip_ids.append(first_trip_id + i)
+        start_floors.append(start_floor)
+        speeds.append(speed)
+        itineraries.append(floors)
+
+    result = {"output":"", "n_trips":len(trip_ids), "n_rows":len(trip_ids), "errors":errors}
+    if (not trip_ids):
+        return result
+    if (settings["mode"] == "summary"):
+        result["output"] = _format_summaries(trip_ids, start_floors, speeds, itineraries, settings)
+    else:
+        result["output"], result["n_rows"] = _simulate_rows(trip_ids, start_floors, speeds,
+                                                            itineraries, settings)
+
+    return result
+
+
+def _read_chunks(stream, chunk_size, first_line):
+    # The purpose of this function is to read the non-blank lines of the
+    # input lazily in chunks of (first trip id, line numbers, lines)
+    lines = ((i, line) for i, line in enumerate(stream, first_line) if line.strip())
+    first_trip_id = 0
+    while True:
+        chunk = list(itertools.islice(lines, chunk_size))
+        if (not chunk):
+            return
+        yield first_trip_id, [x[0] for x in chunk], [x[1] for x in chunk]
+        first_trip_id += len(chunk)
+
+
+def run_batch(stream, out, settings, workers = 1, chunk_size = 10000, progress = None,
+              first_line = 1):
+    '''
+    Description
+    -----------
+    run_batch runs every trip request of an input stream and writes the
+    results in the order of the input. The requests are read and run in
+    chunks, and at most two chunks per worker are in flight at a time, so
+    memory use does not depend on the size of the input.
+
+    Parameters
+    ----------
+    stream : iterable of str
+        The lines of the input, after any CSV header.
+    out : file-like or sink
+        Where the results are written: a text file for text outputs or an
+        elevator_sink sink for binary row outputs.
+    settings : dict
+        The settings of the run, see run_chunk.
+    workers : int > 0, optional
+        The number of worker processes. If 1, the chunks are run in the
+        current process. The default is 1.
+    chunk_size : int > 0, optional
+        The number of requests in each chunk. The default is 10000.
+    progress : file-like or None, optional
+        Where the throughput is reported about once a second. If None,
+        nothing is reported. The default is None.
+    first_line : int, optional
+        The line number of the first line of the stream, used in the error
+        messages. The default is 1.
+
+    Returns
+    -------
+    totals : dict
+        Dictionary with the number of trips and rows run, the errors as a
+        list of (line number, message) tuples and the wall time.
+    '''
+
+    totals = {"n_trips":0, "n_rows":0, "errors":[], "wall_time":0.0}
+    start_time = last_report = time.monotonic()
+
+    def write(result):
+        # write the results of one chunk and report the progress
+        nonlocal last_report
+        if isinstance(result["output"], str):
+            out.write(result["output"])
+        else:
+            for columns in result["output"]:
+                out.write(columns)
+        totals["n_trips"] += result["n_trips"]
+        totals["n_rows"] += result["n_rows"]
+        totals["errors"].extend(result["errors"])
+        now = time.monotonic()
+        if (progress is not None and now - last_report >= 1):
+            last_report = now
+            progress.write("{} trips, {} rows, {:.0f} trips/s\n". \
+                           format(totals["n_trips"], totals["n_rows"],
+                                  totals["n_trips"] / (now - start_time)))
+
+    chunks = _read_chunks(stream, chunk_size, first_line)
+    if (workers == 1):
+        for chunk in chunks:
+            write(run_chunk(*chunk, settings))
+    else:
+        with ProcessPoolExecutor(max_workers = workers) as executor:
+            # the oldest chunk is written first so the output keeps the
+            # order of the input
+            futures = collections.deque()
+            for chunk in chunks:
+                if (len(futures) >= 2 * workers):
+                    write(futures.popleft().result())
+                futures.append(executor.submit(run_chunk, *chunk, settings))
+            while futures:
+                write(futures.popleft().result())
+
+    totals["wall_time"] = time.monotonic() - start_time
+    return totals
+
+
+def main(argv = None):
+    # The purpose of this function is to run a batch of trips from the
+    # command line. It returns 1 when a request is invalid and 0 otherwise
+    parser = argparse.ArgumentParser(description = "Run a batch of elevator trips.")
+    parser.add_argument("input", help = "CSV or JSONL file of trip requests, or - for stdin")
+    parser.add_argument("--input-format", choices = INPUT_FORMATS,
+                        help = "format of the input (default from the extension, or jsonl)")
+    parser.add_argument("--output", default = "-", help = "output file, or - for stdout (default)")
+    parser.add_argument("--output-format", choices = sorted(set(SUMMARY_FORMATS + ROW_FORMATS)),
+                        help = "format of the output (default from the extension)")
+    parser.add_argument("--mode", choices = MODES, default = "summary",
+                        help = "write a summary per trip or every per-second row (default summary)")
+    parser.add_argument("--workers", type = int, default = os.cpu_count() or 1,
+                        help = "number of worker processes (default: number of CPUs)")
+    parser.add_argument("--chunk-size", type = int, default = 10000,
+                        help = "number of requests per chunk (default 10000)")
+    parser.add_argument("--sec-per-floor", type = int, default = 10,
+                        help = "speed of requests without a sec_per_floor (default 10)")
+    parser.add_argument("--min-floor", type = int, default = 1, help = "lowest building floor (default 1)")
+    parser.add_argument("--max-floor", type = int, default = 20, help = "highest building floor (default 20)")
+    parser.add_argument("--progress", action = "store_true", help = "report the throughput on stderr")
+    args = parser.parse_args(argv)
+
+    ###############################
+    ## Validate the options      ##
+    ###############################
+    formats = SUMMARY_FORMATS if args.mode == "summary" else ROW_FORMATS
+    input_format = args.input_format or _infer_format(args.input, INPUT_FORMATS, "jsonl")
+    output_format = args.output_format or _infer_format(args.output, formats, formats[0])
+    if (output_format not in formats):
+        parser.error("the {} mode writes one of {}".format(args.mode, formats))
+    if (output_format in ["npy", "parquet", "arrow"] and args.output == "-"):
+        parser.error("{} output must be written to a file".format(output_format))
+    if (args.workers <= 0 or args.chunk_size <= 0):
+        parser.error("--workers and --chunk-size must be greater than 0")
+
+    ###############################
+    ## Run the batch             ##
+    ###############################
+    with contextlib.ExitStack() as stack:
+        stream = sys.stdin if args.input == "-" else \
+            stack.enter_context(open(args.input, newline = ""))
+        fieldnames = None
+        if (input_format == "csv"):
+            fieldnames = next(csv.reader([stream.readline()]), [])
+        settings = {"input_format":input_format, "fieldnames":fieldnames,
+                    "sec_per_floor":args.sec_per_floor, "min_building_floor":args.min_floor,
+                    "max_building_floor":args.max_floor, "mode":args.mode,
+                    "output_format":output_format}
+
+        if (output_format in ["npy", "parquet", "arrow"]):
+            import elevator_sink
+            out = elevator_sink.NpySink(args.output) if output_format == "npy" else \
+                elevator_sink.ArrowSink(args.output, output_format)
+            stack.enter_context(out)
+        else:
+            out = sys.stdout if args.output == "-" else \
+                stack.enter_context(open(args.output, "w", newline = ""))
+            if (output_format == "csv"):
+                out.write(",".join(SUMMARY_COLUMNS if args.mode == "summary" else ROW_COLUMNS) + "\n")
+
+        totals = run_batch(stream, out, settings, args.workers, args.chunk_size,
+                           sys.stderr if args.progress else None, 2 if input_format == "csv" else 1)
+
+    for line_number, message in totals["errors"]:
+        sys.stderr.write("line {}: {}\n".format(line_number, message))
+    if args.progress:
+        sys.stderr.write("{} trips, {} rows, {} invalid requests in {:.2f}s\n". \
+                         format(totals["n_trips"], totals["n_rows"], len(totals["errors"]),
+                                totals["wall_time"]))
+
+    return 1 if totals["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,515 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import math
+import numpy as np
+import elevator
+
+
+class QuantileSketch():
+    '''
+    Description
+    -----------
+    Class to estimate the quantiles of a stream of non-negative values, such
+    as trip or wait times, in a fixed amount of memory. The values are
+    counted in buckets whose bounds grow geometrically, so every quantile is
+    estimated within relative_accuracy of the true value. Sketches with the
+    same relative_accuracy can be merged, for example the sketches of
+    several worker processes, and the merged sketch is the same as the
+    sketch of all the values.
+
+    ...
+
+    Attributes
+    ----------
+    relative_accuracy : float
+        The relative error of the estimated quantiles.
+    max_buckets : int
+        The largest number of buckets kept. When there are more, the lowest
+        buckets are collapsed into one, so only the lowest quantiles lose
+        accuracy.
+    count : int
+        The number of values added.
+    total : float
+        The sum of the values added.
+    min, max : float or None
+        The smallest and largest values added, or None if there are none.
+    ...
+
+    Methods
+    -------
+    add(values)
+        adds a value or an array of values
+    merge(other)
+        adds the values of another sketch
+    quantile(q)
+        estimates the q quantile of the values
+    ...
+
+    Example
+    -------
+    import elevator_metrics
+    sketch = elevator_metrics.QuantileSketch(relative_accuracy = 0.01)
+    sketch.add([30, 50, 120])
+    sketch.quantile(0.5)
+
+
+    '''
+    def __init__(self, relative_accuracy = 0.01, max_buckets = 2048):
+
+        if (type(relative_accuracy) is not float or not 0 < relative_accuracy < 1):
+            raise Exception("relative_accuracy must be a float between 0 and 1")
+        if (type(max_buckets) is not int or max_buckets <= 0):
+            raise Exception("max_buckets must be an integer greater than 0")
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.__gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.__log_gamma = math.log(self.__gamma)
+        self.__zero_count = 0
+        self.__buckets = {}
+
+
+    def __collapse(self):
+        # The purpose of this method is to keep at most max_buckets buckets
+        # by adding the counts of the lowest buckets to the lowest kept one
+        if (len(self.__buckets) <= self.max_buckets):
+            return
+        indexes = sorted(self.__buckets)
+        n_collapsed = len(indexes) - self.max_buckets
+        lowest_kept = indexes[n_collapsed]
+        for i in indexes[:n_collapsed]:
+            self.__buckets[lowest_kept] += self.__buckets.pop(i)
+
+
+    def add(self, values):
+        # The purpose of this method is to add a value or an array of values
+        if (type(values) in (int, float)):
+            self.__add_value(values)
+            return
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if (values.size == 0):
+            return
+        if (np.any(values < 0) or not np.all(np.isfinite(values))):
+            raise Exception("values must be finite and greater than or equal to 0")
+
+        self.count += values.size
+        self.total += float(values.sum())
+        self.min = float(values.min()) if self.min is None else min(self.min, float(values.min()))
+        self.max = float(values.max()) if self.max is None else max(self.max, float(values.max()))
+        positive = values[values > 0]
+        self.__zero_count += values.size - positive.size
+        # each value is counted in the bucket i with gamma^(i-1) < value <= gamma^i
+        indexes, counts = np.unique(np.ceil(np.log(positive) / self.__log_gamma).astype(np.int64),
+                                    return_counts=True)
+        for i, n in zip(indexes.tolist(), counts.tolist()):
+            self.__buckets[i] = self.__buckets.get(i, 0) + n
+        self.__collapse()
+
+
+    def __add_value(self, value):
+        # The purpose of this method is to add a single value without the
+        # overhead of the array functions
+        if (not 0 <= value < math.inf):
+            raise Exception("values must be finite and greater than or equal to 0")
+        
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if (value == 0):
+            self.__zero_count += 1
+            return
+        i = math.ceil(math.log(value) / self.__log_gamma)
+        self.__buckets[i] = self.__buckets.get(i, 0) + 1
+        self.__collapse()
+
+
+    def merge(self, other):
+        # The purpose of this method is to add the values of another sketch
+        # with the same relative accuracy to this one
+        if (type(other) is not QuantileSketch or other.relative_accuracy != self.relative_accuracy):
+            raise Exception("only sketches with the same relative_accuracy can be merged")
+        if (other.count == 0):
+            return self
+
+        self.count += other.count
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self.__zero_count += other.__zero_count
+        for i, n in other.__buckets.items():
+            self.__buckets[i] = self.__buckets.get(i, 0) + n
+        self.__collapse()
+
+        return self
+
+
+    def quantile(self, q):
+        '''
+        Description
+        -----------
+        quantile estimates the q quantile of the values added, within
+        relative_accuracy of the value at the same rank.
+
+        Parameters
+        ----------
+        q : float
+            The quantile, between 0 and 1.
+
+        Returns
+        -------
+        value : float or None
+            The estimated quantile, or None if no values were added.
+        '''
+
+        if (type(q) not in (int, float) or not 0 <= q <= 1):
+            raise Exception("q must be a number between 0 and 1")
+        if (self.count == 0):
+            return None
+
+        rank = q * (self.count - 1)
+        seen = self.__zero_count
+        if (seen > rank):
+            return 0.0
+        for i in sorted(self.__buckets):
+            seen += self.__buckets[i]
+            if (seen > rank):
+                # the value in the middle of the bucket in relative terms
+                value = 2 * self.__gamma ** i / (self.__gamma + 1)
+                return min(max(value, self.min), self.max)
+
+        return self.max
+
+
+    def mean(self):
+        # The purpose of this method is to give the exact mean of the values
+        return self.total / self.count if self.count else None
+
+
+class FleetMetrics():
+    '''
+    Description
+    -----------
+    Class to aggregate the metrics of many elevator trips one trip at a time,
+    without keeping the per-second simulation data. The trips are read from
+    their legs (a TripPlan or ActiveTrip) or from the simulation data of
+    go_to_floor, and added to fixed-size accumulators: a histogram of the
+    stops and of the time spent on each floor, counters of the floors
+    traveled, direction changes and moving time, and quantile sketches of
+    the trip and wait times. The memory used only depends on the height of
+    the building. The metrics of separate processes can be merged.
+
+    ...
+
+    Attributes
+    ----------
+    min_building_floor : int
+        The lowest floor of the building.
+    max_building_floor : int
+        The highest floor of the building.
+    n_trips : int
+        The number of trips added.
+    floor_visits : ndarray
+        The number of stops on each floor, starting at min_building_floor.
+    floor_time : ndarray
+        The number of seconds the elevator was shown on each floor in the
+        simulation data, starting at min_building_floor.
+    floors_traveled : int
+        The number of floors traveled.
+    direction_changes : int
+        The number of times the elevator reversed direction within a trip.
+    moving_time : int or float
+        The time in seconds the elevator was moving.
+    trip_time : int or float
+        The total time in seconds of the trips, including waits.
+    idle_time : int or float
+        The time in seconds the elevator was idle between trips, see
+        add_idle_time.
+    last_floor : int or None
+        The final floor of the last trip added.
+    trip_times : QuantileSketch
+        The sketch of the total time of each trip.
+    wait_times : QuantileSketch
+        The sketch of the passenger wait times, see add_wait_times.
+    ...
+
+    Methods
+    -------
+    add_trip(trip)
+        adds the legs of a TripPlan or ActiveTrip
+    add_rows(sim_data, sec_per_floor)
+        adds the simulation data of one trip from go_to_floor
+    add_wait_times(wait_times)
+        adds passenger wait times
+    add_idle_time(seconds)
+        adds time the elevator was idle
+    merge(other)
+        adds the metrics of another FleetMetrics for the same building
+    utilization()
+        returns the share of the time the elevator was moving
+    summary()
+        returns the metrics as a dictionary
+    ...
+
+    Example
+    -------
+    import elevator, elevator_metrics
+    elev = elevator.Elevator(1, 10, 1, 20)
+    metrics = elevator_metrics.FleetMetrics(1, 20)
+    for desired_floors in [[5, 2], [20], [1, 3]]:
+        metrics.add_trip(elev.plan_trip(desired_floors))
+        elev.current_floor = metrics.last_floor
+    metrics.summary()
+
+
+    '''
+    def __init__(self, min_building_floor = 1, max_building_floor = 20, relative_accuracy = 0.01):
+
+        if (type(min_building_floor) is not int or type(max_building_floor) is not int or
+            max_building_floor < min_building_floor):
+            raise Exception("building floors must be integers with the lowest floor not above the highest")
+        self.min_building_floor = min_building_floor
+        self.max_building_floor = max_building_floor
+        n_floors = max_building_floor - min_building_floor + 1
+        self.n_trips = 0
+        self.floor_visits = np.zeros(n_floors, dtype=np.int64)
+        self.floor_time = np.zeros(n_floors, dtype=np.float64)
+        self.floors_traveled = 0
+        self.direction_changes = 0
+        self.moving_time = 0
+        self.trip_time = 0
+        self.idle_time = 0
+        self.last_floor = None
+        self.trip_times = QuantileSketch(relative_accuracy)
+        self.wait_times = QuantileSketch(relative_accuracy)
+
+
+    def add_trip(self, trip):
+        '''
+        Description
+        -----------
+        add_trip adds the metrics of one trip from its legs. Legs cut short
+        by a change of an ActiveTrip only count the floors actually
+        traveled, and their destination only counts as a stop if it was
+        reached.
+
+        Parameters
+        ----------
+        trip : TripPlan or ActiveTrip
+            The trip to add.
+
+        Returns
+        -------
+        None.
+        '''
+
+        trip_plan = trip.plan() if isinstance(trip, elevator.ActiveTrip) else trip
+        if (not isinstance(trip_plan, elevator.TripPlan)):
+            raise Exception("trip must be a TripPlan or ActiveTrip")
+        start_floor = trip_plan.leg_start_floor
+        end_floor = trip_plan.leg_end_floor
+        if (min(start_floor.min(), end_floor.min()) < self.min_building_floor or
+            max(start_floor.max(), end_floor.max()) > self.max_building_floor):
+            raise Exception("the trip has floors outside of the building")
+        sec_per_floor = trip_plan.sec_per_floor
+
+        ###############################
+        ## Floors of each leg        ##
+        ###############################
+        # each leg lasts until the next one starts, which may be before its
+        # destination is reached
+        duration = np.append(trip_plan.leg_start_time[1:], trip_plan.total_time) - trip_plan.leg_start_time
+        # a leg starting between two floors is timed from when the elevator
+        # left its start floor
+        phase = 0 if trip_plan.leg_phase is None else trip_plan.leg_phase
+        direction = np.sign(end_floor - start_floor)
+        n_floors = np.abs(end_floor - start_floor)
+        floors_moved = np.minimum(n_floors, np.floor((duration + phase) / sec_per_floor + 1e-9).
+                                  astype(np.int64))
+        floors_moved[direction == 0] = 0
+        # the floor the leg ends on and the time spent there, which is the
+        # whole leg for a wait
+        stop_floor = start_floor + direction * floors_moved
+        stop_time = duration + phase - floors_moved * sec_per_floor
+        # the elevator moves until it reaches the destination of the leg,
+        # which may be cut short between two floors
+        moving_time = np.minimum(duration, n_floors * sec_per_floor - phase)[direction != 0]
+
+        ###############################
+        ## Accumulate                ##
+        ###############################
+        # every floor passed in a leg is shown for sec_per_floor seconds. The
+        # floors of each leg are a range, so they are added with a
+        # difference array
+        n = self.floor_time.size
+        moved = floors_moved > 0
+        last_passed = start_floor + direction * (floors_moved - 1)
+        low = np.minimum(start_floor, last_passed)[moved] - self.min_building_floor
+        high = np.maximum(start_floor, last_passed)[moved] - self.min_building_floor
+        passes = np.bincount(low, minlength=n + 1) - np.bincount(high + 1, minlength=n + 1)
+        self.floor_time += np.cumsum(passes[:-1]) * sec_per_floor
+        self.floor_time += np.bincount(stop_floor - self.min_building_floor, stop_time, minlength=n)
+        if (trip_plan.leg_phase is not None):
+            # the start floor was already left before the leg started
+            self.floor_time -= np.bincount(start_floor - self.min_building_floor, phase, minlength=n)
+        self.floor_visits += np.bincount(end_floor[moved & (floors_moved == n_floors)] -
+                                         self.min_building_floor, minlength=n)
+
+        directions = direction[(direction != 0) & (duration > 0)]
+        self.direction_changes += int(np.count_nonzero(directions[1:] != directions[:-1]))
+        self.floors_traveled += int(floors_moved.sum())
+        self.moving_time += moving_time.sum().item()
+        self.trip_time += trip_plan.total_time
+        self.trip_times.add(trip_plan.total_time)
+        self.n_trips += 1
+        self.last_floor = trip_plan.final_floor
+
+
+    def add_rows(self, sim_data, sec_per_floor):
+        '''
+        Description
+        -----------
+        add_rows adds the metrics of one trip from its simulation data, as
+        returned by go_to_floor in any output format. The stops of the trip
+        are read from the rows, and the trip is added with add_trip. A leg 
+        without any row cannot be seen in the data, so the time between 
+        two rows must not be more than sec_per_floor: the time step must be
+        at most sec_per_floor, or "floors".
+
+        Parameters
+        ----------
+        sim_data : DataFrame, structured ndarray or dict
+            The simulation data of one whole trip.
+        sec_per_floor : int or float
+            The speed of the elevator in number of seconds to move one floor.
+
+        Returns
+        -------
+        None.
+        '''
+
+        if (type(sec_per_floor) not in (int, float) or sec_per_floor <= 0):
+            raise Exception("sec_per_floor must be a number greater than 0")
+        time_elapsed = np.asarray(sim_data["time_elapsed"])
+        current_floor = np.asarray(sim_data["current_floor"], dtype=np.int64)
+        # the final row has no next destination
+        next_destination = np.asarray(sim_data["next_destination"][:-1], dtype=np.int64)
+        if (next_destination.size == 0):
+            raise Exception("sim_data must contain a whole trip")
+        if (np.any(np.diff(time_elapsed) > sec_per_floor + 1e-9)):
+            raise Exception("the time between two rows must not be more than sec_per_floor, "
+                            "so that every leg of the trip has a row")
+
+        # the stops are the runs of the next destination column
+        is_new = np.append(True, next_destination[1:] != next_destination[:-1])
+        floor_checkpoints = np.append(current_floor[0], next_destination[is_new])
+        trip_plan = elevator.TripPlan(floor_checkpoints, sec_per_floor)
+        if (not math.isclose(trip_plan.total_time, time_elapsed[-1].item(), abs_tol = 1e-9)):
+            raise Exception("the rows do not match a trip at {} seconds per floor".format(sec_per_floor))
+
+        self.add_trip(trip_plan)
+
+
+    def add_wait_times(self, wait_times):
+        # The purpose of this method is to add the wait times of passengers,
+        # such as the wait_time column of ElevatorBank.run
+        self.wait_times.add(np.asarray(wait_times, dtype=np.float64))
+
+
+    def add_idle_time(self, seconds):
+        # The purpose of this method is to add time the elevator was idle
+        # between trips, which counts in the utilization
+        if (type(seconds) not in (int, float) or seconds < 0):
+            raise Exception("seconds must be a number greater than or equal to 0")
+        self.idle_time += seconds
+
+
+    def merge(self, other):
+        '''
+        Description
+        -----------
+        merge adds the metrics of another FleetMetrics, for example one
+        computed in another process, to these metrics.
+
+        Parameters
+        ----------
+        other : FleetMetrics
+            The metrics to add. They must be for the same building floors
+            and have the same relative accuracy.
+
+        Returns
+        -------
+        self : FleetMetrics
+            These metrics, so several merges can be chained.
+        '''
+
+        if (type(other) is not FleetMetrics or
+            (other.min_building_floor, other.max_building_floor) !=
+            (self.min_building_floor, self.max_building_floor)):
+            raise Exception("only metrics of the same building floors can be merged")
+
+        self.trip_times.merge(other.trip_times)
+        self.wait_times.merge(other.wait_times)
+        self.n_trips += other.n_trips
+        self.floor_visits += other.floor_visits
+        self.floor_time += other.floor_time
+        self.floors_traveled += other.floors_traveled
+        self.direction_changes += other.direction_changes
+        self.moving_time += other.moving_time
+        self.trip_time += other.trip_time
+        self.idle_time += other.idle_time
+        if (other.last_floor is not None):
+            self.last_floor = other.last_floor
+
+        return self
+
+
+    def utilization(self):
+        # The purpose of this method is to give the share of the trip and
+        # idle time that the elevator was moving
+        total_time = self.trip_time + self.idle_time
+        return self.moving_time / total_time if total_time else None
+
+
+    def summary(self, quantiles = (0.5, 0.9, 0.99)):
+        '''
+        Description
+        -----------
+        summary returns the metrics as a dictionary of plain Python values,
+        which can be written as JSON.
+
+        Parameters
+        ----------
+        quantiles : sequence of floats, optional
+            The quantiles of the trip and wait times reported. The default
+            is (0.5, 0.9, 0.99).
+
+        Returns
+        -------
+        summary : dict
+            Dictionary with the counters, the utilization, the floors and
+            their visits and time, and the mean and quantiles of the trip
+            and wait times keyed as trip_time_p50, wait_time_p99, etc.
+        '''
+
+        summary = {
+            "n_trips":self.n_trips,
+            "floors_traveled":self.floors_traveled,
+            "direction_changes":self.direction_changes,
+            "moving_time":self.moving_time,
+            "trip_time":self.trip_time,
+            "idle_time":self.idle_time,
+            "utilization":self.utilization(),
+            "floors":list(range(self.min_building_floor, self.max_building_floor + 1)),
+            "floor_visits":self.floor_visits.tolist(),
+            "floor_time":self.floor_time.tolist()
+            }
+        for name, sketch in [("trip_time", self.trip_times), ("wait_time", self.wait_times)]:
+            summary[name + "_mean"] = sketch.mean()
+            for q in quantiles:
+                summary["{}_p{:g}".format(name, q * 100)] = sketch.quantile(q)
+
+        return summary
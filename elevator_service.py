@@ -0,0 +1,736 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This script runs a local JSON service answering trip simulation and
+# summary requests, so several tools can share one warm process instead of
+# each importing elevator.py and building the simulations themselves.
+# Example:
+#     python elevator_service.py --port 8765 --workers 4
+#     python elevator_service.py --unix /tmp/elevator.sock
+#     python elevator_service.py --port 8765 --load-test 100000
+#
+# The service reads one JSON request per line and writes one JSON response
+# per line, with the "id" of the request, e.g.
+#     {"id": 1, "op": "summary", "start_floor": 1, "floors": [3, 1, 2]}
+#     {"id": 1, "result": {"total_time": 50, "floors_traveled": 5, ...}}
+# Responses are written as soon as they are ready, so they may not be in
+# the order of the requests.
+
+import argparse
+import asyncio
+import collections
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import elevator
+
+
+OPS = ["summary", "simulate", "stats"]
+SIM_COLUMNS = ["time_elapsed", "current_floor", "floors_to_next_dest", "time_to_next_dest",
+               "next_destination"]
+
+
+def _encode_columns(columns):
+    # The purpose of this function is to encode the simulation columns as
+    # JSON. The next destination columns have no value (null) in the row
+    # where the final floor is reached
+    arrived = columns["arrived"]
+    result = {}
+    for name in SIM_COLUMNS:
+        values = columns[name].tolist()
+        if (name in ["floors_to_next_dest", "time_to_next_dest", "next_destination"]):
+            for i in np.flatnonzero(arrived).tolist():
+                values[i] = None
+        result[name] = values
+
+    return json.dumps(result)
+
+
+def _simulate_trip(start_floor, floors, sec_per_floor, time_step, min_building_floor,
+                   max_building_floor):
+    # The purpose of this function is to simulate one trip and encode the
+    # columns as JSON. It is run in the worker processes for heavy trips, so
+    # the encoding of the large results does not block the event loop
+    config = elevator.ElevatorConfig(sec_per_floor, min_building_floor, max_building_floor)
+    trip_plan = elevator.plan_trip(start_floor, floors, config)
+
+    return _encode_columns(trip_plan.get_columns(trip_plan.sample_times(time_step), False, True))
+
+
+class SimulationService():
+    '''
+    Description
+    -----------
+    Class to answer trip summary and simulation requests for a building.
+    Identical requests that arrive while one of them is running share its
+    result instead of being run again. Small requests arriving within
+    batch_delay of each other are run together: all the summaries with one
+    summarize_batch call and the simulations with one simulate_batch call
+    per speed. Trips with more than heavy_rows rows are run on a pool of
+    worker processes. The service is used from an asyncio event loop,
+    either directly with submit or through the server started by serve.
+
+    ...
+
+    Attributes
+    ----------
+    config : ElevatorConfig
+        The default speed and the building floors of the requests.
+    workers : int
+        The number of worker processes for heavy trips. If 0, heavy trips
+        are run on a thread of the event loop.
+    batch_delay : float
+        The time in seconds a small request waits for others to be batched
+        with.
+    max_batch : int
+        The largest number of requests run in one batch.
+    heavy_rows : int
+        The number of rows above which a simulation is run on the workers.
+    ...
+
+    Methods
+    -------
+    submit(record)
+        runs one request and returns the JSON text of its result
+    handle_line(line)
+        runs one request line and returns the JSON text of its response
+    handle_connection(reader, writer)
+        answers the request lines of a connection
+    stats()
+        returns the request, batching and latency counters
+    close()
+        shuts down the worker processes
+    ...
+
+    Example
+    -------
+    import asyncio, elevator_service
+
+    async def main():
+        service = elevator_service.SimulationService(workers = 2)
+        server = await elevator_service.serve(service, port = 8765)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(main())
+
+
+    '''
+
+    def __init__(self, sec_per_floor = 10, min_building_floor = 1, max_building_floor = 20,
+                 workers = 0, batch_delay = 0.002, max_batch = 4096, heavy_rows = 100000):
+
+        self.config = elevator.ElevatorConfig(sec_per_floor, min_building_floor, max_building_floor)
+        if (type(workers) is not int or workers < 0):
+            raise Exception("workers must be an integer greater than or equal to 0")
+        if (type(max_batch) is not int or max_batch <= 0):
+            raise Exception("max_batch must be an integer greater than 0")
+        self.workers = workers
+        self.batch_delay = batch_delay
+        self.max_batch = max_batch
+        self.heavy_rows = heavy_rows
+        self.__executor = None
+        self.__in_flight = {}
+        self.__pending = []
+        self.__flush_handle = None
+        self.__start_time = time.monotonic()
+        self.__latencies = collections.deque(maxlen = 10000)
+        self.__counters = {"requests":0, "errors":0, "coalesced":0, "batches":0,
+                           "batched_requests":0, "pool_requests":0}
+
+
+    ###############################
+    ## Requests                  ##
+    ###############################
+    def __parse_request(self, record):
+        # The purpose of this method is to check a request and return its
+        # key, with the floors in the order they are visited. The checks
+        # are the same as Elevator.go_to_floor
+
+        if (type(record) is not dict):
+            raise Exception("each request must be a JSON object")
+        op = record.get("op", "summary")
+        if (op not in OPS):
+            raise Exception("op must be one of {}".format(OPS))
+        if (op == "stats"):
+            return (op,)
+        try:
+            start_floor = record["start_floor"]
+            floors = record["floors"]
+        except KeyError as error:
+            raise Exception("missing field {}".format(error))
+        sec_per_floor = record.get("sec_per_floor", self.config.sec_per_floor)
+        time_step = record.get("time_step", 1)
+        order = record.get("order")
+
+        config = self.config.replace(sec_per_floor = sec_per_floor) if "sec_per_floor" in record \
+            else self.config
+        if (type(floors) is int):
+            floors = [floors]
+        if (type(floors) is not list or len(floors) == 0):
+            raise Exception("floors must be a floor number or a non-empty list of floors")
+        if (not all(type(x) is int for x in floors) or type(start_floor) is not int):
+            raise Exception("all floors must be integers")
+        if (min(floors + [start_floor]) < config.min_building_floor or
+            max(floors + [start_floor]) > config.max_building_floor):
+            raise Exception("all floors must be on or within the min/max floors of the building")
+        if (all(x == start_floor for x in floors)):
+            raise Exception("must enter at least one floor that is not the start floor: {}". \
+                            format(start_floor))
+        if (time_step != "floors" and (type(time_step) not in (int, float) or time_step <= 0)):
+            raise Exception("time_step must be a number greater than 0 or \"floors\"")
+        if (op == "summary"):
+            time_step = 1
+        if (order is not None):
+            floors = elevator.order_stops(start_floor, floors, order, config.min_building_floor,
+                                          config.max_building_floor)
+
+        # the types are part of the key since float speeds and time steps
+        # give float time columns
+        return (op, start_floor, tuple(floors), sec_per_floor, type(sec_per_floor).__name__,
+                time_step, type(time_step).__name__)
+
+
+    async def submit(self, record):
+        '''
+        Description
+        -----------
+        submit runs one request and returns the JSON text of its result. If
+        an identical request is already running, its result is shared.
+
+        Parameters
+        ----------
+        record : dict
+            The request, with the fields:
+                - op: "summary" (the default), "simulate" or "stats".
+                - start_floor: the floor the trip starts on.
+                - floors: the floor or list of floors to travel to.
+                - sec_per_floor: the speed of the trip, optional.
+                - order: reorders the floors, see order_stops, optional.
+                - time_step: the time between the simulated rows, see
+                    Elevator.go_to_floor, optional.
+
+        Returns
+        -------
+        result : str
+            The JSON text of the result. Summaries have the same fields as
+            Elevator.trip_summary and simulations have one list per column
+            of the simulation data, where the next destination columns are
+            null in the final row.
+        '''
+
+        start_time = time.monotonic()
+        self.__counters["requests"] += 1
+        try:
+            key = self.__parse_request(record)
+            if (key[0] == "stats"):
+                return json.dumps(self.stats())
+            future = self.__in_flight.get(key)
+            if (future is None):
+                future = self.__start(key)
+            else:
+                self.__counters["coalesced"] += 1
+            # the future is shielded so a cancelled caller does not cancel
+            # the requests coalesced with it
+            return await asyncio.shield(future)
+        except Exception:
+            self.__counters["errors"] += 1
+            raise
+        finally:
+            self.__latencies.append(time.monotonic() - start_time)
+
+
+    def __start(self, key):
+        # The purpose of this method is to start a new request, either in the
+        # next batch or on the workers, and keep it in flight until it is done
+        loop = asyncio.get_running_loop()
+        op, start_floor, floors, sec_per_floor = key[:4]
+        time_step = key[5]
+
+        if (op == "simulate" and self.__estimate_rows(start_floor, floors, sec_per_floor,
+                                                      time_step) > self.heavy_rows):
+            self.__counters["pool_requests"] += 1
+            args = (start_floor, list(floors), sec_per_floor, time_step, self.config.min_building_floor,
+                    self.config.max_building_floor)
+            future = asyncio.ensure_future(loop.run_in_executor(self.__get_executor(),
+                                                                _simulate_trip, *args))
+        else:
+            future = loop.create_future()
+            self.__pending.append((key, future))
+            if (len(self.__pending) >= self.max_batch):
+                self.__flush()
+            elif (self.__flush_handle is None):
+                self.__flush_handle = loop.call_later(self.batch_delay, self.__flush)
+
+        self.__in_flight[key] = future
+        future.add_done_callback(lambda x: self.__in_flight.pop(key, None))
+        return future
+
+
+    def __estimate_rows(self, start_floor, floors, sec_per_floor, time_step):
+        # The purpose of this method is to estimate the number of rows of a
+        # simulation from the floors traveled
+        checkpoints = (start_floor,) + floors
+        floors_traveled = sum(abs(checkpoints[i + 1] - checkpoints[i]) for i in range(len(floors)))
+        if (time_step == "floors"):
+            return floors_traveled + 1
+
+        return floors_traveled * sec_per_floor / time_step + 1
+
+
+    def __get_executor(self):
+        # The purpose of this method is to start the worker processes the
+        # first time a heavy trip is requested
+        if (self.workers == 0):
+            return None
+        if (self.__executor is None):
+            self.__executor = ProcessPoolExecutor(max_workers = self.workers)
+
+        return self.__executor
+
+
+    ###############################
+    ## Batches                   ##
+    ###############################
+    def __flush(self):
+        # The purpose of this method is to run the pending requests as one
+        # batch and set their results
+        if (self.__flush_handle is not None):
+            self.__flush_handle.cancel()
+            self.__flush_handle = None
+        batch, self.__pending = self.__pending, []
+        if (not batch):
+            return
+        self.__counters["batches"] += 1
+        self.__counters["batched_requests"] += len(batch)
+
+        summaries = [x for x in batch if x[0][0] == "summary"]
+        # simulate_batch covers the trips with time steps of one second,
+        # grouped by speed and its type since float speeds give float time
+        # columns. The other simulations are planned one by one
+        simulations, others = {}, []
+        for key, future in batch:
+            if (key[0] != "simulate"):
+                continue
+            if (key[5] == 1 and key[6] == "int"):
+                simulations.setdefault(key[3:5], []).append((key, future))
+            else:
+                others.append((key, future))
+
+        groups = [(self.__run_summaries, summaries)] + \
+            [(self.__run_simulations, x) for x in simulations.values()] + \
+            [(self.__run_other, [x]) for x in others]
+        for run, requests in groups:
+            if (not requests):
+                continue
+            try:
+                results = run([x[0] for x in requests])
+            except Exception as error:
+                for key, future in requests:
+                    if (not future.done()):
+                        future.set_exception(Exception(str(error)))
+                continue
+            for (key, future), result in zip(requests, results):
+                if (not future.done()):
+                    future.set_result(result)
+
+
+    def __run_summaries(self, keys):
+        # The purpose of this method is to compute the summaries of a batch
+        # with one summarize_batch call at 1 second per floor, scaled by
+        # the speed of each trip
+        summaries = elevator.summarize_batch([x[1] for x in keys], [list(x[2]) for x in keys], 1,
+                                             self.config.min_building_floor,
+                                             self.config.max_building_floor)
+        offsets = summaries["offsets"].tolist()
+        arrival_times = summaries["arrival_times"].tolist()
+        results = []
+        for i, key in enumerate(keys):
+            speed = key[3]
+            results.append(json.dumps({
+                "total_time":summaries["total_time"][i].item() * speed,
+                "floors_traveled":summaries["floors_traveled"][i].item(),
+                "arrival_times":[x * speed for x in arrival_times[offsets[i]:offsets[i + 1]]],
+                "final_floor":summaries["final_floor"][i].item()
+                }))
+
+        return results
+
+
+    def __run_simulations(self, keys):
+        # The purpose of this method is to simulate the trips of a batch
+        # with the same speed with one simulate_batch call, and split the
+        # rows by trip
+        columns = elevator.simulate_batch([x[1] for x in keys], [list(x[2]) for x in keys], keys[0][3],
+                                          self.config.min_building_floor,
+                                          self.config.max_building_floor, output = "dict")
+        offsets = np.searchsorted(columns["trip_id"], np.arange(len(keys) + 1))
+
+        return [_encode_columns({name:values[offsets[i]:offsets[i + 1]]
+                                 for name, values in columns.items()})
+                for i in range(len(keys))]
+
+
+    def __run_other(self, keys):
+        # The purpose of this method is to simulate a small trip that does
+        # not fit simulate_batch
+        key = keys[0]
+        return [_simulate_trip(key[1], list(key[2]), key[3], key[5], self.config.min_building_floor,
+                               self.config.max_building_floor)]
+
+
+    ###############################
+    ## Connections               ##
+    ###############################
+    async def handle_line(self, line):
+        '''
+        Description
+        -----------
+        handle_line runs one request line and returns the line of its
+        response. Invalid requests get a response with an "error" message
+        instead of a "result".
+
+        Parameters
+        ----------
+        line : str or bytes
+            The JSON text of the request.
+
+        Returns
+        -------
+        response : str
+            The JSON text of the response, without a newline.
+        '''
+
+        request_id = None
+        try:
+            record = json.loads(line)
+            if (type(record) is dict):
+                request_id = record.get("id")
+            result = await self.submit(record)
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            return json.dumps({"id":request_id, "error":str(error)})
+
+        return '{{"id": {}, "result": {}}}'.format(json.dumps(request_id), result)
+
+
+    async def handle_connection(self, reader, writer):
+        # The purpose of this method is to answer the request lines of a
+        # connection. Each line is run as its own task, so the requests of
+        # one connection are batched and coalesced with each other
+        tasks = set()
+        # the writer is drained after each response so large responses wait
+        # for the client to read them. Only one task drains at a time since
+        # Python 3.9 does not allow concurrent drains
+        write_lock = asyncio.Lock()
+
+        async def answer(line):
+            response = await self.handle_line(line)
+            async with write_lock:
+                writer.write(response.encode() + b"\n")
+                await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if (not line):
+                    break
+                if (not line.strip()):
+                    continue
+                task = asyncio.ensure_future(answer(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+
+    ###############################
+    ## Counters                  ##
+    ###############################
+    def stats(self):
+        '''
+        Description
+        -----------
+        stats returns the counters of the service since it was created.
+
+        Returns
+        -------
+        stats : dict
+            Dictionary with the number of requests, errors, coalesced
+            requests, batches, batched requests and requests run on the
+            workers, the number of requests in flight, the uptime in
+            seconds, the throughput in requests per second and the mean,
+            50th, 99th percentile and maximum latency in milliseconds of
+            the last 10,000 requests.
+        '''
+
+        stats = dict(self.__counters)
+        stats["in_flight"] = len(self.__in_flight)
+        stats["uptime"] = time.monotonic() - self.__start_time
+        stats["throughput"] = stats["requests"] / stats["uptime"]
+        latencies = np.array(self.__latencies) * 1000
+        for name, value in [("mean", "mean"), ("p50", 50), ("p99", 99), ("max", "max")]:
+            if (latencies.size == 0):
+                stats["latency_" + name] = None
+            elif (type(value) is int):
+                stats["latency_" + name] = float(np.percentile(latencies, value))
+            else:
+                stats["latency_" + name] = float(getattr(latencies, value)())
+
+        return stats
+
+
+    def close(self):
+        # The purpose of this method is to shut down the worker processes
+        if (self.__executor is not None):
+            self.__executor.shutdown()
+            self.__executor = None
+
+
+async def serve(service, host = "127.0.0.1", port = 8765, path = None):
+    '''
+    Description
+    -----------
+    serve starts a server answering the request lines of its connections
+    with a SimulationService. The server only listens on the local machine
+    unless another host is given.
+
+    Parameters
+    ----------
+    service : SimulationService
+        The service answering the requests.
+    host : str, optional
+        The address to listen on. The default is "127.0.0.1".
+    port : int, optional
+        The TCP port to listen on. Port 0 picks a free port. The default
+        is 8765.
+    path : str or None, optional
+        If given, the server listens on this Unix socket instead of a TCP
+        port. The default is None.
+
+    Returns
+    -------
+    server : asyncio.Server
+        The started server.
+    '''
+
+    if (path is not None):
+        return await asyncio.start_unix_server(service.handle_connection, path, limit = 2 ** 20)
+    return await asyncio.start_server(service.handle_connection, host, port, limit = 2 ** 20)
+
+
+class ServiceClient():
+    '''
+    Description
+    -----------
+    Class to send requests to a running service over one connection. Any
+    number of requests can be waiting for their responses at a time.
+
+    ...
+
+    Methods
+    -------
+    connect(host, port, path)
+        connects to a service
+    request(op, **fields)
+        sends one request and returns its result
+    close()
+        closes the connection
+    ...
+
+    Example
+    -------
+    client = await elevator_service.ServiceClient.connect(port = 8765)
+    summary = await client.request("summary", start_floor = 1, floors = [3, 1, 2])
+    await client.close()
+
+
+    '''
+
+    def __init__(self, reader, writer):
+
+        self.__reader = reader
+        self.__writer = writer
+        self.__responses = {}
+        self.__next_id = 0
+        self.__read_task = asyncio.ensure_future(self.__read_responses())
+
+
+    @classmethod
+    async def connect(cls, host = "127.0.0.1", port = 8765, path = None):
+        # The purpose of this method is to connect to a service on a TCP port
+        # or a Unix socket
+        if (path is not None):
+            reader, writer = await asyncio.open_unix_connection(path, limit = 2 ** 26)
+        else:
+            reader, writer = await asyncio.open_connection(host, port, limit = 2 ** 26)
+
+        return cls(reader, writer)
+
+
+    async def __read_responses(self):
+        # The purpose of this method is to pass each response to the request
+        # with the same id
+        try:
+            while True:
+                line = await self.__reader.readline()
+                if (not line):
+                    break
+                response = json.loads(line)
+                future = self.__responses.pop(response["id"], None)
+                if (future is None or future.done()):
+                    continue
+                if ("error" in response):
+                    future.set_exception(Exception(response["error"]))
+                else:
+                    future.set_result(response["result"])
+        finally:
+            for future in self.__responses.values():
+                if (not future.done()):
+                    future.set_exception(Exception("the connection to the service was closed"))
+
+
+    async def request(self, op = "summary", **fields):
+        # The purpose of this method is to send one request and wait for its
+        # result
+        request_id = self.__next_id
+        self.__next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self.__responses[request_id] = future
+        self.__writer.write(json.dumps(dict(fields, id = request_id, op = op)).encode() + b"\n")
+        await self.__writer.drain()
+
+        return await future
+
+
+    async def close(self):
+        # The purpose of this method is to close the connection
+        self.__writer.close()
+        await self.__read_task
+
+
+async def load_test(client, n_requests, concurrency = 100, op = "summary", n_floors = 5,
+                    min_building_floor = 1, max_building_floor = 20, seed = None):
+    '''
+    Description
+    -----------
+    load_test sends random trip requests to a service and measures the
+    throughput and latency seen by the client.
+
+    Parameters
+    ----------
+    client : ServiceClient
+        The connection to the service.
+    n_requests : int
+        The number of requests sent.
+    concurrency : int, optional
+        The number of requests waiting for their responses at a time.
+        The default is 100.
+    op : str, optional
+        "summary" or "simulate". The default is "summary".
+    n_floors : int, optional
+        The number of desired floors of each trip. The default is 5.
+    min_building_floor : int, optional
+        The lowest floor of the random trips. The default is 1.
+    max_building_floor : int, optional
+        The highest floor of the random trips. The default is 20.
+    seed : int or None, optional
+        The seed of the random trips. The default is None.
+
+    Returns
+    -------
+    results : dict
+        Dictionary with the number of requests and errors, the wall time,
+        the throughput in requests per second and the 50th and 99th
+        percentile latency in milliseconds, and the counters of the
+        service after the test (see SimulationService.stats).
+    '''
+
+    rng = np.random.default_rng(seed)
+    trips = rng.integers(min_building_floor, max_building_floor + 1, (n_requests, n_floors + 1)).tolist()
+    latencies = []
+    errors = 0
+    next_trip = iter(range(n_requests))
+
+    async def run():
+        nonlocal errors
+        for i in next_trip:
+            start_time = time.monotonic()
+            try:
+                await client.request(op, start_floor = trips[i][0], floors = trips[i][1:])
+            except Exception:
+                errors += 1
+            latencies.append(time.monotonic() - start_time)
+
+    start_time = time.monotonic()
+    await asyncio.gather(*[run() for i in range(concurrency)])
+    wall_time = time.monotonic() - start_time
+    latencies = np.array(latencies) * 1000
+    stats = await client.request("stats")
+
+    return {"requests":n_requests, "errors":errors, "wall_time":wall_time,
+            "throughput":n_requests / wall_time, "latency_p50":float(np.percentile(latencies, 50)),
+            "latency_p99":float(np.percentile(latencies, 99)), "service":stats}
+
+
+def main(argv = None):
+    # The purpose of this function is to run the service, or a load test
+    # against a running service, from the command line
+    parser = argparse.ArgumentParser(description = "Run a local elevator simulation service.")
+    parser.add_argument("--host", default = "127.0.0.1", help = "address to listen on (default 127.0.0.1)")
+    parser.add_argument("--port", type = int, default = 8765, help = "TCP port (default 8765)")
+    parser.add_argument("--unix", help = "listen on this Unix socket instead of a TCP port")
+    parser.add_argument("--workers", type = int, default = 0,
+                        help = "number of worker processes for heavy trips (default 0)")
+    parser.add_argument("--sec-per-floor", type = int, default = 10,
+                        help = "speed of requests without a sec_per_floor (default 10)")
+    parser.add_argument("--min-floor", type = int, default = 1, help = "lowest building floor (default 1)")
+    parser.add_argument("--max-floor", type = int, default = 20, help = "highest building floor (default 20)")
+    parser.add_argument("--load-test", type = int, metavar = "N",
+                        help = "send N random requests to a running service and report the results")
+    parser.add_argument("--concurrency", type = int, default = 100,
+                        help = "requests in flight during a load test (default 100)")
+    parser.add_argument("--op", choices = ["summary", "simulate"], default = "summary",
+                        help = "requests sent during a load test (default summary)")
+    args = parser.parse_args(argv)
+
+    async def run_load_test():
+        client = await ServiceClient.connect(args.host, args.port, args.unix)
+        try:
+            results = await load_test(client, args.load_test, args.concurrency, args.op,
+                                      min_building_floor = args.min_floor,
+                                      max_building_floor = args.max_floor)
+        finally:
+            await client.close()
+        print(json.dumps(results, indent = 2))
+
+    async def run_service():
+        service = SimulationService(args.sec_per_floor, args.min_floor, args.max_floor, args.workers)
+        server = await serve(service, args.host, args.port, args.unix)
+        sys.stderr.write("listening on {}\n".format(args.unix or "{}:{}".format(args.host, args.port)))
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            service.close()
+
+    try:
+        asyncio.run(run_load_test() if args.load_test else run_service())
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import struct
+import numpy as np
+import elevator
+
+
+# the columns written by the sinks, in order
+COLUMNS = ["trip_id", "time_elapsed", "current_floor", "floors_to_next_dest",
+           "time_to_next_dest", "next_destination", "arrived"]
+
+# the fixed size of the .npy header, so it can be rewritten with the final
+# number of rows when the sink is closed
+_NPY_HEADER_SIZE = 512
+
+
+def _npy_header(dtype, n_rows):
+    # The purpose of this function is to create a version 1.0 .npy header
+    # padded with spaces to a fixed size
+    header = repr({"descr":np.lib.format.dtype_to_descr(dtype), "fortran_order":False,
+                   "shape":(n_rows,)}).encode("latin1")
+    # magic string, version, header length, header, padding and newline
+    padding = _NPY_HEADER_SIZE - 10 - len(header) - 1
+    if (padding < 0):
+        raise Exception("the column dtypes do not fit in the .npy header")
+
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", _NPY_HEADER_SIZE - 10) + header + \
+        b" " * padding + b"\n"
+
+
+class NpySink():
+    '''
+    Description
+    -----------
+    Class to write simulation data to a .npy file holding a structured array
+    with one field per column, in bounded-size chunks. The file is reopened
+    with NpyReader as a memory map, so it can be read without copying or
+    loading the whole file. A second file (path + ".trips.npy") holds the
+    first and last row of every trip.
+
+    ...
+
+    Attributes
+    ----------
+    path : str
+        The path of the .npy file.
+    chunk_rows : int
+        The number of rows buffered in memory before they are written.
+    n_rows : int
+        The number of rows written so far.
+    ...
+
+    Example
+    -------
+    import elevator, elevator_sink
+    elev = elevator.Elevator()
+    with elevator_sink.NpySink("sim.npy") as sink:
+        elevator_sink.write_trip(sink, elev, [20, 1, 15])
+    reader = elevator_sink.NpyReader("sim.npy")
+    window = reader.window(trip_id = 0, start_time = 100, end_time = 200)
+
+
+    '''
+    def __init__(self, path, chunk_rows = 65536):
+
+        if (type(chunk_rows) is not int or chunk_rows <= 0):
+            raise Exception("chunk_rows must be an integer greater than 0")
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.n_rows = 0
+        self.__file = open(path, "wb")
+        self.__dtype = None
+        self.__buffer = []
+        self.__buffered_rows = 0
+        # the trip index as lists of trip ids and their first and last rows
+        self.__trip_ids = []
+        self.__trip_starts = []
+        self.__trip_stops = []
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    def write(self, columns):
+        '''
+        Description
+        -----------
+        write adds rows to the sink. The rows of a trip must be written
+        together and in time order, as produced by go_to_floor or
+        simulate_batch.
+
+        The dtypes of the file are set by the first chunk, and every later
+        chunk must be safely castable to them, so a compact or integer time
+        chunk cannot be followed by a wider or fractional one.
+
+Parameters
+        ----------
+        columns : dict
+            Dictionary of equal length arrays with the COLUMNS keys, such as
+            the "dict" output of simulate_batch or the chunks of
+            iter_go_to_floor with an added trip_id.
+        '''
+
+        # the dtype of the file is set by the first chunk
+        if (self.__dtype is None):
+            self.__dtype = np.dtype([(name, np.asarray(columns[name]).dtype) for name in COLUMNS])
+            self.__file.write(_npy_header(self.__dtype, 0))
+
+        n_rows = len(columns["trip_id"])
+        records = np.empty(n_rows, dtype=self.__dtype)
+        for name in COLUMNS:
+            values = np.asarray(columns[name])
+            # the later chunks must fit the dtypes of the file without
+            # wrapping around or losing their fractions
+            if (not np.can_cast(values.dtype, self.__dtype[name], "safe")):
+                raise Exception("the {} column is {} but the file holds {}, write every chunk with "
+                                "the same dtypes (for example without compact)". \
+                                format(name, values.dtype, self.__dtype[name]))
+            records[name] = values
+        self.__index_trips(records["trip_id"])
+
+        self.__buffer.append(records)
+        self.__buffered_rows += n_rows
+        if (self.__buffered_rows >= self.chunk_rows):
+            self.flush()
+
+
+    def __index_trips(self, trip_id):
+        # The purpose of this method is to record the first and last row of
+        # every trip in a chunk
+        if (trip_id.size == 0):
+            return
+
+        # the rows where each trip of the chunk starts and stops
+        row = self.n_rows + self.__buffered_rows
+        starts = np.flatnonzero(np.diff(trip_id, prepend = trip_id[0] - 1))
+        stops = np.append(starts[1:], trip_id.size)
+        # a trip continuing from the previous chunk extends its last row
+        if (self.__trip_ids and self.__trip_ids[-1] == trip_id[0]):
+            self.__trip_stops[-1] = int(row + stops[0])
+            starts, stops = starts[1:], stops[1:]
+        self.__trip_ids.extend(trip_id[starts].tolist())
+        self.__trip_starts.extend((row + starts).tolist())
+        self.__trip_stops.extend((row + stops).tolist())
+
+
+    def flush(self):
+        # The purpose of this method is to write the buffered rows to disk
+        for records in self.__buffer:
+            self.__file.write(records.tobytes())
+        self.n_rows += self.__buffered_rows
+        self.__buffer = []
+        self.__buffered_rows = 0
+
+
+    def close(self):
+        '''
+        Description
+        -----------
+        close writes the remaining rows, the final number of rows in the
+        header and the trip index.
+        '''
+
+        if self.__file.closed:
+            return
+        self.flush()
+        if (self.__dtype is None):
+            self.__dtype = np.dtype([(name, np.int64) for name in COLUMNS])
+            self.__file.write(_npy_header(self.__dtype, 0))
+        self.__file.seek(0)
+        self.__file.write(_npy_header(self.__dtype, self.n_rows))
+        self.__file.close()
+
+        trips = np.array([self.__trip_ids, self.__trip_starts, self.__trip_stops], dtype=np.int64)
+        np.save(self.path + ".trips.npy", trips.reshape(3, len(self.__trip_ids)).T)
+
+
+class NpyReader():
+    '''
+    Description
+    -----------
+    Class to read a .npy file written by NpySink as a read only memory map.
+    Only the rows that are accessed are loaded from disk.
+
+    ...
+
+    Attributes
+    ----------
+    data : memmap
+        The structured array of every row in the file.
+    trips : ndarray
+        One row of (trip_id, first row, last row + 1) per trip.
+    ...
+    '''
+    def __init__(self, path):
+
+        self.data = np.load(path, mmap_mode = "r")
+        self.trips = np.load(path + ".trips.npy")
+
+
+    def trip(self, trip_id):
+        # The purpose of this method is to get the rows of one trip as a view
+        # of the memory map
+        matches = np.flatnonzero(self.trips[:, 0] == trip_id)
+        if (matches.size == 0):
+            raise Exception("trip {} is not in the file".format(trip_id))
+
+        start, stop = self.trips[matches[0], 1:]
+        return self.data[start:stop]
+
+
+    def window(self, trip_id, start_time, end_time):
+        '''
+        Description
+        -----------
+        window gets the rows of a trip with start_time <= time_elapsed <=
+        end_time, without reading the rest of the file.
+
+        Parameters
+        ----------
+        trip_id : int
+            The trip to read.
+        start_time : int or float
+            The first elapsed time of the window.
+        end_time : int or float
+            The last elapsed time of the window.
+
+        Returns
+        -------
+        rows : memmap
+            Read only view of the rows in the window.
+        '''
+
+        rows = self.trip(trip_id)
+        time_elapsed = rows["time_elapsed"]
+        start = np.searchsorted(time_elapsed, start_time, side = "left")
+        stop = np.searchsorted(time_elapsed, end_time, side = "right")
+        return rows[start:stop]
+
+
+def _import_pyarrow():
+    # The purpose of this function is to import pyarrow, which is only
+    # needed for the Parquet and Arrow IPC formats
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise Exception("pyarrow must be installed to use the Parquet and Arrow formats")
+
+    return pyarrow
+
+
+class ArrowSink():
+    '''
+    Description
+    -----------
+    Class to write simulation data to a Parquet or Arrow IPC file in
+    bounded-size chunks. Each chunk becomes a Parquet row group or an Arrow
+    record batch, so readers can skip chunks using the trip_id and
+    time_elapsed ranges of each chunk. Requires pyarrow.
+
+    ...
+
+    Attributes
+    ----------
+    path : str
+        The path of the file.
+    file_format : str
+        "parquet" or "arrow".
+    chunk_rows : int
+        The number of rows buffered in memory before they are written.
+    n_rows : int
+        The number of rows written so far.
+    ...
+    '''
+    def __init__(self, path, file_format = "parquet", chunk_rows = 65536):
+
+        if (file_format not in ["parquet", "arrow"]):
+            raise Exception("file_format must be parquet or arrow")
+        if (type(chunk_rows) is not int or chunk_rows <= 0):
+            raise Exception("chunk_rows must be an integer greater than 0")
+        self.__pa = _import_pyarrow()
+        self.path = path
+        self.file_format = file_format
+        self.chunk_rows = chunk_rows
+        self.n_rows = 0
+        self.__writer = None
+        self.__buffer = []
+        self.__buffered_rows = 0
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    def write(self, columns):
+        # The purpose of this method is to add rows to the sink, see
+        # NpySink.write
+        pa = self.__pa
+        batch = pa.record_batch([pa.array(np.asarray(columns[name])) for name in COLUMNS],
+                                names = COLUMNS)
+        if (self.__writer is None):
+            if (self.file_format == "parquet"):
+                self.__writer = pa.parquet.ParquetWriter(self.path, batch.schema)
+            else:
+                self.__writer = pa.ipc.new_file(self.path, batch.schema)
+
+        self.__buffer.append(batch)
+        self.__buffered_rows += batch.num_rows
+        if (self.__buffered_rows >= self.chunk_rows):
+            self.flush()
+
+
+    def flush(self):
+        # The purpose of this method is to write the buffered rows as one
+        # row group or record batch
+        if (not self.__buffer):
+            return
+        table = self.__pa.Table.from_batches(self.__buffer).combine_chunks()
+        if (self.file_format == "parquet"):
+            self.__writer.write_table(table, row_group_size = table.num_rows)
+        else:
+            for batch in table.to_batches(max_chunksize = table.num_rows):
+                self.__writer.write_batch(batch)
+        self.n_rows += self.__buffered_rows
+        self.__buffer = []
+        self.__buffered_rows = 0
+
+
+    def close(self):
+        # The purpose of this method is to write the remaining rows and
+        # close the file
+        if (self.__writer is None):
+            return
+        self.flush()
+        self.__writer.close()
+        self.__writer = None
+
+
+def read_arrow_window(path, trip_id, start_time, end_time, file_format = "parquet"):
+    '''
+    Description
+    -----------
+    read_arrow_window reads the rows of a trip with start_time <=
+    time_elapsed <= end_time from a file written by ArrowSink. Parquet row
+    groups are skipped using their statistics and Arrow files are memory
+    mapped, so only the chunks holding the trip are read. Requires pyarrow.
+
+    Parameters
+    ----------
+    path : str
+        The path of the file.
+    trip_id : int
+        The trip to read.
+    start_time : int or float
+        The first elapsed time of the window.
+    end_time : int or float
+        The last elapsed time of the window.
+    file_format : str, optional
+        "parquet" or "arrow". The default is "parquet".
+
+    Returns
+    -------
+    rows : pyarrow.Table
+        The rows in the window.
+    '''
+
+    pa = _import_pyarrow()
+    if (file_format == "parquet"):
+        return pa.parquet.read_table(path, filters = [("trip_id", "=", trip_id),
+                                                      ("time_elapsed", ">=", start_time),
+                                                      ("time_elapsed", "<=", end_time)])
+
+    import pyarrow.compute as pc
+    reader = pa.ipc.open_file(pa.memory_map(path, "r"))
+    batches = []
+    for i in range(reader.num_record_batches):
+        batch = reader.get_batch(i)
+        # skip batches that do not hold the trip
+        low, high = pc.min_max(batch.column("trip_id")).values()
+        if (low.as_py() > trip_id or high.as_py() < trip_id):
+            continue
+        mask = pc.and_(pc.equal(batch.column("trip_id"), trip_id),
+                       pc.and_(pc.greater_equal(batch.column("time_elapsed"), start_time),
+                               pc.less_equal(batch.column("time_elapsed"), end_time)))
+        batches.append(batch.filter(mask))
+
+    return pa.Table.from_batches(batches, schema = reader.schema)
+
+
+def write_trip(sink, elev, desired_floors, trip_id = 0, chunk_size = 65536):
+    '''
+    Description
+    -----------
+    write_trip runs go_to_floor for one trip and writes the simulation data
+    to a sink as it is produced, using iter_go_to_floor so the whole trip is
+    never held in memory. The current floor of the elevator is updated.
+
+    Parameters
+    ----------
+    sink : NpySink or ArrowSink
+        Where the simulation data is written.
+    elev : Elevator
+        The elevator to run the trip with.
+    desired_floors : int or sequence of ints
+        The floor(s) for the elevator to travel to.
+    trip_id : int, optional
+        The trip_id written with the rows. The default is 0.
+    chunk_size : int, optional
+        The number of rows computed at a time. The default is 65536.
+    '''
+
+    for chunk in elev.iter_go_to_floor(desired_floors, chunk_size = chunk_size):
+        chunk["trip_id"] = np.full(chunk["time_elapsed"].size, trip_id, dtype=np.int64)
+        sink.write(chunk)
+
+
+def write_batch(sink, start_floors, itineraries, sec_per_floor = 10, min_building_floor = 1,
+                max_building_floor = 20, trips_per_chunk = 1000):
+    '''
+    Description
+    -----------
+    write_batch runs simulate_batch for many trips, a chunk of trips at a
+    time, and writes the simulation data to a sink as it is produced.
+
+    Parameters
+    ----------
+    sink : NpySink or ArrowSink
+        Where the simulation data is written.
+    start_floors, itineraries, sec_per_floor, min_building_floor, max_building_floor
+        See elevator.simulate_batch. itineraries must be a list of lists.
+    trips_per_chunk : int, optional
+        The number of trips simulated at a time. The default is 1000.
+    '''
+
+    for start in range(0, len(start_floors), trips_per_chunk):
+        stop = start + trips_per_chunk
+        columns = elevator.simulate_batch(start_floors[start:stop], itineraries[start:stop],
+                                          sec_per_floor, min_building_floor, max_building_floor,
+                                          output = "dict")
+        columns["trip_id"] = columns["trip_id"] + start
+        sink.write(columns)
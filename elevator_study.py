@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import elevator
+
+
+SCENARIOS = ["up_peak", "down_peak", "inter_floor"]
+
+
+def draw_trip(rng, scenario, stops_per_trip, min_building_floor, max_building_floor):
+    '''
+    Description
+    -----------
+    draw_trip draws the desired floors of one random trip for a traffic
+    scenario.
+        - up_peak: the elevator picks passengers up at the lobby (the lowest
+            floor) and drops them off at upper floors in ascending order.
+        - down_peak: the elevator picks passengers up at upper floors in
+            descending order and drops them off at the lobby.
+        - inter_floor: the elevator visits random floors in random order.
+
+    Parameters
+    ----------
+    rng : numpy.random.Generator
+        The random number generator used to draw the trip.
+    scenario : str
+        One of "up_peak", "down_peak" or "inter_floor".
+    stops_per_trip : int
+        The maximum number of stops at upper (or random) floors in a trip.
+        The number of stops of each trip is drawn from 1 to stops_per_trip.
+    min_building_floor : int
+        The lowest floor of the building, which is used as the lobby.
+    max_building_floor : int
+        The highest floor of the building.
+
+    Returns
+    -------
+    desired_floors : list of ints
+        The floors for the elevator to travel to.
+    '''
+
+    n_stops = int(rng.integers(1, stops_per_trip + 1))
+    if (scenario == "inter_floor"):
+        return rng.integers(min_building_floor, max_building_floor + 1, n_stops).tolist()
+
+    upper_floors = np.sort(rng.integers(min_building_floor + 1, max_building_floor + 1, n_stops))
+    if (scenario == "up_peak"):
+        return [min_building_floor] + upper_floors.tolist()
+
+    return upper_floors[::-1].tolist() + [min_building_floor]
+
+
+def _run_chunk(seeds, scenario, trips_per_run, stops_per_trip, sec_per_floor,
+               min_building_floor, max_building_floor):
+    # The purpose of this function is to run a chunk of the study in a
+    # worker process. Only the travel time and floors of each trip are sent
+    # back, not the per-second simulation data
+
+    trip_times = []
+    trip_floors = []
+    for seed in seeds:
+        rng = np.random.default_rng(seed)
+        elev = elevator.Elevator(min_building_floor, sec_per_floor, min_building_floor,
+                                 max_building_floor)
+        run_times = np.zeros(trips_per_run)
+        run_floors = np.zeros(trips_per_run, dtype=np.int64)
+        for i in range(trips_per_run):
+            # a trip that never leaves the current floor is drawn again, so
+            # it does not count as a trip taking no time
+            desired_floors = [elev.current_floor]
+            while (set(desired_floors) == {elev.current_floor}):
+                desired_floors = draw_trip(rng, scenario, stops_per_trip, min_building_floor,
+                                           max_building_floor)
+            trip_plan = elev.plan_trip(desired_floors)
+            elev.current_floor = trip_plan.final_floor
+            run_times[i] = trip_plan.total_time
+            run_floors[i] = round(trip_plan.total_time / sec_per_floor)
+        trip_times.append(run_times)
+        trip_floors.append(run_floors)
+
+    return trip_times, trip_floors
+
+
+def run_traffic_study(n_runs, scenario = "up_peak", workers = None, seed = 0, trips_per_run = 100,
+                      stops_per_trip = 3, sec_per_floor = 10, min_building_floor = 1,
+                      max_building_floor = 20):
+    '''
+    Description
+    -----------
+    run_traffic_study runs a Monte Carlo study of an elevator serving random
+    trips drawn from a traffic scenario (see draw_trip). Each run starts an
+    elevator at the lobby and sends it through trips_per_run random trips.
+    A trip that would not leave the current floor is drawn again.
+    The runs are spread across a pool of worker processes and aggregated
+    metrics are returned.
+
+    Every run draws its trips from its own random generator, spawned from
+    the seed with numpy.random.SeedSequence, so the results are identical for
+    a given seed no matter how many workers are used.
+
+    Parameters
+    ----------
+    n_runs : int > 0
+        The number of runs in the study.
+    scenario : str, optional
+        One of "up_peak", "down_peak" or "inter_floor". The default is "up_peak".
+    workers : int > 0 or None, optional
+        The number of worker processes. If 1, the study runs in the current
+        process. If None, the number of CPUs is used. The default is None.
+    seed : int, optional
+        The seed of the study. The default is 0.
+    trips_per_run : int > 0, optional
+        The number of trips in each run. The default is 100.
+    stops_per_trip : int > 0, optional
+        The maximum number of stops at upper (or random) floors in a trip.
+        The default is 3.
+    sec_per_floor : int or float > 0, optional
+        The speed of the elevator in number of seconds to move one floor.
+        The default is 10.
+    min_building_floor : int, optional
+        The lowest floor of the building. The default is 1.
+    max_building_floor : int, optional
+        The highest floor of the building. The default is 20.
+
+    Returns
+    -------
+    study_results : dict
+        Dictionary with the aggregated metrics of the study:
+            - n_runs: the number of runs.
+            - n_trips: the number of trips over all runs.
+            - total_travel_time: the travel time in seconds over all runs.
+            - mean_run_travel_time: the mean travel time of a run.
+            - floors_traveled: the number of floors traveled over all runs.
+            - mean_trip_time: the mean travel time of a trip.
+            - trip_time_percentiles: dict of the 50th, 90th, 95th and 99th
+                percentiles of the trip travel times.
+    '''
+
+    ###############################
+    ## Validate inputs           ##
+    ###############################
+    for name, value in [("n_runs", n_runs), ("trips_per_run", trips_per_run),
+                        ("stops_per_trip", stops_per_trip)]:
+        if (type(value) is not int or value <= 0):
+            raise Exception("{} must be an integer greater than 0".format(name))
+    # fractional speeds are allowed, as for an Elevator
+    if (type(sec_per_floor) not in (int, float) or sec_per_floor <= 0):
+        raise Exception("sec_per_floor must be a number greater than 0")
+    if (scenario not in SCENARIOS):
+        raise Exception("scenario must be one of {}".format(SCENARIOS))
+    if (workers is None):
+        workers = os.cpu_count() or 1
+    if (type(workers) is not int or workers <= 0):
+        raise Exception("workers must be None or an integer greater than 0")
+    if (type(min_building_floor) is not int or type(max_building_floor) is not int
+        or max_building_floor <= min_building_floor):
+        raise Exception("building floors must be integers with at least two floors")
+
+    ###############################
+    ## Run the study             ##
+    ###############################
+    # one independent seed per run, regardless of how the runs are split
+    seeds = np.random.SeedSequence(seed).spawn(n_runs)
+    # split the runs into a few chunks per worker to balance the load
+    n_chunks = min(n_runs, workers * 4)
+    chunks = [list(x) for x in np.array_split(np.arange(n_runs), n_chunks)]
+    settings = (scenario, trips_per_run, stops_per_trip, sec_per_floor, min_building_floor,
+                max_building_floor)
+
+    if (workers == 1):
+        results = [_run_chunk([seeds[i] for i in chunk], *settings) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers = workers) as executor:
+            futures = [executor.submit(_run_chunk, [seeds[i] for i in chunk], *settings)
+                       for chunk in chunks]
+            results = [future.result() for future in futures]
+
+    ###############################
+    ## Aggregate the metrics     ##
+    ###############################
+    # the chunks are gathered in run order so the aggregation is identical
+    trip_times = np.concatenate([x for result in results for x in result[0]])
+    trip_floors = np.concatenate([x for result in results for x in result[1]])
+    percentiles = [50, 90, 95, 99]
+
+    return {
+        "n_runs":n_runs,
+        "n_trips":trip_times.size,
+        "total_travel_time":float(trip_times.sum()),
+        "mean_run_travel_time":float(trip_times.sum() / n_runs),
+        "floors_traveled":int(trip_floors.sum()),
+        "mean_trip_time":float(trip_times.mean()),
+        "trip_time_percentiles":dict(zip(percentiles, np.percentile(trip_times, percentiles).tolist()))
+        }
@@ -4,13 +4,18 @@ import unittest
 import elevator
 import pandas as pd
 import numpy as np
+import io
+import asyncio
+import contextlib
+import itertools
 
 class TestElevator(unittest.TestCase):
     
     
-    def test_sec_to_floor_not_int(self):
-        # elevator speed must be an integer
-        self.assertRaises(Exception, elevator.Elevator(2, 10), 2, .5)
+    def test_sec_to_floor_not_number(self):
+        # elevator speed must be a number
+        self.assertRaises(Exception, elevator.Elevator, 2, "10")
+        self.assertRaises(Exception, elevator.Elevator, 2, True)
         
         
     def test_sec_to_floor_zero_or_less(self):
@@ -211,5 +216,763 @@ class TestElevator(unittest.TestCase):
         self.assertRaises(Exception, elev.go_to_floor, [2, -1, 5], True, -1)
         
         
+    def test_trip_plan_legs(self):
+        # a trip plan only stores one leg per pair of floor checkpoints
+        trip_plan = elevator.TripPlan([2, 1, 3], 10)
+        
+        self.assertEqual(list(trip_plan.leg_start_floor), [2, 1])
+        self.assertEqual(list(trip_plan.leg_end_floor), [1, 3])
+        self.assertEqual(list(trip_plan.leg_start_time), [0, 10])
+        self.assertEqual(list(trip_plan.leg_duration), [10, 20])
+        self.assertEqual(trip_plan.total_time, 30)
+        self.assertEqual(trip_plan.final_floor, 3)
+        
+        
+    def test_trip_plan_to_frame_matches_go_to_floor(self):
+        # expanding a planned trip gives the same data as go_to_floor
+        elev = elevator.Elevator(2, 10)
+        
+        trip_plan = elev.plan_trip([5, 1, 3])
+        t1_out = elev.go_to_floor([5, 1, 3], False)
+        
+        self.assertTrue(trip_plan.to_frame().equals(t1_out))
+        
+        
+    def test_plan_trip_does_not_move_elevator(self):
+        # planning a trip does not change the current floor
+        elev = elevator.Elevator(2, 10)
+        elev.plan_trip([5, 1, 3])
+        
+        self.assertEqual(elev.current_floor, 2)
+        
+        
+    def test_go_to_floor_one_sec_per_floor(self):
+        # an elevator that takes one second per floor has one row per floor
+        elev = elevator.Elevator(2, 1)
+        
+        t1_out = elev.go_to_floor([4], False)
+        
+        self.assertEqual(list(t1_out.time_elapsed), [0, 1, 2])
+        self.assertEqual(list(t1_out.current_floor), [2, 3, 4])
+        self.assertEqual(elev.current_floor, 4)
+        
+        
+    def test_trip_plan_consec_dups(self):
+        # trip plan checkpoints must already be cleaned
+        self.assertRaises(Exception, elevator.TripPlan, [2, 2, 3], 10)
+        
+        
+    def test_trip_plan_state_at(self):
+        # the state at a time matches the go_to_floor row for that time
+        elev = elevator.Elevator(2, 10)
+        trip_plan = elev.plan_trip([1, 3])
+        
+        self.assertEqual(trip_plan.state_at(13), {
+            "time_elapsed":13, "current_floor":1, "floors_to_next_dest":2,
+            "time_to_next_dest":17, "next_destination":3})
+        self.assertEqual(trip_plan.state_at(13.5), trip_plan.state_at(13))
+        self.assertEqual(trip_plan.state_at(30), {
+            "time_elapsed":30, "current_floor":3, "floors_to_next_dest":None,
+            "time_to_next_dest":None, "next_destination":None})
+        self.assertRaises(Exception, trip_plan.state_at, 31)
+        
+        
+    def test_trip_plan_state_at_many(self):
+        # bulk state queries match the go_to_floor rows for those times
+        elev = elevator.Elevator(2, 10)
+        trip_plan = elev.plan_trip([5, 1, 3])
+        sim_data = elev.go_to_floor([5, 1, 3], False)
+        
+        times = np.array([70, 0, 29, 30, 31, 90])
+        states = trip_plan.state_at_many(times)
+        rows = sim_data.iloc[times]
+        
+        for name in ["time_elapsed", "current_floor"]:
+            self.assertEqual(list(states[name]), list(rows[name]))
+        for name in ["floors_to_next_dest", "time_to_next_dest", "next_destination"]:
+            self.assertEqual(list(states[name][:-1]), list(rows[name][:-1]))
+        self.assertEqual(list(states["arrived"]), [False] * 5 + [True])
+        
+        
+    def test_simulate_batch_matches_go_to_floor(self):
+        # each trip of a batch matches running go_to_floor for that trip
+        start_floors = [2, 5, 1]
+        itineraries = [[1, 3], [5, 5, 2], [4]]
+        
+        batch_out = elevator.simulate_batch(start_floors, itineraries, 10)
+        
+        for trip_id, (start_floor, desired_floors) in enumerate(zip(start_floors, itineraries)):
+            elev = elevator.Elevator(start_floor, 10)
+            t1_out = elev.go_to_floor(desired_floors, False)
+            trip_out = batch_out[batch_out.trip_id == trip_id].drop(columns="trip_id")
+            
+            self.assertTrue(trip_out.reset_index(drop=True).equals(t1_out))
+            
+            
+    def test_simulate_batch_fractional_speed(self):
+        # fractional speeds give the rows of go_to_floor for each trip
+        start_floors = [2, 5, 1]
+        itineraries = [[1, 3], [5, 5, 2], [4, 20]]
+        
+        for sec_per_floor in [0.3, 2.5]:
+            batch_out = elevator.simulate_batch(start_floors, itineraries, sec_per_floor)
+            summary = elevator.summarize_batch(start_floors, itineraries, sec_per_floor)
+            
+            for trip_id, (start_floor, desired_floors) in enumerate(zip(start_floors, itineraries)):
+                elev = elevator.Elevator(start_floor, sec_per_floor)
+                t1_out = elev.go_to_floor(desired_floors, False)
+                trip_out = batch_out[batch_out.trip_id == trip_id].drop(columns="trip_id")
+                
+                self.assertTrue(trip_out.reset_index(drop=True).equals(t1_out))
+                self.assertAlmostEqual(summary["total_time"][trip_id], t1_out["time_elapsed"].iloc[-1])
+        
+        self.assertRaises(Exception, elevator.simulate_batch, [1], [[2]], "10")
+        
+        
+    def test_simulate_batch_offsets_input(self):
+        # itineraries can be given as offsets and a flat array of floors
+        start_floors = np.array([2, 5, 1])
+        offsets = np.array([0, 2, 5, 6])
+        floors = np.array([1, 3, 5, 5, 2, 4])
+        
+        batch_out = elevator.simulate_batch(start_floors, (offsets, floors), 10)
+        list_out = elevator.simulate_batch([2, 5, 1], [[1, 3], [5, 5, 2], [4]], 10)
+        
+        self.assertTrue(batch_out.equals(list_out))
+        
+        
+    def test_simulate_batch_trip_without_new_floor(self):
+        # every trip of a batch must go to at least one new floor
+        self.assertRaises(Exception, elevator.simulate_batch, [2, 5], [[3], [5, 5]], 10)
+        
+        
+    def test_simulate_batch_floor_outside_building(self):
+        # every floor of a batch must be within the building floors
+        self.assertRaises(Exception, elevator.simulate_batch, [2, 5], [[3], [21]], 10)
+        
+        
+    def test_iter_go_to_floor_records(self):
+        # streamed records match the go_to_floor rows
+        sim_data = elevator.Elevator(2, 10).go_to_floor([1, 3], False)
+        elev = elevator.Elevator(2, 10)
+        
+        records = list(elev.iter_go_to_floor([1, 3]))
+        
+        self.assertEqual(len(records), sim_data.shape[0])
+        self.assertEqual(records[12], {
+            "time_elapsed":12, "current_floor":1, "floors_to_next_dest":2,
+            "time_to_next_dest":18, "next_destination":3})
+        self.assertEqual(records[-1]["current_floor"], 3)
+        self.assertIsNone(records[-1]["next_destination"])
+        
+        
+    def test_iter_go_to_floor_chunks(self):
+        # streamed chunks have at most chunk_size rows and match go_to_floor
+        sim_data = elevator.Elevator(2, 10).go_to_floor([1, 3], False)
+        elev = elevator.Elevator(2, 10)
+        
+        chunks = list(elev.iter_go_to_floor([1, 3], chunk_size = 8))
+        
+        self.assertEqual([len(x["time_elapsed"]) for x in chunks], [8, 8, 8, 7])
+        current_floor = np.concatenate([x["current_floor"] for x in chunks])
+        self.assertEqual(list(current_floor), list(sim_data.current_floor))
+        
+        
+    def test_iter_go_to_floor_updates_current_floor(self):
+        # the current floor is only updated once the stream is exhausted
+        elev = elevator.Elevator(2, 10)
+        
+        sim_stream = elev.iter_go_to_floor([1, 3])
+        next(sim_stream)
+        self.assertEqual(elev.current_floor, 2)
+        
+        for record in sim_stream:
+            pass
+        self.assertEqual(elev.current_floor, 3)
+        
+        
+    def test_iter_go_to_floor_invalid_input(self):
+        # inputs are validated when the stream is created
+        elev = elevator.Elevator(2, 10)
+        self.assertRaises(Exception, elev.iter_go_to_floor, [2, 2])
+        self.assertRaises(Exception, elev.iter_go_to_floor, [3], 0)
+        
+        
+    def test_play_live_sim_output(self):
+        # the live simulation prints every row on schedule
+        sim_data = elevator.Elevator(2, 1).go_to_floor([3], False)
+        stream = io.StringIO()
+        clock = [0.0]
+        
+        def sleep(seconds):
+            clock[0] += seconds
+            
+        stats = elevator.play_live_sim(sim_data, 2, stream, lambda: clock[0], sleep)
+        
+        self.assertEqual(stream.getvalue(),
+                         "elapsed time: 0sec | current floor: 2 | next destination: 3\n"
+                         "floors to next destination: 1 | time to next destination: 1sec\n\n"
+                         "elapsed time: 1sec | current floor: 3\n"
+                         "Final destination reached.\n")
+        self.assertEqual(stats["frames_shown"], 2)
+        self.assertEqual(stats["frames_skipped"], 0)
+        self.assertEqual(stats["achieved_speed"], 2)
+        
+        
+    def test_play_live_sim_skips_frames_when_behind(self):
+        # rows are skipped instead of drifting when printing is too slow
+        sim_data = elevator.Elevator(1, 10).go_to_floor([5], False)
+        clock = [0.0]
+        
+        class SlowStream():
+            # every write takes 3 sim increments of wall time
+            def write(self, text):
+                clock[0] += 0.003
+            def flush(self):
+                pass
+            
+        def sleep(seconds):
+            clock[0] += seconds
+            
+        stats = elevator.play_live_sim(sim_data, 1000, SlowStream(), lambda: clock[0], sleep)
+        
+        self.assertEqual(stats["frames_shown"] + stats["frames_skipped"], sim_data.shape[0])
+        self.assertGreater(stats["frames_skipped"], 0)
+        self.assertLess(stats["wall_time"], 0.05)
+        
+        
+    def test_go_to_floor_async_runs_cars_concurrently(self):
+        # several live simulations share one event loop
+        elevators = [elevator.Elevator(1, 10), elevator.Elevator(5, 10)]
+        
+        async def run_all():
+            return await asyncio.gather(elevators[0].go_to_floor_async([3], True, 500),
+                                        elevators[1].go_to_floor_async([2], True, 1000))
+            
+        with contextlib.redirect_stdout(io.StringIO()):
+            sim_data = asyncio.run(run_all())
+        
+        self.assertTrue(sim_data[0].equals(elevator.Elevator(1, 10).go_to_floor([3], False)))
+        self.assertEqual([x.current_floor for x in elevators], [3, 2])
+        self.assertEqual([x.playback_stats["requested_speed"] for x in elevators], [500, 1000])
+        
+        
+    def test_go_to_floor_async_cancelled(self):
+        # a cancelled trip leaves the elevator on the floor it reached
+        elev = elevator.Elevator(1, 10)
+        
+        async def run_and_cancel():
+            task = asyncio.create_task(elev.go_to_floor_async([20], True, 1000))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                return True
+            
+        with contextlib.redirect_stdout(io.StringIO()):
+            cancelled = asyncio.run(run_and_cancel())
+        
+        self.assertTrue(cancelled)
+        self.assertGreater(elev.current_floor, 1)
+        self.assertLess(elev.current_floor, 20)
+        
+        
+    def test_order_stops_look(self):
+        # look continues in the direction of the first desired floor
+        self.assertEqual(elevator.order_stops(10, [12, 3, 15, 7, 12], "look"), [12, 15, 7, 3])
+        self.assertEqual(elevator.order_stops(10, [7, 3, 15, 12], "look"), [7, 3, 12, 15])
+        
+        
+    def test_order_stops_scan(self):
+        # scan travels to the end of the building before reversing
+        self.assertEqual(elevator.order_stops(10, [12, 3, 15], "scan", 1, 20), [12, 15, 20, 3])
+        self.assertEqual(elevator.order_stops(10, [12, 15], "scan", 1, 20), [12, 15])
+        
+        
+    def test_order_stops_optimal(self):
+        # optimal minimizes the sum of the arrival times at the stops
+        start_floor, desired_floors = 10, [20, 1, 12, 9, 2]
+        
+        def arrival_time_sum(floors):
+            positions = np.array([start_floor] + list(floors))
+            return np.cumsum(np.abs(np.diff(positions))).sum()
+        
+        best = min(arrival_time_sum(x) for x in itertools.permutations(desired_floors))
+        ordered = elevator.order_stops(start_floor, desired_floors, "optimal")
+        
+        self.assertEqual(sorted(ordered), sorted(desired_floors))
+        self.assertEqual(arrival_time_sum(ordered), best)
+        
+        
+    def test_go_to_floor_order_reports_time_saved(self):
+        # reordering the floors reports the time saved over the given order
+        elev = elevator.Elevator(1, 10)
+        
+        t1_out = elev.go_to_floor([20, 1, 19, 2], False, order = "look")
+        
+        self.assertEqual(list(t1_out.next_destination.dropna().unique()), [2, 19, 20])
+        self.assertEqual(t1_out.attrs["time_saved"], 540)
+        self.assertGreater(t1_out.attrs["mean_arrival_time_saved"], 0)
+        self.assertEqual(elev.current_floor, 20)
+        
+        # the time saved is kept for every output format and on the plan
+        elev.current_floor = 1
+        elev.go_to_floor([20, 1, 19, 2], False, order = "look", output = "numpy")
+        self.assertEqual(elev.order_stats, t1_out.attrs)
+        trip_plan = elevator.Elevator(1, 10).plan_trip([20, 1, 19, 2], order = "look")
+        self.assertEqual((trip_plan.time_saved, trip_plan.mean_arrival_time_saved),
+                         (540, t1_out.attrs["mean_arrival_time_saved"]))
+        self.assertIsNone(elevator.Elevator(1, 10).plan_trip([20, 1]).time_saved)
+        elev.go_to_floor([3], False, output = "dict")
+        self.assertIsNone(elev.order_stats)
+        
+        
+    def test_go_to_floor_unknown_order(self):
+        # the order must be a known ordering
+        elev = elevator.Elevator(1, 10)
+        self.assertRaises(Exception, elev.go_to_floor, [3, 2], False, 1, "fastest")
+        
+        
+    def test_profiler_records_stages(self):
+        # the profiler records every stage of go_to_floor
+        elev = elevator.Elevator(2, 10)
+        elev.profiler = elevator.StageProfiler()
+        
+        elev.go_to_floor([1, 3], False)
+        elev.go_to_floor([1], False)
+        
+        stats = elev.profiler.stats
+        self.assertEqual(list(stats), ["validate", "plan", "columns", "frame"])
+        self.assertEqual(stats["frame"]["calls"], 2)
+        self.assertEqual(stats["columns"]["total_size"], 31 + 21)
+        self.assertIn("validate", elev.profiler.to_table())
+        
+        
+    def test_profiler_stops_tracing(self):
+        # the peak memory of each stage is traced until the profiler finishes
+        import tracemalloc
+        elev = elevator.Elevator(2, 10)
+        elev.profiler = elevator.StageProfiler(trace_allocations = True)
+        
+        elev.go_to_floor(list(range(3, 20)), False)
+        self.assertTrue(tracemalloc.is_tracing())
+        elev.profiler.finish()
+        elev.go_to_floor([1], False)
+        
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertGreater(elev.profiler.stats["columns"]["peak_bytes"], 0)
+        self.assertEqual(elev.profiler.stats["columns"]["calls"], 2)
+        
+        
+    def test_profiler_callback(self):
+        # the callback is called for every recorded stage
+        records = []
+        elev = elevator.Elevator(2, 10)
+        elev.profiler = elevator.StageProfiler(callback = lambda *x: records.append(x))
+        
+        elev.go_to_floor([1, 3], False)
+        
+        self.assertEqual([x[0] for x in records], ["validate", "plan", "columns", "frame"])
+        self.assertEqual(records[2][2], 31)
+        
+        
+    def test_go_to_floor_array_and_range_inputs(self):
+        # desired floors can be NumPy arrays, ranges and tuples
+        expected_output = elevator.Elevator(2, 10).go_to_floor([3, 4, 5], False)
+        
+        for desire_floors_test in [np.array([3, 4, 5]), range(3, 6), (3, 4, 5)]:
+            t1_out = elevator.Elevator(2, 10).go_to_floor(desire_floors_test, False)
+            self.assertTrue(t1_out.equals(expected_output))
+        
+        t1_out = elevator.Elevator(2, 10).go_to_floor(np.int64(3), False)
+        self.assertTrue(t1_out.equals(elevator.Elevator(2, 10).go_to_floor(3, False)))
+            
+            
+    def test_go_to_floor_does_not_modify_input(self):
+        # the caller's list of desired floors is left unchanged
+        elev = elevator.Elevator(2, 10)
+        desire_floors_test = [1, 1, 3]
+        
+        elev.go_to_floor(desire_floors_test, False)
+        
+        self.assertEqual(desire_floors_test, [1, 1, 3])
+        
+        
+    def test_go_to_floor_float_array_input(self):
+        # arrays of desired floors must contain integers
+        elev = elevator.Elevator(2, 10)
+        self.assertRaises(Exception, elev.go_to_floor, np.array([1.0, 3.0]), False)
+        
+        
+    def test_go_to_floor_numpy_output(self):
+        # the numpy output is a structured array with the same data
+        sim_data = elevator.Elevator(2, 10).go_to_floor([1, 3], False)
+        elev = elevator.Elevator(2, 10)
+        
+        t1_out = elev.go_to_floor([1, 3], False, output = "numpy")
+        
+        self.assertEqual(t1_out.shape, (31,))
+        self.assertEqual(list(t1_out["current_floor"]), list(sim_data.current_floor))
+        self.assertEqual(list(t1_out["next_destination"][:-1]), list(sim_data.next_destination[:-1]))
+        self.assertEqual(list(np.flatnonzero(t1_out["arrived"])), [30])
+        self.assertEqual(elev.current_floor, 3)
+        
+        
+    def test_go_to_floor_dict_output(self):
+        # the dict output holds one array per column
+        t1_out = elevator.Elevator(2, 10).go_to_floor([1, 3], False, output = "dict")
+        
+        self.assertEqual(list(t1_out), ["time_elapsed", "current_floor", "floors_to_next_dest",
+                                        "time_to_next_dest", "next_destination", "arrived"])
+        self.assertEqual(list(t1_out["time_to_next_dest"][9:12]), [1, 20, 19])
+        
+        
+    def test_go_to_floor_unknown_output(self):
+        # the output must be a known format
+        elev = elevator.Elevator(2, 10)
+        self.assertRaises(Exception, elev.go_to_floor, [1, 3], False, 1, None, "csv")
+        
+        
+    def test_go_to_floor_compact(self):
+        # compact columns use small dtypes and hold the same values
+        sim_data = elevator.Elevator(2, 10).go_to_floor([1, 3], False)
+        
+        t1_out = elevator.Elevator(2, 10).go_to_floor([1, 3], False, compact = True)
+        
+        self.assertEqual(t1_out.time_elapsed.dtype, np.int16)
+        self.assertEqual(t1_out.current_floor.dtype, np.int16)
+        self.assertEqual(str(t1_out.next_destination.dtype), "Int16")
+        self.assertTrue(t1_out.astype(sim_data.dtypes.to_dict()).equals(sim_data))
+        
+        
+    def test_trip_plan_dtypes(self):
+        # the dtypes grow with the building floors and trip duration
+        self.assertEqual(elevator.TripPlan([1, 20], 10).get_dtypes(), (np.int16, np.int16))
+        self.assertEqual(elevator.TripPlan([1, 20], 10000).get_dtypes(), (np.int16, np.int32))
+        self.assertEqual(elevator.TripPlan([-40000, 1], 1).get_dtypes(), (np.int32, np.int32))
+        
+        
+    def test_simulate_batch_compact(self):
+        # compact batch columns hold the same values
+        batch_out = elevator.simulate_batch([2, 5], [[1, 3], [4]], 10)
+        compact_out = elevator.simulate_batch([2, 5], [[1, 3], [4]], 10, compact = True)
+        
+        self.assertEqual(compact_out.current_floor.dtype, np.int16)
+        self.assertTrue(compact_out.astype(batch_out.dtypes.to_dict()).equals(batch_out))
+        
+        
+    def test_trip_cache_hits_and_translation(self):
+        # repeated trips come from the cache and offset trips reuse a template
+        elev = elevator.Elevator(1, 10)
+        elev.cache = elevator.TripCache()
+        
+        first_out = elev.go_to_floor([5, 1], False)
+        elev.current_floor = 3
+        shifted_out = elev.go_to_floor([7, 3], False)
+        elev.current_floor = 3
+        repeated_out = elev.go_to_floor([7, 3], False)
+        
+        self.assertEqual((elev.cache.hits, elev.cache.misses, elev.cache.template_hits), (1, 2, 1))
+        self.assertIs(repeated_out, shifted_out)
+        self.assertTrue(first_out.equals(elevator.Elevator(1, 10).go_to_floor([5, 1], False)))
+        self.assertTrue(shifted_out.equals(elevator.Elevator(3, 10).go_to_floor([7, 3], False)))
+        self.assertEqual(elev.current_floor, 3)
+        
+        
+    def test_trip_cache_read_only(self):
+        # cached results cannot be modified
+        elev = elevator.Elevator(1, 10)
+        elev.cache = elevator.TripCache()
+        
+        sim_data = elev.go_to_floor([5, 1], False)
+        expected_output = elevator.Elevator(1, 10).go_to_floor([5, 1], False)
+        self.assertRaises(ValueError, sim_data.iloc.__setitem__, (0, 1), 3)
+        
+        for output in ["numpy", "dict"]:
+            elev.current_floor = 1
+            sim_data = elev.go_to_floor([5, 1], False, output = output, compact = True)
+            self.assertFalse(sim_data["current_floor"].flags.writeable)
+            self.assertEqual(sim_data["current_floor"].dtype, np.int16)
+        self.assertTrue(expected_output.equals(elev.cache.get(elevator.TripPlan([1, 5, 1], 10))))
+        
+        
+    def test_trip_cache_eviction(self):
+        # the least recently used result is evicted when the cache is full
+        cache = elevator.TripCache(max_size = 2)
+        for floors in [[1, 2], [1, 3], [1, 2], [1, 4], [1, 3]]:
+            cache.get(elevator.TripPlan(floors, 10))
+        
+        self.assertEqual(len(cache), 2)
+        self.assertEqual((cache.hits, cache.misses), (1, 4))
+        self.assertRaises(Exception, elevator.TripCache, 0)
+        
+        
+    def test_simulate_batch_empty(self):
+        # an empty batch has the usual columns without any rows
+        t1_out = elevator.simulate_batch([], [])
+        t2_out = elevator.simulate_batch([2], [[5]])
+        
+        self.assertEqual(len(t1_out), 0)
+        self.assertEqual(t1_out.dtypes.tolist(), t2_out.dtypes.tolist())
+        self.assertEqual(len(elevator.simulate_batch([], [], output = "dict")["arrived"]), 0)
+        summaries = elevator.summarize_batch([], [])
+        self.assertEqual((summaries["total_time"].size, summaries["offsets"].tolist()), (0, [0]))
+        
+        
+    def test_trip_cache_number_types(self):
+        # int and float speeds and time steps are cached separately since
+        # they give different time dtypes
+        cache = elevator.TripCache()
+        for sec_per_floor, time_step in [(10, 1), (10, 1.0), (10.0, 1), (10.0, 1.0)]:
+            expected_output = elevator.Elevator(1, sec_per_floor).go_to_floor([3], False, time_step = time_step)
+            elev = elevator.Elevator(1, sec_per_floor)
+            elev.cache = cache
+            t1_out = elev.go_to_floor([3], False, time_step = time_step)
+            self.assertEqual(t1_out.dtypes.tolist(), expected_output.dtypes.tolist())
+            self.assertTrue(t1_out.equals(expected_output))
+        
+        self.assertEqual(cache.hits, 0)
+        
+        
+    def test_trip_summary(self):
+        # the closed form totals match the simulated trip
+        elev = elevator.Elevator(2, 10)
+        summary = elev.trip_summary([2, 5, 5, 1])
+        t1_out = elevator.Elevator(2, 10).go_to_floor([2, 5, 5, 1], False)
+        
+        self.assertEqual(summary["total_time"], t1_out["time_elapsed"].iloc[-1])
+        self.assertEqual(summary["floors_traveled"], 7)
+        self.assertEqual(summary["arrival_times"].tolist(), [0, 30, 30, 70])
+        self.assertEqual(summary["final_floor"], 1)
+        self.assertEqual(elev.current_floor, 2)
+        self.assertRaises(Exception, elev.trip_summary, [2])
+        self.assertRaises(Exception, elev.trip_summary, [21])
+        
+        
+    def test_summarize_batch(self):
+        # the batch totals match the summary of each trip
+        start_floors = [2, 5, 20]
+        itineraries = [[1, 3], [5, 5, 2], [1]]
+        summaries = elevator.summarize_batch(start_floors, itineraries, 5)
+        
+        self.assertEqual(summaries["offsets"].tolist(), [0, 2, 5, 6])
+        for i, (start_floor, desired_floors) in enumerate(zip(start_floors, itineraries)):
+            summary = elevator.Elevator(start_floor, 5).trip_summary(desired_floors)
+            trip_rows = slice(summaries["offsets"][i], summaries["offsets"][i + 1])
+            self.assertEqual(summaries["total_time"][i], summary["total_time"])
+            self.assertEqual(summaries["floors_traveled"][i], summary["floors_traveled"])
+            self.assertEqual(summaries["final_floor"][i], summary["final_floor"])
+            self.assertEqual(summaries["arrival_times"][trip_rows].tolist(),
+                             summary["arrival_times"].tolist())
+        self.assertRaises(Exception, elevator.summarize_batch, [2, 5], [[1], [5, 5]])
+        
+        
+    def test_active_trip_add_stop(self):
+        # a stop added mid-trip is visited from the next floor reached, the
+        # rows before the change are kept and the rows from the change on
+        # show the new stop
+        elev = elevator.Elevator(1, 10)
+        expected_output = elevator.Elevator(1, 10).go_to_floor([10], False)
+        trip = elev.start_trip([10])
+        
+        trip.add_stop(5, at_time = 25, index = 0)
+        t1_out = trip.to_frame()
+        
+        self.assertEqual(elev.current_floor, 3)
+        self.assertEqual(trip.pending_stops(25), [5, 10])
+        self.assertEqual((trip.total_time, trip.final_floor), (90, 10))
+        self.assertTrue(t1_out.iloc[:25].equals(expected_output.iloc[:25]))
+        self.assertEqual(t1_out["current_floor"].iloc[25:30].tolist(), [3] * 5)
+        self.assertEqual(t1_out["next_destination"].iloc[25:30].tolist(), [5] * 5)
+        self.assertEqual(t1_out["time_to_next_dest"].iloc[25:30].tolist(), [15, 14, 13, 12, 11])
+        self.assertEqual(t1_out["current_floor"].iloc[30], 4)
+        self.assertEqual(t1_out["next_destination"].iloc[30], 5)
+        self.assertEqual(t1_out["next_destination"].iloc[40], 10)
+        self.assertRaises(Exception, trip.add_stop, 3, 20)
+        
+        
+    def test_active_trip_cancel_stop(self):
+        # cancelling the remaining stop ends the trip on the next floor reached
+        elev = elevator.Elevator(1, 10)
+        trip = elev.start_trip([10])
+        
+        trip.cancel_stop(10, at_time = 32)
+        
+        self.assertEqual((trip.total_time, trip.final_floor), (40, 5))
+        self.assertEqual(trip.state_at(40)["current_floor"], 5)
+        self.assertIsNone(trip.state_at(40)["next_destination"])
+        self.assertEqual(trip.state_at(31)["next_destination"], 10)
+        self.assertEqual(trip.state_at(32)["time_to_next_dest"], 8)
+        self.assertEqual((trip.state_at(39)["current_floor"], trip.state_at(39)["next_destination"]),
+                         (4, 5))
+        self.assertEqual(trip.plan().sample_times("floors").tolist(), [0, 10, 20, 30, 32, 40])
+        self.assertRaises(Exception, trip.cancel_stop, 10, 35)
+        
+        self.assertEqual(trip.finish().total_time, 40)
+        self.assertEqual(elev.current_floor, 5)
+        
+        
+    def test_active_trip_changes_between_floors(self):
+        # several changes before the next floor is reached re-plan from the
+        # same floor, and stops behind the elevator are visited after it
+        import elevator_metrics
+        elev = elevator.Elevator(1, 10)
+        trip = elev.start_trip([10])
+        
+        trip.add_stop(2, at_time = 32, index = 0)
+        trip.cancel_stop(10, at_time = 36)
+        
+        self.assertEqual(trip.pending_stops(36), [2])
+        self.assertEqual((trip.total_time, trip.final_floor), (70, 2))
+        self.assertEqual(trip.state_at(34)["next_destination"], 5)
+        self.assertEqual((trip.state_at(38)["time_to_next_dest"], trip.state_at(40)["current_floor"]),
+                         (2, 5))
+        metrics = elevator_metrics.FleetMetrics(1, 20)
+        metrics.add_trip(trip)
+        self.assertEqual((metrics.floors_traveled, metrics.moving_time), (7, 70))
+        rows = trip.to_frame().iloc[:-1]
+        self.assertEqual(metrics.floor_time[:5].tolist(),
+                         rows["current_floor"].value_counts().reindex(range(1, 6)).tolist())
+        self.assertEqual(metrics.direction_changes, 1)
+        
+        
+    def test_active_trip_add_stop_order(self):
+        # the remaining stops are reordered from the next floor reached
+        elev = elevator.Elevator(5, 10)
+        trip = elev.start_trip([8, 2])
+        
+        trip.add_stop(7, at_time = 5, order = "look")
+        
+        self.assertEqual(trip.pending_stops(5), [7, 8, 2])
+        self.assertEqual((trip.total_time, trip.final_floor), (90, 2))
+        trip.cancel_stop(8, at_time = 5, order = "look")
+        self.assertEqual(trip.pending_stops(5), [7, 2])
+        
+        
+    def test_active_trip_cancel_before_leaving(self):
+        # cancelling every stop before the elevator leaves keeps one row on
+        # the current floor, and new stops can still be added
+        import elevator_metrics
+        elev = elevator.Elevator(1, 10)
+        trip = elev.start_trip([5])
+        
+        trip.cancel_stop(5, at_time = 0)
+        t1_out = trip.to_frame()
+        
+        self.assertEqual((trip.total_time, trip.final_floor), (0, 1))
+        self.assertEqual(len(t1_out), 1)
+        self.assertTrue(t1_out["next_destination"].isna().all())
+        self.assertEqual(trip.state_at(0)["current_floor"], 1)
+        metrics = elevator_metrics.FleetMetrics(1, 20)
+        metrics.add_trip(trip)
+        self.assertEqual((metrics.n_trips, metrics.floors_traveled), (1, 0))
+        
+        trip.add_stop(3, at_time = 0)
+        self.assertEqual((trip.total_time, trip.final_floor), (20, 3))
+        self.assertEqual(trip.to_frame()["current_floor"].tolist()[::10], [1, 2, 3])
+        
+        
+    def test_active_trip_add_stop_after_end(self):
+        # a stop added after the trip ended starts from the final floor
+        elev = elevator.Elevator(2, 10)
+        trip = elev.start_trip([4])
+        
+        trip.add_stop(3, at_time = 35)
+        state = trip.state_at(30)
+        
+        self.assertEqual((state["current_floor"], state["next_destination"]), (4, 4))
+        self.assertEqual(trip.state_at(35)["next_destination"], 3)
+        self.assertEqual((trip.total_time, trip.final_floor), (45, 3))
+        
+        
+    def test_go_to_floor_floor_crossings(self):
+        # the floor crossings are the rows of the full data on each floor
+        t1_out = elevator.Elevator(2, 10).go_to_floor([5, 1], False)
+        t2_out = elevator.Elevator(2, 10).go_to_floor([5, 1], False, time_step = "floors")
+        
+        self.assertEqual(len(t2_out), 8)
+        self.assertTrue(t2_out.equals(t1_out[t1_out["time_elapsed"] % 10 == 0].reset_index(drop = True)))
+        
+        
+    def test_go_to_floor_fractional_time_step(self):
+        # fractional speeds and time steps give fractional time columns
+        elev = elevator.Elevator(1, 0.3)
+        t1_out = elev.go_to_floor([4, 2], False, time_step = 0.1, output = "dict")
+        
+        self.assertEqual(len(t1_out["time_elapsed"]), 16)
+        self.assertEqual(t1_out["current_floor"][:5].tolist(), [1, 1, 1, 2, 2])
+        self.assertEqual(t1_out["time_elapsed"][-1], 1.5)
+        self.assertAlmostEqual(t1_out["time_to_next_dest"][4], 0.5)
+        self.assertEqual(elev.current_floor, 2)
+        self.assertEqual(elevator.Elevator(1, 0.3).go_to_floor([4], False)["time_elapsed"].tolist(),
+                         [0, 0.9])
+        self.assertRaises(Exception, elev.go_to_floor, [3], False, time_step = 0)
+        self.assertRaises(Exception, elev.go_to_floor, [3], False, time_step = "seconds")
+        
+        
+    def test_live_sim_time_step(self):
+        # rows are played at their elapsed time
+        elev = elevator.Elevator(1, 10)
+        with contextlib.redirect_stdout(io.StringIO()) as f:
+            elev.go_to_floor([3], True, 1000, time_step = "floors")
+        
+        self.assertEqual(elev.playback_stats["frames_shown"], 3)
+        self.assertGreaterEqual(elev.playback_stats["wall_time"], 0.019)
+        
+        
+    def test_elevator_config_immutable(self):
+        # the config is validated once and cannot be changed
+        config = elevator.ElevatorConfig(10, 1, 20)
+        
+        with self.assertRaises(Exception):
+            config.sec_per_floor = 5
+        self.assertRaises(Exception, elevator.ElevatorConfig, "10")
+        self.assertRaises(Exception, elevator.ElevatorConfig, 10, 20, 1)
+        self.assertEqual(config.replace(sec_per_floor = 5), elevator.ElevatorConfig(5, 1, 20))
+        self.assertEqual(config.sec_per_floor, 10)
+        
+        
+    def test_elevator_pickle_copy(self):
+        # elevators and their configs can be pickled and copied
+        import copy, pickle
+        elev = elevator.Elevator(3, 0.5, 1, 30)
+        
+        for t1_elev in [pickle.loads(pickle.dumps(elev)), copy.deepcopy(elev)]:
+            self.assertEqual(t1_elev.config, elev.config)
+            self.assertEqual(t1_elev.current_floor, 3)
+            with self.assertRaises(Exception):
+                t1_elev.config.sec_per_floor = 5
+        
+        
+    def test_plan_trip_pure(self):
+        # the module plan_trip matches the elevator and does not move it
+        elev = elevator.Elevator(2, 10)
+        floors = [5, 5, 1]
+        trip_plan = elevator.plan_trip(2, floors, elev.config)
+        
+        self.assertTrue(trip_plan.to_frame().equals(elev.go_to_floor(floors, False)))
+        self.assertEqual(floors, [5, 5, 1])
+        self.assertEqual(elevator.plan_trip(2, [1, 5], elev.config, "look").mean_arrival_time(),
+                         elevator.Elevator(2, 10).plan_trip([1, 5], "look").mean_arrival_time())
+        self.assertRaises(Exception, elevator.plan_trip, 21, [5], elev.config)
+        
+        
+    def test_plan_trip_threads(self):
+        # trips planned from a thread pool with one shared config match
+        # the trips planned one by one
+        from concurrent.futures import ThreadPoolExecutor
+        config = elevator.ElevatorConfig(3, 1, 50)
+        rng = np.random.default_rng(0)
+        trips = [(int(rng.integers(1, 51)), rng.integers(1, 51, 10).tolist()) for i in range(200)]
+        
+        with ThreadPoolExecutor(8) as executor:
+            trip_plans = list(executor.map(lambda x: elevator.plan_trip(x[0], x[1], config), trips))
+        
+        for (start_floor, floors), trip_plan in zip(trips, trip_plans):
+            self.assertEqual(trip_plan.total_time,
+                             elevator.Elevator(start_floor, 3, 1, 50).trip_summary(floors)["total_time"])
+        
+        
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import unittest
+import elevator
+import elevator_bank
+import numpy as np
+
+class TestElevatorBank(unittest.TestCase):
+    
+    
+    def test_single_car_stops_on_the_way(self):
+        # a call on the way to the current target is served before it
+        elev = elevator.Elevator(1, 10)
+        bank = elevator_bank.ElevatorBank([elev])
+        
+        out = bank.run([0, 5], [1, 2], [3, 4])
+        
+        self.assertEqual(list(out.pickup_time), [0, 10])
+        self.assertEqual(list(out.dropoff_time), [20, 30])
+        self.assertEqual(list(out.wait_time), [0, 5])
+        self.assertEqual(list(out.ride_time), [20, 20])
+        self.assertEqual(elev.current_floor, 4)
+        
+        
+    def test_nearest_car_is_dispatched(self):
+        # the call is assigned to the closest idle car
+        elevators = [elevator.Elevator(1, 10), elevator.Elevator(15, 10)]
+        bank = elevator_bank.ElevatorBank(elevators, policy = "nearest")
+        
+        out = bank.run([0], [12], [1])
+        
+        self.assertEqual(list(out.car), [1])
+        self.assertEqual(list(out.wait_time), [30])
+        
+        
+    def test_custom_policy(self):
+        # a callable can be used as the dispatch policy
+        elevators = [elevator.Elevator(1, 10), elevator.Elevator(15, 10)]
+        bank = elevator_bank.ElevatorBank(elevators, policy = lambda cars, origin, destination, time: 0)
+        
+        out = bank.run([0, 1], [12, 14], [1, 2])
+        
+        self.assertEqual(list(out.car), [0, 0])
+        
+        
+    def test_all_policies_deliver_every_passenger(self):
+        # every passenger reaches their destination no faster than a direct ride
+        rng = np.random.default_rng(0)
+        call_times = rng.uniform(0, 3600, 500)
+        origin_floors = rng.integers(1, 21, 500)
+        destination_floors = (origin_floors + rng.integers(1, 20, 500) - 1) % 20 + 1
+        
+        for policy in elevator_bank.POLICIES:
+            elevators = [elevator.Elevator(1, 10) for i in range(4)]
+            bank = elevator_bank.ElevatorBank(elevators, policy = policy)
+            out = bank.run(call_times, origin_floors, destination_floors)
+            
+            direct_time = np.abs(destination_floors - origin_floors) * 10
+            self.assertTrue((out.wait_time >= 0).all())
+            self.assertTrue((out.ride_time >= direct_time - 1e-9).all())
+            
+            
+    def test_unknown_policy(self):
+        # the policy must be a known name or a callable
+        self.assertRaises(Exception, elevator_bank.ElevatorBank, [elevator.Elevator()], "fastest")
+        
+        
+    def test_elevators_with_different_floors(self):
+        # all elevators of the bank must serve the same floors
+        elevators = [elevator.Elevator(1, 10, 1, 20), elevator.Elevator(1, 10, 1, 30)]
+        self.assertRaises(Exception, elevator_bank.ElevatorBank, elevators)
+        
+        
+    def test_call_to_same_floor(self):
+        # the destination of a call must differ from its origin
+        bank = elevator_bank.ElevatorBank([elevator.Elevator()])
+        self.assertRaises(Exception, bank.run, [0], [3], [3])
+        
+        
+    def test_call_outside_building(self):
+        # the floors of a call must be within the building floors
+        bank = elevator_bank.ElevatorBank([elevator.Elevator()])
+        self.assertRaises(Exception, bank.run, [0], [3], [25])
+        
+        
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import unittest
+import elevator_benchmark
+
+class TestElevatorBenchmark(unittest.TestCase):
+    
+    
+    def test_compare_results_finds_regressions(self):
+        # cases slower or larger than the threshold are regressions
+        baseline = {"cases":{"a":{"wall_time":1.0, "peak_memory":10**6},
+                             "b":{"wall_time":1.0, "peak_memory":10**6}}}
+        results = {"cases":{"a":{"wall_time":1.2, "peak_memory":10**6},
+                            "b":{"wall_time":1.0, "peak_memory":2 * 10**6},
+                            "c":{"wall_time":9.0, "peak_memory":9 * 10**6}}}
+        
+        regressions = elevator_benchmark.compare_results(results, baseline, threshold = 0.25)
+        
+        self.assertEqual([(x["case"], x["metric"]) for x in regressions], [("b", "peak_memory")])
+        
+        
+    def test_compare_results_noise_floor(self):
+        # large relative increases of tiny cases are within the noise
+        baseline = {"cases":{"a":{"wall_time":1e-5, "peak_memory":100}}}
+        results = {"cases":{"a":{"wall_time":5e-4, "peak_memory":4000}}}
+        
+        self.assertEqual(elevator_benchmark.compare_results(results, baseline), [])
+        self.assertEqual(len(elevator_benchmark.compare_results(results, baseline, time_noise = 0,
+                                                                memory_noise = 0)), 2)
+        
+        
+    def test_time_case_runs_long_enough(self):
+        # short cases are run several times per repeat
+        case = {"engine":"plan_trip", "n_stops":2, "n_floors":20, "sec_per_floor":1}
+        result = elevator_benchmark.time_case(case, repeats = 3, min_time = 0.02)
+        
+        self.assertGreater(result["loops"], 1)
+        self.assertGreater(result["wall_time"] * result["loops"], 0.005)
+        
+        
+    def test_cases_cover_every_engine(self):
+        # every engine is benchmarked and the case names are unique
+        cases = elevator_benchmark.make_cases(quick = True)
+        names = [elevator_benchmark.case_name(x) for x in cases]
+        
+        self.assertEqual({x["engine"] for x in cases}, set(elevator_benchmark.ENGINES))
+        self.assertEqual(len(names), len(set(names)))
+        
+        
+    def test_engines_simulate_the_same_rows(self):
+        # every engine simulates the same number of rows for the same case
+        rows = [elevator_benchmark.run_case({"engine":engine, "n_stops":5, "n_floors":20,
+                                             "sec_per_floor":3}, n_trips = 10)
+                for engine in elevator_benchmark.ENGINES]
+        
+        self.assertEqual(len(set(rows)), 1)
+        
+        
+if __name__ == '__main__':
+    unittest.main()
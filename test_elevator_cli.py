@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import unittest
+import io
+import json
+import os
+import tempfile
+import contextlib
+import elevator
+import elevator_cli
+
+class TestElevatorCli(unittest.TestCase):
+    
+    
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.lines = ['{"start_floor": 2, "sec_per_floor": 5, "floors": [1, 3]}\n',
+                      '{"start_floor": 4, "floors": [4]}\n',
+                      '\n',
+                      '{"start_floor": 20, "floors": [1]}\n',
+                      '{"start_floor": 1, "floors": [25]}\n']
+        self.settings = {"input_format":"jsonl", "fieldnames":None, "sec_per_floor":10,
+                         "min_building_floor":1, "max_building_floor":20, "mode":"summary",
+                         "output_format":"jsonl"}
+        
+        
+    def tearDown(self):
+        self.directory.cleanup()
+        
+        
+    def test_parse_request(self):
+        # CSV and JSONL requests are parsed and checked
+        self.assertEqual(elevator_cli.parse_request('{"start_floor": 2, "floors": [1, 3]}', "jsonl"),
+                         (2, 10, [1, 3]))
+        self.assertEqual(elevator_cli.parse_request("2,,1;3", "csv",
+                                                    ["start_floor", "sec_per_floor", "floors"]),
+                         (2, 10, [1, 3]))
+        for text in ['{"start_floor": 2}', '{"start_floor": 2, "floors": [2]}',
+                     '{"start_floor": 2, "floors": [1.5]}', '[2, 3]', '{"start_floor": 2, "fl']:
+            self.assertRaises(Exception, elevator_cli.parse_request, text, "jsonl")
+            
+            
+    def test_run_batch_summaries(self):
+        # the summaries are written in input order and invalid requests are
+        # reported with their line number
+        out = io.StringIO()
+        totals = elevator_cli.run_batch(self.lines, out, self.settings, chunk_size = 2)
+        records = [json.loads(x) for x in out.getvalue().splitlines()]
+        
+        self.assertEqual([x["trip_id"] for x in records], [0, 2])
+        self.assertEqual(records[0]["arrival_times"], [5, 15])
+        self.assertEqual(records[1]["total_time"], 190)
+        self.assertEqual([x[0] for x in totals["errors"]], [2, 5])
+        self.assertEqual(totals["n_trips"], 2)
+        
+        
+    def test_run_batch_workers(self):
+        # the output does not depend on the number of workers
+        lines = ['{{"start_floor": {}, "floors": [{}, 1]}}\n'.format(i % 19 + 2, i % 7 + 5)
+                 for i in range(200)]
+        outputs = []
+        for workers in [1, 2]:
+            out = io.StringIO()
+            elevator_cli.run_batch(lines, out, self.settings, workers = workers, chunk_size = 15)
+            outputs.append(out.getvalue())
+            
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(len(outputs[0].splitlines()), 200)
+        
+        
+    def test_main_csv_rows(self):
+        # the rows written from a CSV file match simulate_batch
+        input_path = os.path.join(self.directory.name, "trips.csv")
+        output_path = os.path.join(self.directory.name, "rows.csv")
+        with open(input_path, "w") as f:
+            f.write("start_floor,sec_per_floor,floors\n2,5,1 3\n4,10,4\n20,1,1\n")
+        
+        with contextlib.redirect_stderr(io.StringIO()) as errors:
+            exit_code = elevator_cli.main([input_path, "--mode", "rows", "--output", output_path,
+                                           "--workers", "1"])
+        with open(output_path) as f:
+            lines = f.read().splitlines()
+        
+        self.assertEqual(exit_code, 1)
+        self.assertIn("line 3:", errors.getvalue())
+        self.assertEqual(lines[0], ",".join(elevator_cli.ROW_COLUMNS))
+        self.assertEqual(len(lines), 1 + len(elevator.Elevator(2, 5).go_to_floor([1, 3], False)) + 20)
+        self.assertEqual(lines[-1], "2,19,1,,,")
+        
+        
+if __name__ == '__main__':
+    unittest.main()
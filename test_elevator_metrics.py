@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import unittest
+import pickle
+import numpy as np
+import pandas as pd
+import elevator
+import elevator_metrics
+
+class TestElevatorMetrics(unittest.TestCase):
+    
+    
+    def test_add_trip_matches_frames(self):
+        # the floor histograms match the per-second dataframes
+        trips = [(2, [5, 1, 1, 3]), (3, [20, 4]), (4, [1])]
+        metrics = elevator_metrics.FleetMetrics(1, 20)
+        frames = []
+        for start_floor, desired_floors in trips:
+            elev = elevator.Elevator(start_floor, 10)
+            metrics.add_trip(elev.plan_trip(desired_floors))
+            frames.append(elev.go_to_floor(desired_floors, False).iloc[:-1])
+        rows = pd.concat(frames)
+        floor_time = rows["current_floor"].value_counts().reindex(range(1, 21), fill_value = 0)
+        
+        self.assertEqual(metrics.floor_time.tolist(), floor_time.tolist())
+        self.assertEqual(metrics.floor_visits[[0, 2, 3, 4, 19]].tolist(), [2, 1, 1, 1, 1])
+        self.assertEqual(metrics.floors_traveled, len(rows) // 10)
+        self.assertEqual(metrics.direction_changes, 3)
+        self.assertEqual(metrics.moving_time, len(rows))
+        self.assertEqual(metrics.utilization(), 1)
+        metrics.add_idle_time(len(rows))
+        self.assertEqual(metrics.utilization(), 0.5)
+        self.assertEqual(metrics.trip_times.count, 3)
+        
+        
+    def test_add_rows_and_active_trip(self):
+        # the simulation data and the legs of a changed trip give the same
+        # metrics as the rows
+        elev = elevator.Elevator(1, 0.5)
+        t1_out = elev.go_to_floor([4, 2], False, time_step = "floors", output = "numpy")
+        t1_metrics = elevator_metrics.FleetMetrics(1, 20)
+        t1_metrics.add_rows(t1_out, 0.5)
+        t2_metrics = elevator_metrics.FleetMetrics(1, 20)
+        t2_metrics.add_trip(elevator.Elevator(1, 0.5).plan_trip([4, 2]))
+        
+        self.assertEqual(t1_metrics.summary(), t2_metrics.summary())
+        # rows further apart than a floor could skip whole legs
+        t3_out = elevator.Elevator(1, 10).go_to_floor([2, 1, 2], False, time_step = 25)
+        self.assertRaises(Exception, t1_metrics.add_rows, t3_out, 10)
+        self.assertRaises(Exception, t1_metrics.add_rows, t1_out, 0.25)
+        
+        trip = elevator.Elevator(1, 10).start_trip([10])
+        trip.add_stop(3, at_time = 5, index = 0)
+        trip.cancel_stop(10, at_time = 12)
+        trip.add_stop(1, at_time = 40)
+        rows = trip.to_frame().iloc[:-1]
+        t4_metrics = elevator_metrics.FleetMetrics(1, 20)
+        t4_metrics.add_trip(trip)
+        
+        self.assertEqual(t4_metrics.floor_time[:4].tolist(),
+                         rows["current_floor"].value_counts().reindex(range(1, 5), fill_value = 0).tolist())
+        self.assertEqual(t4_metrics.floor_visits[:3].tolist(), [1, 0, 1])
+        self.assertEqual(t4_metrics.trip_time, trip.total_time)
+        
+        
+    def test_merge(self):
+        # metrics added in parts and merged match the metrics of all trips
+        rng = np.random.default_rng(0)
+        trips = [(int(rng.integers(1, 21)), rng.integers(1, 21, 4).tolist()) for i in range(300)]
+        trips = [x for x in trips if set(x[1]) != {x[0]}]
+        parts = [elevator_metrics.FleetMetrics(1, 20) for i in range(3)]
+        whole = elevator_metrics.FleetMetrics(1, 20)
+        for i, (start_floor, desired_floors) in enumerate(trips):
+            trip_plan = elevator.Elevator(start_floor, 3).plan_trip(desired_floors)
+            parts[i % 3].add_trip(trip_plan)
+            whole.add_trip(trip_plan)
+        merged = pickle.loads(pickle.dumps(parts[0])).merge(parts[1]).merge(parts[2])
+        
+        self.assertEqual(merged.floor_visits.tolist(), whole.floor_visits.tolist())
+        self.assertEqual(merged.trip_times.quantile(0.9), whole.trip_times.quantile(0.9))
+        self.assertEqual(merged.n_trips, len(trips))
+        self.assertRaises(Exception, merged.merge, elevator_metrics.FleetMetrics(1, 30))
+        
+        
+    def test_quantile_sketch(self):
+        # the quantiles are within the relative accuracy and the memory is
+        # bounded
+        values = np.random.default_rng(1).exponential(60, 100000)
+        sketch = elevator_metrics.QuantileSketch(0.01)
+        sketch.add(values)
+        
+        for q in [0.1, 0.5, 0.9, 0.99]:
+            self.assertAlmostEqual(sketch.quantile(q) / np.quantile(values, q), 1, delta = 0.011)
+        self.assertAlmostEqual(sketch.mean(), values.mean())
+        
+        # only the lowest quantiles lose accuracy when the buckets are collapsed
+        small = elevator_metrics.QuantileSketch(0.01, max_buckets = 200)
+        small.add(values)
+        self.assertAlmostEqual(small.quantile(0.99) / np.quantile(values, 0.99), 1, delta = 0.011)
+        self.assertGreater(small.quantile(0.01) / np.quantile(values, 0.01), 2)
+        self.assertRaises(Exception, sketch.add, [-1])
+        self.assertIsNone(elevator_metrics.QuantileSketch().quantile(0.5))
+        
+        
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import unittest
+import asyncio
+import json
+import elevator
+import elevator_service
+
+class TestElevatorService(unittest.TestCase):
+    
+    
+    def test_submit_results(self):
+        # the results match trip_summary and go_to_floor for batched,
+        # per-trip and heavy requests
+        async def run():
+            service = elevator_service.SimulationService(heavy_rows = 50)
+            requests = [{"op":"summary", "start_floor":2, "floors":[5, 1]},
+                        {"op":"simulate", "start_floor":2, "floors":[3, 3, 1], "sec_per_floor":3},
+                        {"op":"simulate", "start_floor":2, "floors":[4], "sec_per_floor":0.5,
+                         "time_step":0.25},
+                        {"op":"simulate", "start_floor":1, "floors":[20]},
+                        {"op":"summary", "start_floor":5, "floors":[8, 2, 7], "order":"look"}]
+            results = await asyncio.gather(*[service.submit(x) for x in requests])
+            return service.stats(), [json.loads(x) for x in results]
+        
+        stats, results = asyncio.run(run())
+        summary = elevator.Elevator(2, 10).trip_summary([5, 1])
+        t1_out = elevator.Elevator(2, 3).go_to_floor([3, 3, 1], False)
+        t2_out = elevator.Elevator(2, 0.5).go_to_floor([4], False, time_step = 0.25, output = "dict")
+        t3_out = elevator.Elevator(1, 10).go_to_floor([20], False)
+        
+        self.assertEqual(results[0]["arrival_times"], summary["arrival_times"].tolist())
+        self.assertEqual(results[0]["total_time"], summary["total_time"])
+        self.assertEqual(results[1]["current_floor"], t1_out["current_floor"].tolist())
+        self.assertEqual(results[1]["next_destination"][:-1], t1_out["next_destination"][:-1].tolist())
+        self.assertIsNone(results[1]["time_to_next_dest"][-1])
+        self.assertEqual(results[2]["time_elapsed"], t2_out["time_elapsed"].tolist())
+        self.assertEqual(results[3]["time_elapsed"], t3_out["time_elapsed"].tolist())
+        self.assertEqual(results[4]["arrival_times"], [20, 30, 90])
+        self.assertEqual((stats["batches"], stats["batched_requests"], stats["pool_requests"]), (1, 4, 1))
+        
+        
+    def test_coalesce_and_errors(self):
+        # identical requests in flight share one result and invalid requests
+        # get an error response
+        async def run():
+            service = elevator_service.SimulationService()
+            record = {"op":"summary", "start_floor":1, "floors":[3, 2]}
+            results = await asyncio.gather(*[service.submit(dict(record)) for i in range(20)])
+            errors = await asyncio.gather(*[service.handle_line(x) for x in
+                                            ['{"id": 7, "start_floor": 1, "floors": [1]}',
+                                             '{"id": 8, "start_floor": 1, "floors": [25]}',
+                                             '{"id": 9, "op": "move"}', '{"id": 10']])
+            return service.stats(), results, [json.loads(x) for x in errors]
+        
+        stats, results, errors = asyncio.run(run())
+        
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual((stats["requests"], stats["coalesced"], stats["batched_requests"]), (23, 19, 1))
+        self.assertEqual([x["id"] for x in errors], [7, 8, 9, None])
+        self.assertTrue(all("error" in x for x in errors))
+        self.assertEqual(stats["errors"], 3)
+        self.assertEqual(stats["in_flight"], 0)
+        
+        
+    def test_serve_and_load_test(self):
+        # requests sent over a connection get their own results
+        async def run():
+            service = elevator_service.SimulationService()
+            server = await elevator_service.serve(service, port = 0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                client = await elevator_service.ServiceClient.connect(port = port)
+                summaries = await asyncio.gather(*[client.request("summary", start_floor = 1, floors = [x])
+                                                   for x in range(2, 12)])
+                with self.assertRaises(Exception):
+                    await client.request("summary", start_floor = 1, floors = [30])
+                results = await elevator_service.load_test(client, 200, concurrency = 20, seed = 0)
+                await client.close()
+            return summaries, results
+        
+        summaries, results = asyncio.run(run())
+        
+        self.assertEqual([x["total_time"] for x in summaries], list(range(10, 110, 10)))
+        self.assertEqual(results["requests"], 200)
+        # the stats request at the end of the load test is counted too
+        self.assertEqual(results["service"]["requests"], 212)
+        self.assertGreater(results["throughput"], 0)
+        
+        
+if __name__ == '__main__':
+    unittest.main()
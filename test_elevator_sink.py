@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import unittest
+import os
+import tempfile
+import importlib.util
+import elevator
+import elevator_sink
+import numpy as np
+
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+class TestElevatorSink(unittest.TestCase):
+    
+    
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.start_floors = [2, 5, 1, 20]
+        self.itineraries = [[1, 3], [5, 5, 2], [4], [1, 20]]
+        
+        
+    def tearDown(self):
+        self.directory.cleanup()
+        
+        
+    def test_npy_sink_batch(self):
+        # every trip written in small chunks can be read back
+        path = os.path.join(self.directory.name, "sim.npy")
+        with elevator_sink.NpySink(path, chunk_rows = 50) as sink:
+            elevator_sink.write_batch(sink, self.start_floors, self.itineraries, trips_per_chunk = 3)
+        
+        reader = elevator_sink.NpyReader(path)
+        expected = elevator.simulate_batch(self.start_floors, self.itineraries, output = "dict")
+        
+        self.assertIsInstance(reader.data, np.memmap)
+        self.assertEqual(list(reader.trips[:, 0]), [0, 1, 2, 3])
+        for trip_id in range(4):
+            rows = reader.trip(trip_id)
+            mask = expected["trip_id"] == trip_id
+            self.assertEqual(list(rows["current_floor"]), list(expected["current_floor"][mask]))
+            
+            
+    def test_npy_sink_trip_window(self):
+        # a time window of a trip split across chunks is read back
+        path = os.path.join(self.directory.name, "sim.npy")
+        elev = elevator.Elevator(1, 10)
+        with elevator_sink.NpySink(path, chunk_rows = 64) as sink:
+            elevator_sink.write_trip(sink, elev, [20, 1], trip_id = 7, chunk_size = 30)
+        
+        window = elevator_sink.NpyReader(path).window(7, 185, 195)
+        
+        self.assertEqual(list(window["time_elapsed"]), list(range(185, 196)))
+        self.assertEqual(list(window["current_floor"][[0, -1]]), [19, 20])
+        self.assertEqual(elev.current_floor, 1)
+        
+        
+    def test_npy_sink_mixed_dtypes(self):
+        # chunks that do not fit the dtypes of the first chunk are rejected
+        # instead of wrapping around or being truncated
+        path = os.path.join(self.directory.name, "sim.npy")
+        compact = elevator.simulate_batch([1], [[2]], compact = True, output = "dict")
+        long_trip = elevator.simulate_batch([1], [[20]], 2000, output = "dict")
+        long_trip["trip_id"] = long_trip["trip_id"] + 1
+        float_time = elevator.Elevator(1, 2.5).go_to_floor([3], False, output = "dict")
+        float_time["trip_id"] = np.full(float_time["time_elapsed"].size, 3)
+        
+        with elevator_sink.NpySink(path) as sink:
+            sink.write(compact)
+            self.assertRaises(Exception, sink.write, long_trip)
+        with elevator_sink.NpySink(path) as sink:
+            sink.write(elevator.simulate_batch([1], [[2]], output = "dict"))
+            self.assertRaises(Exception, sink.write, float_time)
+            sink.write(elevator.simulate_batch([1], [[3]], compact = True, output = "dict"))
+        
+        self.assertEqual(elevator_sink.NpyReader(path).data.dtype["time_elapsed"], np.int64)
+        
+        
+    def test_npy_reader_missing_trip(self):
+        # reading a trip that was not written raises an exception
+        path = os.path.join(self.directory.name, "sim.npy")
+        with elevator_sink.NpySink(path) as sink:
+            elevator_sink.write_trip(sink, elevator.Elevator(1, 10), [3])
+            
+        self.assertRaises(Exception, elevator_sink.NpyReader(path).trip, 1)
+        
+        
+    @unittest.skipUnless(HAS_PYARROW, "pyarrow is not installed")
+    def test_arrow_sinks_window(self):
+        # parquet and arrow files return the same time window
+        for file_format in ["parquet", "arrow"]:
+            path = os.path.join(self.directory.name, "sim." + file_format)
+            with elevator_sink.ArrowSink(path, file_format, chunk_rows = 20) as sink:
+                elevator_sink.write_batch(sink, self.start_floors, self.itineraries,
+                                          trips_per_chunk = 1)
+                
+            window = elevator_sink.read_arrow_window(path, 3, 100, 105, file_format)
+            
+            self.assertEqual(window.column("time_elapsed").to_pylist(), list(range(100, 106)))
+            self.assertEqual(set(window.column("trip_id").to_pylist()), {3})
+            
+            
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import unittest
+import elevator_study
+import numpy as np
+
+class TestElevatorStudy(unittest.TestCase):
+    
+    
+    def test_results_do_not_depend_on_workers(self):
+        # the same seed gives the same results with any number of workers
+        one_worker = elevator_study.run_traffic_study(12, "inter_floor", workers = 1,
+                                                      seed = 3, trips_per_run = 20)
+        two_workers = elevator_study.run_traffic_study(12, "inter_floor", workers = 2,
+                                                       seed = 3, trips_per_run = 20)
+        
+        self.assertEqual(one_worker, two_workers)
+        
+        
+    def test_different_seeds(self):
+        # different seeds draw different trips
+        seed_1 = elevator_study.run_traffic_study(4, workers = 1, seed = 1)
+        seed_2 = elevator_study.run_traffic_study(4, workers = 1, seed = 2)
+        
+        self.assertNotEqual(seed_1["total_travel_time"], seed_2["total_travel_time"])
+        
+        
+    def test_results(self):
+        # the aggregated metrics are consistent with each other
+        results = elevator_study.run_traffic_study(5, "down_peak", workers = 1, trips_per_run = 10,
+                                                   sec_per_floor = 5)
+        
+        self.assertEqual(results["n_runs"], 5)
+        self.assertEqual(results["n_trips"], 50)
+        self.assertEqual(results["total_travel_time"], results["floors_traveled"] * 5)
+        self.assertEqual(results["mean_run_travel_time"], results["total_travel_time"] / 5)
+        self.assertLessEqual(results["trip_time_percentiles"][50],
+                             results["trip_time_percentiles"][99])
+        
+        
+    def test_fractional_speed(self):
+        # fractional speeds are accepted like for an Elevator
+        results = elevator_study.run_traffic_study(2, workers = 1, trips_per_run = 10,
+                                                   sec_per_floor = 2.5)
+        
+        self.assertAlmostEqual(results["total_travel_time"], results["floors_traveled"] * 2.5)
+        self.assertRaises(Exception, elevator_study.run_traffic_study, 2, workers = 1,
+                          sec_per_floor = 0)
+        
+        
+    def test_no_empty_trips(self):
+        # trips that would stay on the current floor are drawn again, so
+        # every trip of a two floor building travels one floor
+        results = elevator_study.run_traffic_study(3, "inter_floor", workers = 1, trips_per_run = 20,
+                                                   stops_per_trip = 1, min_building_floor = 1,
+                                                   max_building_floor = 2)
+        
+        self.assertEqual(results["n_trips"], 60)
+        self.assertEqual(results["floors_traveled"], 60)
+        self.assertEqual(results["trip_time_percentiles"][50], 10)
+        
+        
+    def test_draw_trip_up_peak(self):
+        # up peak trips start at the lobby and go up
+        rng = np.random.default_rng(0)
+        for i in range(20):
+            desired_floors = elevator_study.draw_trip(rng, "up_peak", 4, 1, 20)
+            
+            self.assertEqual(desired_floors[0], 1)
+            self.assertEqual(desired_floors, sorted(desired_floors))
+            self.assertTrue(2 <= len(desired_floors) <= 5)
+            
+            
+    def test_draw_trip_down_peak(self):
+        # down peak trips end at the lobby and go down
+        rng = np.random.default_rng(0)
+        for i in range(20):
+            desired_floors = elevator_study.draw_trip(rng, "down_peak", 4, 1, 20)
+            
+            self.assertEqual(desired_floors[-1], 1)
+            self.assertEqual(desired_floors, sorted(desired_floors, reverse = True))
+            
+            
+    def test_unknown_scenario(self):
+        # the scenario must be a known traffic scenario
+        self.assertRaises(Exception, elevator_study.run_traffic_study, 2, "lunch")
+        
+        
+    def test_n_runs_not_positive(self):
+        # the number of runs must be greater than 0
+        self.assertRaises(Exception, elevator_study.run_traffic_study, 0)
+        
+        
+if __name__ == '__main__':
+    unittest.main()